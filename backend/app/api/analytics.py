@@ -1,10 +1,25 @@
 from fastapi import APIRouter, HTTPException, Body
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+import asyncio
 import random
-import math
+import sqlite3
+from app.services.data_service import DataService
+from app.services.solar_resource import solar_resource
+from app.services.demand_forecast import demand_forecaster
+from app.services.generation_forecast import generation_forecaster, SOLAR_PERFORMANCE_RATIO
+from app.services.timeseries_store import grid_timeseries
+from app.services.comparative_analytics import comparative_analytics
+from app.services.roi_analysis import evaluate_roi, tornado, ROI_SCENARIOS, DEFAULT_ROI_ASSUMPTIONS
+from app.services.lifecycle import expand_scenarios
+from app.services.portfolio_optimizer import portfolio_optimizer, INTERVENTIONS
+from app.services.response_cache import response_cache
+from app.services.query_engine import query_engine
+from app.utils.logging_setup import logging_stats
+import numpy as np
 
 router = APIRouter()
+data_service = DataService()
 
 # Mock data generators
 def generate_time_series_data(days: int = 7):
@@ -36,35 +51,48 @@ def generate_regional_data():
         for region in regions
     ]
 
-def generate_county_comparison():
-    """Generate county comparison data"""
-    counties = [
-        {"name": "Turkana", "priority_score": 98, "solar_irradiance": 6.2, "investment_needed": 2500000},
-        {"name": "Marsabit", "priority_score": 94, "solar_irradiance": 6.5, "investment_needed": 1800000},
-        {"name": "Mandera", "priority_score": 96, "solar_irradiance": 6.8, "investment_needed": 2100000},
-        {"name": "Wajir", "priority_score": 92, "solar_irradiance": 7.0, "investment_needed": 1900000},
-        {"name": "Garissa", "priority_score": 88, "solar_irradiance": 7.2, "investment_needed": 1600000},
-        {"name": "Nairobi", "priority_score": 45, "solar_irradiance": 5.8, "investment_needed": 5000000},
-        {"name": "Kisumu", "priority_score": 72, "solar_irradiance": 5.9, "investment_needed": 3200000}
-    ]
-    return counties
+@router.post("/query")
+async def run_analytics_query(query: Dict[str, Any] = Body(...)):
+    """Declarative filter/group-by/aggregate query over counties, outages, weather, generation and blackouts"""
+    try:
+        return await asyncio.to_thread(query_engine.run, query)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=503, detail=f"Query store unavailable: {e}")
+
+@router.get("/query/schema")
+async def get_query_schema():
+    """Datasets and columns available to /query"""
+    return {"datasets": await asyncio.to_thread(query_engine.schema)}
+
+@router.get("/cache-metrics")
+async def get_cache_metrics():
+    """Response cache hit/miss counters and latency per analytics route"""
+    return {"routes": response_cache.metrics()}
+
+@router.get("/logging-metrics")
+async def get_logging_metrics():
+    """Log queue depth, dropped and rate-limited records, and time spent enqueuing versus writing"""
+    return logging_stats()
+
+@response_cache.cached("grid", ttl=60, stale_ttl=300)
+async def _grid_summary(period: str) -> Dict[str, Any]:
+    # Each period reads a fixed number of daily or weekly rollup buckets
+    return await grid_timeseries.period_summary(period)
 
 @router.get("/grid")
 async def get_grid_analytics(period: str = "7d"):
     """Get grid-wide analytics data"""
     
-    days = 7 if period == "7d" else 30 if period == "30d" else 90 if period == "90d" else 365
+    # Only the rollup summary is cached; the regional figures are still mock data
+    summary = await _grid_summary(period)
     
     return {
         "period": period,
-        "total_generation_kwh": random.randint(150000, 250000),
-        "total_consumption_kwh": random.randint(120000, 200000),
-        "system_efficiency": random.uniform(80, 92),
-        "peak_demand_mw": random.uniform(85, 120),
-        "carbon_savings_kg": random.randint(120000, 180000),
+        **summary,
         "counties_analyzed": 47,
         "national_coverage_percentage": 76.5,
-        "time_series_data": generate_time_series_data(days),
         "regional_performance": generate_regional_data()
     }
 
@@ -123,101 +151,199 @@ async def get_comparative_analytics(comparison_params: Dict[str, Any] = Body(...
     comparison_type = comparison_params.get("type", "counties")
     metrics = comparison_params.get("metrics", ["efficiency", "investment", "solar_potential"])
     
-    counties_data = generate_county_comparison()
+    try:
+        result = await comparative_analytics.compare_counties(list(metrics))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    table = result["table"]
+    values = result["values"]
+    top = values.argmax(axis=0)
+    best_region = result["group_mean"].argmax(axis=0)
+    insights = [
+        f"{table['names'][top[j]]} ranks first on {metric}; {table['region_names'][best_region[j]]} leads the regions"
+        for j, metric in enumerate(metrics)
+    ]
     
     if comparison_type == "counties":
+        data = [
+            {
+                "name": name,
+                "region": region,
+                **{metric: round(float(values[i, j]), 3) for j, metric in enumerate(metrics)},
+                "ranks": {metric: int(result["rank"][i, j]) for j, metric in enumerate(metrics)},
+                "percentiles": {metric: round(float(result["percentile"][i, j]), 1) for j, metric in enumerate(metrics)},
+                "z_scores": {metric: round(float(result["z_score"][i, j]), 3) for j, metric in enumerate(metrics)},
+                "peer_ranks": {metric: int(result["peer_rank"][i, j]) for j, metric in enumerate(metrics)},
+                "peer_z_scores": {metric: round(float(result["peer_z_score"][i, j]), 3) for j, metric in enumerate(metrics)}
+            }
+            for i, (name, region) in enumerate(zip(table["names"], table["regions"]))
+        ]
         return {
             "comparison_type": "counties",
             "metrics": metrics,
-            "data": counties_data,
-            "insights": [
-                "Northern counties show highest solar potential and priority scores",
-                "Urban centers require different investment strategies",
-                "ROI correlates strongly with solar irradiance levels"
-            ]
+            "data": data,
+            "summary": {
+                metric: {
+                    "mean": round(float(result["mean"][j]), 3),
+                    "std": round(float(result["std"][j]), 3),
+                    "min": round(float(values[:, j].min()), 3),
+                    "max": round(float(values[:, j].max()), 3)
+                }
+                for j, metric in enumerate(metrics)
+            },
+            "dataset_version": table["version"],
+            "insights": insights
         }
     else:
         return {
             "comparison_type": "regions",
             "metrics": metrics,
-            "data": generate_regional_data(),
-            "insights": [
-                "Regional efficiency varies based on infrastructure development",
-                "Investment distribution should consider regional characteristics",
-                "Some regions show excellent ROI potential"
-            ]
+            "data": [
+                {
+                    "region": region,
+                    "counties": int(result["group_size"][g]),
+                    **{metric: round(float(result["group_mean"][g, j]), 3) for j, metric in enumerate(metrics)}
+                }
+                for g, region in enumerate(table["region_names"])
+            ],
+            "dataset_version": table["version"],
+            "insights": insights
         }
 
+def _forecast_hours(params: Dict[str, Any]) -> int:
+    """Forecast horizon from a request body, or a 400"""
+    try:
+        hours = int(params.get("hours", 24))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="hours must be an integer")
+    if not 1 <= hours <= 8760:
+        raise HTTPException(status_code=400, detail="hours must be between 1 and 8760")
+    return hours
+
 @router.post("/demand-forecast")
 async def get_demand_forecast(params: Dict[str, Any] = Body(...)):
     """Get energy demand forecast"""
     
-    forecast_hours = params.get("hours", 24)
+    forecast_hours = _forecast_hours(params)
     county = params.get("county", "national")
+    counties = params.get("counties")
+    
+    if counties is None and county not in ("national", "all"):
+        counties = [county]
+    elif isinstance(counties, str) and counties != "all":
+        counties = [counties]
+    if counties not in (None, "all") and (
+            not isinstance(counties, list) or not all(isinstance(name, str) for name in counties)):
+        raise HTTPException(status_code=400, detail="county must be a name and counties a list of names")
     
-    # Generate demand forecast
-    forecast = []
-    for hour in range(forecast_hours):
-        # Simulate daily demand pattern
-        if 6 <= hour <= 9 or 18 <= hour <= 22:
-            demand = random.uniform(80, 120)  # Peak hours
-        elif 12 <= hour <= 14:
-            demand = random.uniform(70, 100)  # Mid-day
-        else:
-            demand = random.uniform(40, 70)   # Off-peak
-        
-        forecast.append({
+    # Every requested county comes from one batched lookup into the fitted models
+    try:
+        result = await demand_forecaster.forecast(
+            counties=None if counties in (None, "all") else counties, hours=forecast_hours
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    series = result["demand_mw"].sum(axis=0)
+    forecast = [
+        {
             "hour": hour,
-            "demand_mw": round(demand, 2),
-            "confidence": random.uniform(0.85, 0.95)
-        })
+            "timestamp": result["timestamps"][hour].isoformat(),
+            "demand_mw": round(float(series[hour]), 2),
+            "confidence": round(float(result["confidence"][hour]), 3)
+        }
+        for hour in range(forecast_hours)
+    ]
+    peak_hour = int(series.argmax())
     
-    return {
+    response = {
         "forecast_type": "demand",
         "county": county,
         "period_hours": forecast_hours,
         "forecast": forecast,
-        "peak_demand": max(f["demand_mw"] for f in forecast),
-        "avg_demand": sum(f["demand_mw"] for f in forecast) / len(forecast),
+        "peak_demand": round(float(series[peak_hour]), 2),
+        "peak_time": result["timestamps"][peak_hour].isoformat(),
+        "avg_demand": round(float(series.mean()), 2),
+        "dataset_version": result["dataset_version"],
         "recommendations": [
-            "Prepare for peak demand between 18:00-22:00",
+            f"Prepare for peak demand around {result['timestamps'][peak_hour].strftime('%H:%M')}",
             "Consider load shedding during high demand periods",
             "Optimize battery discharge during peak hours"
         ]
     }
+    if county == "all" or params.get("counties") is not None:
+        response["county_forecasts"] = [
+            {
+                "county": name,
+                "demand_mw": [round(float(v), 3) for v in values],
+                "peak_demand": round(float(values.max()), 3),
+                "avg_demand": round(float(values.mean()), 3)
+            }
+            for name, values in zip(result["counties"], result["demand_mw"])
+        ]
+    return response
 
 @router.post("/generation-forecast")
 async def get_generation_forecast(params: Dict[str, Any] = Body(...)):
     """Get energy generation forecast"""
     
-    forecast_hours = params.get("hours", 24)
+    forecast_hours = _forecast_hours(params)
     county = params.get("county", "national")
     
-    # Generate generation forecast based on solar patterns
-    forecast = []
-    for hour in range(forecast_hours):
-        if 6 <= hour <= 18:
-            # Solar generation curve
-            solar_factor = math.sin(math.pi * (hour - 6) / 12)
-            generation = solar_factor * random.uniform(80, 120)
-        else:
-            generation = random.uniform(5, 15)  # Base/night generation
-        
-        forecast.append({
+    # Plant register output from the current hour of the typical year
+    now = datetime.now()
+    start_hour = (now.timetuple().tm_yday - 1) * 24 + now.hour
+    result = await generation_forecaster.forecast(start_hour, forecast_hours, county)
+    
+    output = result["output_mw"]
+    plant_types = np.array(result["plant_types"])
+    total = output.sum(axis=0)
+    solar = output[plant_types == "solar"].sum(axis=0)
+    by_type = {plant_type: output[plant_types == plant_type].sum(axis=0) for plant_type in sorted(set(result["plant_types"]))}
+    
+    # Round whole arrays once; the loop below only assembles JSON rows
+    start = now.replace(minute=0, second=0, microsecond=0)
+    total_rounded, solar_rounded = np.round(total, 2).tolist(), np.round(solar, 2).tolist()
+    other_rounded = np.round(total - solar, 2).tolist()
+    type_rounded = {plant_type: np.round(values, 2).tolist() for plant_type, values in by_type.items()}
+    forecast = [
+        {
             "hour": hour,
-            "generation_mw": round(generation, 2),
-            "solar_contribution": round(generation * 0.8, 2) if 6 <= hour <= 18 else 0,
-            "other_sources": round(generation * 0.2, 2)
-        })
+            "timestamp": (start + timedelta(hours=hour)).isoformat(),
+            "generation_mw": total_rounded[hour],
+            "solar_contribution": solar_rounded[hour],
+            "other_sources": other_rounded[hour],
+            "by_type": {plant_type: values[hour] for plant_type, values in type_rounded.items()}
+        }
+        for hour in range(forecast_hours)
+    ]
     
+    capacity = float(result["capacity_mw"].sum())
+    plant_energy = output.sum(axis=1)
     return {
         "forecast_type": "generation",
         "county": county,
         "period_hours": forecast_hours,
         "forecast": forecast,
-        "total_generation": sum(f["generation_mw"] for f in forecast),
-        "peak_generation": max(f["generation_mw"] for f in forecast),
-        "solar_efficiency": random.uniform(75, 92)
+        "total_generation": round(float(total.sum()), 2),
+        "peak_generation": round(float(total.max()), 2),
+        "capacity_factor": round(float(total.mean()) / capacity, 4) if capacity > 0 else 0,
+        "solar_efficiency": SOLAR_PERFORMANCE_RATIO * 100 if "solar" in by_type else None,
+        "plants": [
+            {
+                "plant_name": name,
+                "plant_type": plant_type,
+                "county": plant_county,
+                "capacity_mw": float(capacity_mw),
+                "energy_mwh": round(float(energy), 2),
+                "capacity_factor": round(float(energy) / (capacity_mw * forecast_hours), 4) if capacity_mw > 0 else 0
+            }
+            for name, plant_type, plant_county, capacity_mw, energy in zip(
+                result["plants"], result["plant_types"], result["counties"], result["capacity_mw"], plant_energy
+            )
+        ],
+        "dataset_version": result["dataset_version"]
     }
 
 @router.post("/weather-impact")
@@ -281,101 +407,129 @@ async def get_economic_analytics(params: Dict[str, Any] = Body(...)):
 async def get_investment_analytics(investment_params: Dict[str, Any] = Body(...)):
     """Get investment analytics and opportunities"""
     
+    objective = investment_params.get("objective", "households")
+    
+    # Re-solving for a new budget reuses the cached per-county option tables and DP
+    try:
+        result = await portfolio_optimizer.optimize(
+            investment_params.get("budget_usd", 100000000), objective, investment_params.get("regional_quotas")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    budget_usd = result["budget_usd"]
+    
+    options, picked = result["options"], result["picked"]
+    projects = [
+        {
+            "county": options["counties"][i],
+            "region": options["regions"][i],
+            "intervention": INTERVENTIONS[picked[i]],
+            "amount_usd": round(float(options["cost_usd"][i, picked[i]]), 2),
+            "households_served": int(options["households_served"][i, picked[i]]),
+            "co2_reduction_tons": round(float(options["co2_avoided_tons"][i, picked[i]]), 1)
+        }
+        for i in np.flatnonzero(picked >= 0)
+    ]
+    
+    opportunities = {}
+    for project in projects:
+        region = opportunities.setdefault(project["region"], {
+            "region": project["region"], "amount_usd": 0.0, "counties": [],
+            "expected_impact": {"households_served": 0, "co2_reduction_tons": 0.0}
+        })
+        region["amount_usd"] += project["amount_usd"]
+        region["counties"].append(project["county"])
+        region["expected_impact"]["households_served"] += project["households_served"]
+        region["expected_impact"]["co2_reduction_tons"] += project["co2_reduction_tons"]
+    ranked = sorted(opportunities.values(), key=lambda region: region["amount_usd"], reverse=True)
+    for rank, region in enumerate(ranked):
+        region["priority"] = "high" if rank < 2 else "medium" if rank < 5 else "low"
+    
+    total = sum(project["amount_usd"] for project in projects)
     return {
-        "investment_opportunities": [
-            {
-                "region": "Northern Kenya",
-                "amount_usd": 1500000,
-                "roi_percentage": 25.5,
-                "payback_years": 4.2,
-                "priority": "high",
-                "counties": ["Turkana", "Marsabit", "Mandera"],
-                "expected_impact": {
-                    "households_served": 15000,
-                    "jobs_created": 120,
-                    "co2_reduction_tons": 4500
-                }
-            },
-            {
-                "region": "Western Kenya",
-                "amount_usd": 850000,
-                "roi_percentage": 18.2,
-                "payback_years": 5.8,
-                "priority": "medium",
-                "counties": ["Kisumu", "Kakamega", "Bungoma"],
-                "expected_impact": {
-                    "households_served": 8000,
-                    "jobs_created": 80,
-                    "co2_reduction_tons": 2800
-                }
-            },
-            {
-                "region": "Coastal Region",
-                "amount_usd": 650000,
-                "roi_percentage": 22.1,
-                "payback_years": 4.8,
-                "priority": "medium",
-                "counties": ["Mombasa", "Kilifi", "Kwale"],
-                "expected_impact": {
-                    "households_served": 6000,
-                    "jobs_created": 60,
-                    "co2_reduction_tons": 2200
-                }
-            }
-        ],
-        "total_investment_potential": 3000000,
-        "avg_roi": 21.9,
+        "budget_usd": budget_usd,
+        "objective": objective,
+        "investment_opportunities": ranked,
+        "selected_projects": projects,
+        "total_investment_potential": round(total, 2),
+        "budget_utilisation": round(total / budget_usd * 100, 1),
+        "expected_impact": {
+            "households_served": sum(project["households_served"] for project in projects),
+            "co2_reduction_tons": round(sum(project["co2_reduction_tons"] for project in projects), 1)
+        },
         "recommended_allocation": {
-            "solar_mini_grids": 65,
-            "grid_extensions": 20,
-            "battery_storage": 10,
-            "smart_technology": 5
+            intervention: round(sum(p["amount_usd"] for p in projects if p["intervention"] == intervention) / total * 100, 1)
+            if total else 0
+            for intervention in INTERVENTIONS
         }
     }
 
+def _finite_or_none(value, digits: int):
+    """Round a NumPy scalar for JSON, mapping NaN (never breaks even, no IRR) to None"""
+    return round(float(value), digits) if np.isfinite(value) else None
+
 @router.post("/roi")
 async def get_roi_analytics(roi_params: Dict[str, Any] = Body(...)):
     """Get ROI analysis for different scenarios"""
     
     scenario = roi_params.get("scenario", "standard")
+    assumptions = roi_params.get("assumptions") or {}
+    if not isinstance(assumptions, dict):
+        raise HTTPException(status_code=400, detail="assumptions must be an object")
+    base = {**ROI_SCENARIOS.get(scenario, ROI_SCENARIOS["standard"]), **assumptions}
     
-    scenarios = {
-        "standard": {
-            "total_investment": 2500000,
-            "annual_savings": 450000,
-            "payback_years": 5.6,
-            "roi_percentage": 18.2,
-            "npv": 1850000
-        },
-        "optimistic": {
-            "total_investment": 2800000,
-            "annual_savings": 620000,
-            "payback_years": 4.5,
-            "roi_percentage": 22.8,
-            "npv": 2450000
-        },
-        "conservative": {
-            "total_investment": 2200000,
-            "annual_savings": 350000,
-            "payback_years": 6.3,
-            "roi_percentage": 15.4,
-            "npv": 1450000
-        }
-    }
+    try:
+        # tornado validates the baselines as single numbers first
+        bars = tornado(base, swing=roi_params.get("sensitivity_range", 0.2))
+        baseline = evaluate_roi(**base)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {
+    impact = {bar["parameter"]: bar["impact"] for bar in bars}
+    response = {
         "scenario": scenario,
-        "analysis": scenarios.get(scenario, scenarios["standard"]),
+        "analysis": {
+            "total_investment": round(float(baseline["total_investment"][0]), 2),
+            "annual_savings": round(float({**DEFAULT_ROI_ASSUMPTIONS, **base}["annual_savings"]), 2),
+            "payback_years": _finite_or_none(baseline["payback_years"][0], 1),
+            "roi_percentage": round(float(baseline["roi_percentage"][0]), 1),
+            "npv": round(float(baseline["npv"][0]), 2),
+            "irr": _finite_or_none(baseline["irr"][0], 4)
+        },
         "sensitivity_analysis": {
-            "demand_growth_impact": random.uniform(0.8, 1.2),
-            "solar_irradiance_impact": random.uniform(0.9, 1.3),
-            "battery_cost_impact": random.uniform(0.7, 1.1)
+            "demand_growth_impact": impact["demand_growth"],
+            "solar_irradiance_impact": impact["irradiance_factor"],
+            "battery_cost_impact": impact["battery_cost_factor"],
+            "tornado": bars
         },
         "break_even_analysis": {
-            "months_to_break_even": random.randint(42, 68),
-            "critical_factors": ["demand growth", "solar efficiency", "maintenance costs"]
+            "months_to_break_even": _finite_or_none(baseline["break_even_months"][0], 0),
+            "critical_factors": [bar["parameter"] for bar in bars[:3]]
         }
     }
+    
+    # Optional scenario grid, evaluated as one broadcast batch
+    if roi_params.get("scenarios"):
+        try:
+            grid = expand_scenarios(roi_params["scenarios"], mode=roi_params.get("mode", "grid"))
+            results = evaluate_roi(**{**base, **grid})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        npvs = results["npv"]
+        best = int(np.nanargmax(npvs))
+        response["scenario_grid"] = {
+            "scenarios_evaluated": int(npvs.size),
+            "npv_percentiles": {str(q): round(float(v), 2) for q, v in zip((5, 50, 95), np.percentile(npvs, (5, 50, 95)))},
+            "probability_positive_npv": round(float((npvs > 0).mean()), 4),
+            "median_break_even_months": _finite_or_none(np.nanmedian(results["break_even_months"]), 0)
+                if np.isfinite(results["break_even_months"]).any() else None,
+            "best_scenario": {
+                **{name: float(values[best]) for name, values in grid.items()},
+                "npv": round(float(npvs[best]), 2),
+                "break_even_months": _finite_or_none(results["break_even_months"][best], 0)
+            }
+        }
+    return response
 
 @router.get("/carbon")
 async def get_carbon_analytics(period: str = "30d"):
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 import logging
+import numpy as np
+import pandas as pd
 from app.services.data_service import DataService
 from app.utils.recommendation_engine import RuleBasedEngine
+from app.services.model_registry import planner_registry, PlannerModelUnavailable
+from app.services.feature_store import feature_store, ENGINEERED_COLUMNS
+from app.services.model_training import model_trainer
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -26,6 +32,9 @@ class CountyData(BaseModel):
     land_availability: Optional[float] = Field(None, ge=0, description="Available land (km²)")
     population_density: Optional[float] = Field(None, ge=0, description="Population density (people/km²)")
 
+class BatchCountyRequest(BaseModel):
+    counties: List[CountyData] = Field(..., min_length=1, max_length=50000, description="County feature rows to score")
+
 @router.post("/")
 async def get_recommendations(county_data: CountyData):
     """
@@ -56,7 +65,7 @@ async def get_recommendations(county_data: CountyData):
             "source": "rule_engine"
         }
         
-        logger.info(f"Generated recommendations for {county_data.county_name}")
+        logger.info("Generated recommendations", extra={"county": county_data.county_name})
         
         return {
             "status": "success",
@@ -64,9 +73,111 @@ async def get_recommendations(county_data: CountyData):
             "source": "rule_engine"
         }
     except Exception as e:
-        logger.error(f"Error generating recommendations: {str(e)}")
+        logger.error(f"Error generating recommendations: {str(e)}", extra={"county": county_data.county_name})
         raise HTTPException(status_code=500, detail=f"Failed to generate recommendations: {str(e)}")
 
+@router.post("/batch")
+async def get_batch_recommendations(request: BatchCountyRequest):
+    """
+    Score many counties with the planner model in one vectorized call.
+    Returns priority score, cluster and recommended solution per row, in input order.
+    """
+    try:
+        planner = planner_registry.require()
+        # Columnar frame straight from the validated rows, without a dict per county
+        frame = pd.DataFrame({
+            field: [getattr(county, field) for county in request.counties]
+            for field in CountyData.model_fields
+        })
+        scores = planner.predict_batch(frame)
+    except PlannerModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error scoring county batch: {str(e)}", extra={"rows": len(request.counties)})
+        raise HTTPException(status_code=500, detail=f"Failed to score counties: {str(e)}")
+    return _scores_response(frame['county_name'].tolist(), scores, planner)
+
+def _scores_response(county_names: List[str], scores: Dict[str, np.ndarray], planner, **extra) -> JSONResponse:
+    """Per-county planner scores plus a summary, as plain JSON"""
+    solutions, counts = np.unique(scores['recommended_solution'], return_counts=True)
+    clusters, cluster_counts = np.unique(scores['cluster'], return_counts=True)
+    results = [
+        {
+            "county_name": county_name,
+            "priority_score": score,
+            "cluster": cluster,
+            "energy_deficit": deficit,
+            "recommended_solution": solution,
+        }
+        for county_name, score, cluster, deficit, solution in zip(
+            county_names,
+            scores['priority_score'].tolist(),
+            scores['cluster'].tolist(),
+            scores['energy_deficit'].tolist(),
+            scores['recommended_solution'].tolist(),
+        )
+    ]
+    # Everything is already a plain Python value, so skip FastAPI's recursive encoder
+    return JSONResponse({
+        "status": "success",
+        "count": len(results),
+        "results": results,
+        "summary": {
+            "avg_priority_score": float(scores['priority_score'].mean()),
+            "solutions": dict(zip(solutions.tolist(), counts.tolist())),
+            "cluster_distribution": {f"cluster_{c}": n for c, n in zip(clusters.tolist(), cluster_counts.tolist())},
+        },
+        "model_version": planner.model_version,
+        "source": "ai_model",
+        **extra
+    })
+
+@router.get("/counties/scores")
+async def score_all_counties():
+    """
+    Score every county in the current dataset with the planner model.
+    Features come from the feature store, so only counties whose data changed are re-engineered.
+    """
+    try:
+        planner = planner_registry.require()
+        snapshot = await feature_store.get(planner)
+        scores = planner.score_scaled(snapshot.scaled, snapshot.features(planner.feature_columns))
+    except PlannerModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error scoring counties: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to score counties: {str(e)}")
+    return _scores_response(snapshot.county_names, scores, planner, dataset_version=snapshot.dataset_version)
+
+@router.get("/counties/{county_name}/score")
+async def score_county(county_name: str):
+    """Planner model recommendation for one county of the current dataset, from the feature store"""
+    try:
+        planner = planner_registry.require()
+        snapshot = await feature_store.get(planner)
+    except PlannerModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    row = snapshot.row(county_name)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"County '{county_name}' not found")
+    scores = planner.score_scaled(snapshot.scaled[row:row + 1], snapshot.features(planner.feature_columns)[row:row + 1])
+    return {
+        "county_name": snapshot.county_names[row],
+        "priority_score": float(scores['priority_score'][0]),
+        "cluster": int(scores['cluster'][0]),
+        "energy_deficit": float(scores['energy_deficit'][0]),
+        "recommended_solution": str(scores['recommended_solution'][0]),
+        "model_version": planner.model_version,
+        "dataset_version": snapshot.dataset_version,
+        "source": "ai_model"
+    }
+
 @router.get("/counties/search")
 async def search_counties(q: str = ""):
     """
@@ -110,28 +221,22 @@ async def get_county_data(county_name: str):
         if not county:
             raise HTTPException(status_code=404, detail=f"County '{county_name}' not found")
         
-        # Calculate estimated values for form fields
-        # Blackout frequency based on reliability score (inverse relationship)
-        blackout_freq = max(0, (100 - county.avg_reliability_score) / 10)
-        
-        # Economic activity based on energy access and population density
-        economic_activity = min(100, county.energy_access_score * 0.8 + (county.population / 50000) * 20)
-        
-        # Grid distance estimation based on energy access (higher access = closer to grid)
-        grid_distance = max(0.5, (100 - county.energy_access_score) / 5)
-        
-        # Current kWh estimation based on population and energy access
-        current_kwh = county.population * county.energy_access_score * 0.1
+        # Estimated values for form fields (the same inputs the planner model is trained on)
+        snapshot = await feature_store.get()
+        row = snapshot.row(county.county_name)
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"County '{county_name}' not found")
+        features = dict(zip(ENGINEERED_COLUMNS, snapshot.engineered[row].tolist()))
         
         return {
             "county_name": county.county_name,
             "population": county.population,
             "hospitals": county.hospitals,
             "schools": county.schools,
-            "blackout_freq": round(blackout_freq, 1),
-            "economic_activity": round(economic_activity, 1),
-            "grid_distance": round(grid_distance, 1),
-            "current_kwh": round(current_kwh, 1),
+            "blackout_freq": round(features["blackout_freq"], 1),
+            "economic_activity": round(features["economic_activity"], 1),
+            "grid_distance": round(features["grid_distance"], 1),
+            "current_kwh": round(features["current_kwh"], 1),
             "solar_irradiance": county.avg_solar_irradiance,
             "energy_access_score": county.energy_access_score,
             "reliability_score": county.avg_reliability_score,
@@ -141,7 +246,7 @@ async def get_county_data(county_name: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting county data: {e}")
+        logger.error(f"Error getting county data: {e}", extra={"county": county_name})
         raise HTTPException(status_code=500, detail="Failed to get county data")
 
 @router.get("/model/info")
@@ -154,5 +259,44 @@ async def get_model_info():
         "timestamp": "2025-09-29T00:00:00Z",
         "description": "Kenya County Energy Recommendation System",
         "data_source": "Real Kenya County Energy Data",
-        "counties_available": 47
+        "counties_available": 47,
+        "planner_model": planner_registry.info(),
+        "feature_store": feature_store.status()
     }
+
+@router.post("/model/retrain", status_code=202)
+async def retrain_model(force: bool = False):
+    """
+    Retrain the planner model in a worker process on the current county data.
+    The candidate replaces the serving model only if it validates at least as well.
+    """
+    try:
+        job = await model_trainer.retrain(force=force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if job is None:
+        return {"status": "up_to_date", "training_data_hash": planner_registry.training_data_hash}
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.job_id}",
+        "stream_url": f"/api/jobs/{job.job_id}/stream"
+    }
+
+@router.get("/model/stages")
+async def get_stage_metrics(format: str = "json"):
+    """
+    Per-stage timings of the serving planner: calls, rows/sec, latency percentiles and
+    peak memory for each stage of preprocessing, prioritization and scoring.
+    format=prometheus returns the counters in the Prometheus text format.
+    """
+    if format == "prometheus":
+        return PlainTextResponse(planner_registry.timer.prometheus(), media_type="text/plain; version=0.0.4")
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'prometheus'")
+    return planner_registry.timer.snapshot()
+
+@router.get("/model/training")
+async def get_training_status():
+    """Running retraining job, serving model and the training time and metrics of recent candidates"""
+    return model_trainer.status()
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.services.job_manager import job_manager, encode_sse, encode_ndjson
+
+router = APIRouter()
+
+@router.get("/")
+async def list_jobs():
+    """List recent background jobs"""
+    return [job.snapshot(include_result=False) for job in job_manager.jobs.values()]
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Get job status, and the full result once completed"""
+    try:
+        return job_manager.get(job_id).snapshot()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{job_id}/stream")
+async def stream_job(job_id: str, format: str = "sse", last_event_id: Optional[int] = Header(None)):
+    """
+    Stream job progress as Server-Sent Events (default) or NDJSON (?format=ndjson).
+    Each frame only carries the partial results completed since the previous frame;
+    reconnecting SSE clients resume after their Last-Event-ID.
+    """
+    try:
+        job_manager.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if format == "ndjson":
+        encode, media_type = encode_ndjson, "application/x-ndjson"
+    elif format == "sse":
+        encode, media_type = encode_sse, "text/event-stream"
+    else:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {format}")
+
+    async def frames():
+        async for event in job_manager.stream(job_id, last_seq=last_event_id if last_event_id is not None else -1):
+            yield encode(event)
+
+    return StreamingResponse(
+        frames(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,11 +1,24 @@
 from fastapi import APIRouter, HTTPException, Body
 from typing import List, Dict, Any
 from app.models.minigrid import MiniGrid, MiniGridSimulation
+from app.services.fleet_simulation import fleet_simulation_service, site_demand_kw
+from app.services.job_manager import job_manager
+from app.services.solar_resource import solar_resource
+from app.services.battery_degradation import assess_degradation
+from app.services.dispatch import optimize_dispatch, DEFAULT_DISPATCH
+from app.services.lifecycle import evaluate_lifecycle, expand_scenarios, DEFAULT_ASSUMPTIONS
+import numpy as np
+import asyncio
 import random
-import math
 from datetime import datetime
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _round_or_none(value, digits: int):
+    """Round a NumPy scalar for JSON, mapping NaN and infinity (e.g. no IRR, no energy served) to None"""
+    return round(float(value), digits) if np.isfinite(value) else None
 
 @router.get("/", response_model=List[MiniGrid])
 async def get_minigrids():
@@ -24,24 +37,23 @@ async def simulate_minigrid(config: Dict[str, Any] = Body(...)):
         location = config.get("location", "Unknown")
         
         # New: County-specific parameters
-        solar_irradiance = config.get("solar_irradiance_kwh_m2") or 6.0
+        solar_irradiance = config.get("solar_irradiance_kwh_m2")
         blackout_hours = config.get("daily_blackout_hours") or 2.0
         grid_distance = config.get("grid_distance_km") or 50.0
         priority_facilities = config.get("priority_facilities") or {"hospitals": 5, "schools": 20}
         
+        # Cached typical-year irradiance (kW/m²) for the county and day being simulated
+        day_profile = solar_resource.daily_profiles([config.get("county") or location], config.get("day_of_year"))[0]
+        # An explicit daily irradiance rescales the county profile to that total
+        irradiance_scale = solar_irradiance / float(day_profile.sum()) if solar_irradiance and day_profile.sum() > 0 else 1.0
+        
         # Generate 24-hour simulation data
         daily_forecast = []
         battery_soc = 80  # Start at 80% SOC
         
         for hour in range(24):
-            # Enhanced Solar generation curve using actual irradiance data
-            if 6 <= hour <= 18:
-                solar_factor = math.sin(math.pi * (hour - 6) / 12)
-                # Use actual solar irradiance from county data
-                irradiance_factor = solar_irradiance / 6.0  # Normalize to standard irradiance
-                generation_kw = solar_capacity_kw * solar_factor * irradiance_factor * random.uniform(0.85, 1.0)
-            else:
-                generation_kw = 0
+            # Solar generation from the county's solar-position and cloud-cover profile
+            generation_kw = solar_capacity_kw * float(day_profile[hour]) * irradiance_scale * random.uniform(0.85, 1.0)
                 
             # Enhanced demand curve including priority facilities
             base_household_demand = households_served * 0.5  # 0.5kW average per household
@@ -83,6 +95,9 @@ async def simulate_minigrid(config: Dict[str, Any] = Body(...)):
         total_demand = sum(f["demand_kw"] for f in daily_forecast)
         efficiency_score = min(100, (total_generation / total_demand) * 90) if total_demand > 0 else 0
         
+        # Battery wear from rainflow-counted cycling plus calendar ageing
+        wear = assess_degradation([f["battery_soc"] for f in daily_forecast])
+        
         # Calculate cost savings
         diesel_cost_per_kwh = 0.25  # $0.25 per kWh for diesel
         cost_savings_usd = total_demand * diesel_cost_per_kwh * 0.8  # 80% savings
@@ -96,6 +111,11 @@ async def simulate_minigrid(config: Dict[str, Any] = Body(...)):
             "cost_savings_usd": round(cost_savings_usd, 2),
             "total_generation_kwh": round(total_generation, 2),
             "total_demand_kwh": round(total_demand, 2),
+            "battery_health": {
+                "equivalent_full_cycles_per_year": round(float(wear["equivalent_full_cycles_per_year"][0]), 1),
+                "capacity_fade_first_year_pct": round(float(wear["capacity_fade_first_year"][0]) * 100, 2),
+                "replacement_year": _round_or_none(wear["replacement_year"][0], 1)
+            },
             "recommendations": [
                 "Optimize battery charging during peak solar hours (10:00-14:00)",
                 "Consider demand-side management for evening peak loads",
@@ -103,10 +123,182 @@ async def simulate_minigrid(config: Dict[str, Any] = Body(...)):
             ]
         }
     except Exception as e:
-        print(f"Simulation error: {str(e)}")
-        print(f"Config received: {config}")
+        logger.error(f"Simulation error: {str(e)} (config: {config})")
         raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
 
+@router.post("/fleet-simulate")
+async def simulate_fleet(fleet_config: Dict[str, Any] = Body(...)):
+    """Simulate a mini-grid in many counties at once and aggregate nationally"""
+    
+    try:
+        sites = await fleet_simulation_service.build_sites(
+            sites=fleet_config.get("sites"),
+            priority_threshold=fleet_config.get("priority_threshold")
+        )
+        # Large fleets are sharded across processes, so keep the event loop free
+        return await asyncio.to_thread(fleet_simulation_service.simulate, sites, fleet_config.get("seed"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Fleet simulation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Fleet simulation failed: {str(e)}")
+
+@router.post("/fleet-simulate/jobs", status_code=202)
+async def submit_fleet_simulation(fleet_config: Dict[str, Any] = Body(...)):
+    """Start a fleet simulation in the background and return its progress stream"""
+    
+    try:
+        sites = await fleet_simulation_service.build_sites(
+            sites=fleet_config.get("sites"),
+            priority_threshold=fleet_config.get("priority_threshold")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not sites:
+        raise HTTPException(status_code=400, detail="Fleet simulation requires at least one site")
+    
+    job = job_manager.submit("fleet", fleet_simulation_service.simulate, sites, fleet_config.get("seed"))
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "sites": len(sites),
+        "status_url": f"/api/jobs/{job.job_id}",
+        "stream_url": f"/api/jobs/{job.job_id}/stream"
+    }
+
+@router.post("/dispatch")
+async def optimize_minigrid_dispatch(dispatch_request: Dict[str, Any] = Body(...)):
+    """Least-cost hourly battery and diesel schedule for every day of a simulation period"""
+    
+    def setting(key: str, default):
+        # Explicit zeros are kept; only missing or null values take the default
+        value = dispatch_request.get(key)
+        return default if value is None else value
+    
+    try:
+        solar_capacity_kw = float(setting("solar_capacity_kw", 50))
+        battery_capacity_kwh = float(setting("battery_capacity_kwh", 200))
+        diesel_capacity_kw = float(setting("diesel_capacity_kw", 30))
+        households_served = int(setting("households_served", 100))
+        days = int(setting("days", 365))
+        start_day = int(setting("start_day", 1))
+        detail_day = int(setting("detail_day", 0))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Capacities, households_served, days, start_day and detail_day must be numbers")
+    priority_facilities = setting("priority_facilities", {"hospitals": 5, "schools": 20})
+    location = dispatch_request.get("county") or dispatch_request.get("location", "Unknown")
+    parameters = dispatch_request.get("parameters") or {}
+    
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    if not 1 <= start_day <= 366:
+        raise HTTPException(status_code=400, detail="start_day must be between 1 and 366")
+    if min(solar_capacity_kw, battery_capacity_kwh, diesel_capacity_kw, households_served) < 0:
+        raise HTTPException(status_code=400, detail="Capacities and households_served cannot be negative")
+    if not isinstance(priority_facilities, dict) or not isinstance(parameters, dict):
+        raise HTTPException(status_code=400, detail="priority_facilities and parameters must be objects")
+    
+    try:
+        rng = np.random.default_rng(dispatch_request.get("seed"))
+        pv_kw = solar_resource.hourly_window([location], (start_day - 1) * 24, days * 24)[0].reshape(days, 24)
+        pv_kw = solar_capacity_kw * pv_kw * rng.uniform(0.85, 1.0, (days, 24))
+        load_kw = site_demand_kw(households_served, priority_facilities.get("hospitals", 0),
+                                 priority_facilities.get("schools", 0))
+        load_kw = load_kw * rng.uniform(0.9, 1.1, (days, 24))
+        result = await asyncio.to_thread(
+            optimize_dispatch, load_kw, pv_kw, battery_capacity_kwh, diesel_capacity_kw, **parameters
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    detail_day = min(max(detail_day, 0), days - 1)
+    hourly_schedule = [
+        {
+            "hour": hour,
+            "generation_kw": round(float(pv_kw[detail_day, hour]), 2),
+            "demand_kw": round(float(load_kw[detail_day, hour]), 2),
+            **{key: round(float(result[key][detail_day, hour]), 2) for key in
+               ("battery_charge_kw", "battery_discharge_kw", "diesel_kw", "unserved_kw", "curtailed_kw", "battery_soc")}
+        }
+        for hour in range(24)
+    ]
+    daily_summary = [
+        {
+            "day_of_year": (start_day - 1 + day) % 365 + 1,
+            "diesel_kwh": round(float(result["diesel_kwh"][day]), 2),
+            "fuel_litres": round(float(result["fuel_litres_total"][day]), 2),
+            "unserved_kwh": round(float(result["unserved_kwh"][day]), 2),
+            "renewable_fraction": round(float(result["renewable_fraction"][day]), 4)
+        }
+        for day in range(days)
+    ]
+    
+    total_demand = float(load_kw.sum())
+    total_diesel = float(result["diesel_kwh"].sum())
+    total_served = total_demand - float(result["unserved_kwh"].sum())
+    return {
+        "location": solar_resource.resolve_county(location),
+        "days": days,
+        "parameters": {**DEFAULT_DISPATCH, **parameters},
+        "totals": {
+            "demand_kwh": round(total_demand, 2),
+            "solar_kwh": round(float(pv_kw.sum()), 2),
+            "diesel_kwh": round(total_diesel, 2),
+            "fuel_litres": round(float(result["fuel_litres_total"].sum()), 2),
+            "fuel_cost_usd": round(float(result["fuel_cost"].sum()), 2),
+            "unserved_kwh": round(float(result["unserved_kwh"].sum()), 2),
+            "curtailed_kwh": round(float(result["curtailed_kwh"].sum()), 2),
+            "renewable_fraction": round(max(0.0, 1 - total_diesel / total_served), 4) if total_served > 0 else 0
+        },
+        "daily_summary": daily_summary,
+        "detail_day": daily_summary[detail_day]["day_of_year"],
+        "hourly_schedule": hourly_schedule
+    }
+
+@router.post("/lifecycle")
+async def evaluate_minigrid_lifecycle(lifecycle_request: Dict[str, Any] = Body(...)):
+    """Evaluate 20-25 year cash flows (NPV, IRR, LCOE, payback) for a grid of scenarios"""
+    
+    scenarios = dict(lifecycle_request.get("scenarios") or {})
+    assumptions = dict(lifecycle_request.get("assumptions") or {})
+    project_years = assumptions.pop("project_years", lifecycle_request.get("project_years", DEFAULT_ASSUMPTIONS["project_years"]))
+    include_cash_flows = bool(lifecycle_request.get("include_cash_flows", False))
+    
+    try:
+        params = expand_scenarios(scenarios, mode=lifecycle_request.get("mode", "grid"))
+        for key in ("annual_generation_kwh", "annual_demand_kwh", "pv_kw", "battery_kwh"):
+            if key not in params:
+                raise ValueError(f"scenarios must include {key}")
+        if "project_years" in params:
+            raise ValueError("project_years is shared by all scenarios; set it in assumptions")
+        result = evaluate_lifecycle(project_years=project_years, **{**assumptions, **params})
+        best = int(np.nanargmax(result["npv"]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    n_scenarios = len(result["npv"])
+    rows = []
+    for i in range(n_scenarios):
+        row = {name: float(values[i]) for name, values in params.items()}
+        row.update({
+            "capex": round(float(result["capex"][i]), 2),
+            "npv": round(float(result["npv"][i]), 2),
+            "irr": _round_or_none(result["irr"][i], 4),
+            "lcoe": _round_or_none(result["lcoe"][i], 4),
+            "payback_years": _round_or_none(result["payback_years"][i], 2),
+            "battery_replacements": int(result["battery_replacements"][i])
+        })
+        if include_cash_flows:
+            row["cash_flows"] = [round(float(v), 2) for v in result["cash_flows"][i]]
+        rows.append(row)
+    
+    return {
+        "project_years": int(project_years),
+        "scenarios_evaluated": n_scenarios,
+        "scenarios": rows,
+        "best_scenario": rows[best]
+    }
+
 @router.get("/presets")
 async def get_simulation_presets():
     """Get pre-configured simulation presets"""
@@ -163,6 +355,20 @@ async def minigrid_optimization(optimization_request: Dict[str, Any] = Body(...)
     demand_growth = optimization_request.get("demand_growth_rate", 0.05)  # 5% annual growth
     budget_constraint = optimization_request.get("budget_usd", 1000000)
     
+    # Lifecycle economics of the full upgrade package (solar + battery + smart controls)
+    package = evaluate_lifecycle(
+        annual_generation_kwh=50 * 5.0 * 365,
+        annual_demand_kwh=50 * 5.0 * 365,
+        pv_kw=50,
+        battery_kwh=200,
+        pv_cost_per_kw=1500,
+        battery_cost_per_kwh=600,
+        fixed_cost=25000,
+        demand_growth=demand_growth,
+        tariff_per_kwh=0.30
+    )
+    annual_savings = float(package["cash_flows"][0, 1])
+    
     # Generate optimization recommendations
     recommendations = {
         "county": county,
@@ -212,11 +418,13 @@ async def minigrid_optimization(optimization_request: Dict[str, Any] = Body(...)
             }
         ],
         "financial_analysis": {
-            "total_investment_required": 220000,
-            "within_budget": budget_constraint >= 220000,
-            "annual_savings": 28000,
-            "net_present_value": 185000,
-            "internal_rate_of_return": 0.18
+            "total_investment_required": round(float(package["capex"][0]), 2),
+            "within_budget": budget_constraint >= float(package["capex"][0]),
+            "annual_savings": round(annual_savings, 2),
+            "net_present_value": round(float(package["npv"][0]), 2),
+            "internal_rate_of_return": _round_or_none(package["irr"][0], 4),
+            "lcoe_usd_per_kwh": _round_or_none(package["lcoe"][0], 4),
+            "payback_years": _round_or_none(package["payback_years"][0], 1)
         },
         "implementation_timeline": {
             "phase_1": "Solar expansion (3 months)",
@@ -9,7 +9,7 @@ from functools import lru_cache
 import logging
 
 # Import models and utilities
-from app.models.county_energy_model import EnergyPlanner
+from app.services.model_registry import planner_registry
 from app.utils.recommendation_engine import RuleBasedEngine
 from app.services.data_service import DataService
 from app.services.ai_agent import ai_agent, CountyAnalysisRequest
@@ -17,8 +17,7 @@ from app.services.ai_agent import ai_agent, CountyAnalysisRequest
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize engines and services
-planner = EnergyPlanner()
+# Initialize engines and services; the planner model is loaded at startup (see main.lifespan)
 rule_engine = RuleBasedEngine()
 data_service = DataService()
 
@@ -80,7 +79,7 @@ async def get_recommendations(
         # Try AI model first if enabled
         if use_ai:
             try:
-                result = planner.get_recommendations(input_data)
+                result = planner_registry.require().get_recommendations(input_data)
                 source = "ai_model"
                 logger.info(f"AI recommendation generated for {county_data.county_name}")
             except Exception as ai_error:
@@ -202,10 +201,10 @@ async def prioritize_counties():
     Get prioritized list of counties
     """
     try:
-        planner = recommendation_app.planner_instance
+        planner = planner_registry.planner
         
         if not planner:
-            raise HTTPException(status_code=503, detail="Recommendation service not available")
+            raise HTTPException(status_code=503, detail=f"Recommendation model {planner_registry.status}: {planner_registry.error}")
             
         # Get prioritized counties
         result = planner.get_priority_counties()
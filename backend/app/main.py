@@ -1,13 +1,32 @@
 # backend/app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import counties, minigrids, dashboard, analytics, county_recommendations, alerts
+from app.api import counties, minigrids, dashboard, analytics, county_recommendations, alerts, jobs
+from app.services.model_registry import planner_registry
+from app.services.model_training import model_trainer
+from app.utils.logging_setup import RequestLogContext, configure_logging
 from config.settings import settings
 
+# Records are written by a background thread from here on (see app.utils.logging_setup)
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the persisted planner before serving, so the first request can predict
+    if not planner_registry.load() and settings.PLANNER_MODEL_REQUIRED:
+        raise RuntimeError(f"Planner model {planner_registry.status}: {planner_registry.error}")
+    await model_trainer.start()
+    yield
+    await model_trainer.stop()
+
+
 app = FastAPI(
     title="Kenya Energy Dashboard API",
     description="AI-Driven Renewable Energy Allocation System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware to allow frontend connections
@@ -20,6 +39,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tags every record logged while handling a request with its route
+app.add_middleware(RequestLogContext, slow_request_ms=settings.LOG_SLOW_REQUEST_MS)
+
 # Include routers
 app.include_router(counties.router, prefix="/api/counties", tags=["counties"])
 app.include_router(minigrids.router, prefix="/api/minigrids", tags=["minigrids"])
@@ -27,6 +49,7 @@ app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"]
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(county_recommendations.router, prefix="/api/recommendations", tags=["recommendations"])
 app.include_router(alerts.router, prefix="/api/alerts", tags=["alerts"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 
 @app.get("/")
 async def root():
@@ -41,6 +64,7 @@ async def root():
             "analytics": "/api/analytics/",
             "recommendations": "/api/recommendations/",
             "alerts": "/api/alerts/",
+            "jobs": "/api/jobs/",
             "docs": "/docs"
         }
     }
@@ -51,7 +75,8 @@ async def health_check():
         "status": "healthy", 
         "message": "API is running smoothly",
         "ai_service_status": settings.ai_service_status,
-        "has_ai_keys": settings.has_ai_keys
+        "has_ai_keys": settings.has_ai_keys,
+        "planner_model_status": planner_registry.status
     }
 
 if __name__ == "__main__":
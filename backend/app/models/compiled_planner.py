@@ -0,0 +1,380 @@
+"""
+Compiled County Planner
+Flattens a trained planner (scaler, RandomForest, KMeans) into contiguous NumPy arrays
+and evaluates it without scikit-learn
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+COMPILED_FORMAT_VERSION = 2
+COMPILED_SUFFIX = ".planner"
+MANIFEST_NAME = "manifest.json"
+# Every array is stored in the dtype and layout the evaluator reads, so a memory map needs no copy
+ARRAY_DTYPES = {
+    "scaler_mean": np.float64,
+    "scaler_scale": np.float64,
+    "tree_feature": np.intp,
+    "tree_threshold": np.float64,
+    "tree_children": np.intp,
+    "tree_value": np.float64,
+    "tree_roots": np.intp,
+    "cluster_centers": np.float64,
+}
+ROW_CHUNK = 512  # rows per traversal pass; keeps the (trees, rows) index matrices cache-sized
+
+
+class CompiledScaler:
+    """StandardScaler.transform from its fitted mean and scale"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X) -> np.ndarray:
+        # Same float64 operations, in the same order, as StandardScaler.transform
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+class CompiledForest:
+    """
+    RandomForestRegressor.predict over all trees at once
+
+    Nodes of every tree live in one set of arrays. Leaves point to themselves with
+    an infinite threshold, so every row can take max_depth steps in lockstep: each
+    step is a few flat gathers over a (trees, rows) matrix of node indices.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int):
+        # Child of node i is children[2 * i + (x <= threshold)]: right first, then left
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = threshold
+        self.children = np.asarray(children, dtype=np.intp)
+        self.value = value
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf index (into the flat node arrays) of every tree for every row, shaped (trees, rows)"""
+        # sklearn compares float32 features against float64 thresholds; NaN goes right
+        X = np.asarray(X, dtype=np.float32)
+        leaves = np.empty((len(self.roots), len(X)), dtype=np.intp)
+        for start in range(0, len(X), ROW_CHUNK):
+            chunk = X[start:start + ROW_CHUNK]
+            columns = np.ascontiguousarray(chunk.T).ravel()
+            rows = np.arange(len(chunk))
+            node = np.repeat(self.roots[:, None], len(chunk), axis=1)
+            for _ in range(self.max_depth):
+                go_left = columns.take(self.feature.take(node) * len(chunk) + rows) <= self.threshold.take(node)
+                node = self.children.take(node * 2 + go_left)
+            leaves[:, start:start + ROW_CHUNK] = node
+        return leaves
+
+    def predict(self, X) -> np.ndarray:
+        leaf_values = self.value.take(self.apply(X))
+        # Accumulate tree by tree and divide once, as sklearn does
+        total = np.zeros(leaf_values.shape[1])
+        for tree_values in leaf_values:
+            total += tree_values
+        return total / len(leaf_values)
+
+    def score(self, X, y) -> float:
+        """R² of the predictions, like RegressorMixin.score"""
+        y = np.asarray(y, dtype=np.float64)
+        residual = ((y - self.predict(X)) ** 2).sum()
+        total = ((y - y.mean()) ** 2).sum()
+        return float(1 - residual / total) if total else 0.0
+
+
+class CompiledKMeans:
+    """KMeans.predict: nearest centroid, using the same ||c||² - 2x·c distance sklearn ranks by"""
+
+    def __init__(self, centers: np.ndarray):
+        self.cluster_centers_ = centers
+        self._center_norms = (centers ** 2).sum(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        return np.argmin(self._center_norms[None, :] - 2 * X @ self.cluster_centers_.T, axis=1).astype(np.int32)
+
+
+def export_arrays(planner) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Flatten a trained CountyEnergyPlanner into named arrays and JSON-serializable metadata"""
+    if not planner.is_trained:
+        raise ValueError("Cannot export an untrained model")
+
+    trees = [estimator.tree_ for estimator in planner.priority_model.estimators_]
+    sizes = np.array([tree.node_count for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    feature, threshold, children, value = [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        own = np.arange(tree.node_count) + offset
+        leaf = tree.children_left == -1
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(np.where(leaf, np.inf, tree.threshold))
+        right = np.where(leaf, own, tree.children_right + offset)
+        left = np.where(leaf, own, tree.children_left + offset)
+        children.append(np.stack([right, left], axis=1).ravel())
+        value.append(tree.value[:, 0, 0])
+
+    arrays = {
+        "scaler_mean": planner.scaler.mean_,
+        "scaler_scale": planner.scaler.scale_,
+        "tree_feature": np.concatenate(feature),
+        "tree_threshold": np.concatenate(threshold),
+        "tree_children": np.concatenate(children),
+        "tree_value": np.concatenate(value),
+        "tree_roots": offsets,
+        "cluster_centers": planner.cluster_model.cluster_centers_,
+    }
+    metadata = {
+        "format_version": COMPILED_FORMAT_VERSION,
+        "feature_columns": planner.feature_columns,
+        "config": planner.config,
+        "model_version": planner.model_version,
+        "last_trained": planner.last_trained.isoformat() if planner.last_trained else None,
+        "training_history": planner.training_history,
+        "tree_max_depth": int(max(tree.max_depth for tree in trees)),
+    }
+    return {name: np.ascontiguousarray(arrays[name], dtype=dtype) for name, dtype in ARRAY_DTYPES.items()}, metadata
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _combined_checksum(files: Dict[str, Dict[str, Any]]) -> str:
+    return hashlib.sha256("".join(files[name]["sha256"] for name in sorted(files)).encode()).hexdigest()
+
+
+def save_compiled(planner, path: str) -> Dict[str, Any]:
+    """
+    Write the flattened planner as a directory of .npy files plus manifest.json
+
+    Each artifact is written to its own versioned directory beside path
+    (path-<checksum>) and path itself is a symlink that os.replace swaps in one
+    step, so path always names a complete artifact, old or new, even if the
+    process dies mid-save. The previous version is kept for loaders that already
+    resolved the link; older ones are removed. Returns the manifest.
+    """
+    path = path.rstrip(os.sep)
+    arrays, metadata = export_arrays(planner)
+    staging = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    files = {}
+    for name, array in arrays.items():
+        filename = f"{name}.npy"
+        np.save(os.path.join(staging, filename), array)
+        files[name] = {"file": filename, "dtype": array.dtype.str, "shape": list(array.shape),
+                       "sha256": _file_sha256(os.path.join(staging, filename))}
+    manifest = {**metadata, "arrays": files, "checksum": _combined_checksum(files)}
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    version = f"{path}-{manifest['checksum'][:12]}"
+    if os.path.isdir(version):
+        shutil.rmtree(staging)  # same arrays already published under this checksum
+    else:
+        os.rename(staging, version)
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+
+    if os.path.isdir(path) and not os.path.islink(path):
+        # Artifact from before versioned directories: keep it beside the link until it is pruned
+        legacy = f"{path}-legacy"
+        shutil.rmtree(legacy, ignore_errors=True)
+        os.rename(path, legacy)
+        previous = legacy
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, path)
+
+    keep = {os.path.realpath(version), previous}
+    prefix = os.path.basename(path) + "-"
+    parent = os.path.dirname(path) or "."
+    for entry in os.listdir(parent):
+        candidate = os.path.join(parent, entry)
+        if (entry.startswith(prefix) and os.path.isdir(candidate) and not os.path.islink(candidate)
+                and os.path.realpath(candidate) not in keep
+                and os.path.isfile(os.path.join(candidate, MANIFEST_NAME))):
+            # Workers that already mapped these files keep them until they reload
+            shutil.rmtree(candidate, ignore_errors=True)
+    return manifest
+
+
+def is_compiled_artifact(path: str) -> bool:
+    return path.rstrip(os.sep).endswith(COMPILED_SUFFIX) or os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def read_manifest(path: str, verify: bool = True) -> Dict[str, Any]:
+    """
+    Manifest of a compiled artifact, checked without loading any array
+
+    Checks the format version and that every array file is present with the
+    declared dtype and shape (from the .npy header). With verify, the files are
+    also hashed against their checksums.
+    """
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.isfile(manifest_path):
+        raise FileNotFoundError(f"Model file not found: {manifest_path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != COMPILED_FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled planner format: {manifest.get('format_version')}")
+    files = manifest.get("arrays", {})
+    missing = [name for name in ARRAY_DTYPES if name not in files]
+    if missing:
+        raise ValueError(f"Manifest lists no file for arrays: {missing}")
+    if manifest.get("checksum") != _combined_checksum(files):
+        raise ValueError("Manifest checksum does not match its array checksums")
+
+    for name in ARRAY_DTYPES:
+        entry = files[name]
+        array_path = os.path.join(path, entry["file"])
+        if not os.path.isfile(array_path):
+            raise ValueError(f"Array file missing: {entry['file']}")
+        header = np.load(array_path, mmap_mode="r")
+        if header.dtype.str != entry["dtype"] or list(header.shape) != entry["shape"]:
+            raise ValueError(f"{entry['file']} is {header.dtype.str}{list(header.shape)}, "
+                             f"manifest says {entry['dtype']}{entry['shape']}")
+        if np.dtype(entry["dtype"]) != np.dtype(ARRAY_DTYPES[name]):
+            raise ValueError(f"{entry['file']} has dtype {entry['dtype']}; this platform needs "
+                             f"{np.dtype(ARRAY_DTYPES[name]).str}")
+        if verify and _file_sha256(array_path) != entry["sha256"]:
+            raise ValueError(f"{entry['file']} does not match its checksum")
+    return manifest
+
+
+def load_compiled(path: str, mmap: bool = True, verify: bool = True) -> Dict[str, Any]:
+    """
+    Compiled components and metadata from a directory written by save_compiled
+
+    With mmap the arrays are read-only memory maps of the files, so every worker
+    process loading the same artifact shares one copy in the page cache.
+    """
+    # Resolve the published link once, so a concurrent save cannot mix two versions
+    path = os.path.realpath(path)
+    manifest = read_manifest(path, verify=verify)
+    arrays = {name: np.load(os.path.join(path, entry["file"]), mmap_mode="r" if mmap else None)
+              for name, entry in manifest["arrays"].items()}
+    return {
+        "scaler": CompiledScaler(arrays["scaler_mean"], arrays["scaler_scale"]),
+        "priority_model": CompiledForest(
+            arrays["tree_feature"], arrays["tree_threshold"], arrays["tree_children"],
+            arrays["tree_value"], arrays["tree_roots"], manifest["tree_max_depth"]
+        ),
+        "cluster_model": CompiledKMeans(arrays["cluster_centers"]),
+        "metadata": manifest,
+    }
+
+
+def _cold_start(code: str) -> Dict[str, float]:
+    """Run code in a fresh interpreter and report its wall time and peak RSS"""
+    import os
+    import subprocess
+    import time
+
+    backend = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # Peak RSS from VmHWM: on Linux ru_maxrss survives exec and would report this process's peak
+    code = ("import json, time; started = time.perf_counter()\n" + code +
+            "\nelapsed = time.perf_counter() - started\n"
+            "hwm = [line.split()[1] for line in open('/proc/self/status') if line.startswith('VmHWM')]\n"
+            "print(json.dumps({'load_and_first_batch_s': round(elapsed, 3),"
+            " 'max_rss_mb': round(int(hwm[0]) / 1024, 1) if hwm else None}))")
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True)
+    return {**json.loads(output.stdout.strip().splitlines()[-1]),
+            "process_wall_s": round(time.perf_counter() - started, 3)}
+
+
+def benchmark(model_path: str, compiled_path: Optional[str] = None, rows: int = 10000) -> Dict[str, Any]:
+    """Export model_path, check the compiled evaluator against sklearn, and compare cold start, RSS and latency"""
+    import time
+    from app.models.county_energy_model import CountyEnergyPlanner
+
+    compiled_path = compiled_path or model_path.rsplit(".", 1)[0] + COMPILED_SUFFIX
+    planner = CountyEnergyPlanner()
+    planner.load_model(model_path)
+    save_compiled(planner, compiled_path)
+    compiled = load_compiled(compiled_path)
+
+    rng = np.random.default_rng(0)
+    raw = planner.scaler.mean_ + planner.scaler.scale_ * rng.standard_normal((rows, len(planner.feature_columns)))
+    # Plus rows sitting exactly on split thresholds, where float32/float64 handling matters
+    forest = compiled["priority_model"]
+    internal = np.flatnonzero(np.isfinite(forest.threshold))
+    on_threshold = np.tile(planner.scaler.mean_, (len(internal), 1))
+    on_threshold[np.arange(len(internal)), forest.feature[internal]] = (
+        forest.threshold[internal].astype(np.float32) * planner.scaler.scale_[forest.feature[internal]]
+        + planner.scaler.mean_[forest.feature[internal]])
+    checked = np.vstack([raw, on_threshold])
+    planner.priority_model.set_params(n_jobs=1)  # sequential accumulation, so the sums are comparable bit for bit
+    scaled_sklearn = planner.scaler.transform(checked)
+    scaled_compiled = compiled["scaler"].transform(checked)
+    parity = {
+        "scaler_identical": bool(np.array_equal(scaled_sklearn, scaled_compiled)),
+        "forest_identical": bool(np.array_equal(planner.priority_model.predict(scaled_sklearn),
+                                                compiled["priority_model"].predict(scaled_compiled))),
+        "forest_max_abs_diff": float(np.abs(planner.priority_model.predict(scaled_sklearn)
+                                            - compiled["priority_model"].predict(scaled_compiled)).max()),
+        "kmeans_identical": bool(np.array_equal(planner.cluster_model.predict(scaled_sklearn),
+                                                compiled["cluster_model"].predict(scaled_compiled))),
+    }
+
+    def latency(score, batch: np.ndarray, repeats: int = 20) -> float:
+        score(batch)
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            score(batch)
+            timings.append(time.perf_counter() - started)
+        return round(float(np.median(timings)) * 1000, 3)
+
+    sklearn_score = lambda X: (lambda s: (planner.priority_model.predict(s), planner.cluster_model.predict(s)))(
+        planner.scaler.transform(X))
+    compiled_score = lambda X: (lambda s: (compiled["priority_model"].predict(s), compiled["cluster_model"].predict(s)))(
+        compiled["scaler"].transform(X))
+    batches = {}
+    for size in (1, 47, rows):
+        batches[str(size)] = {"sklearn_ms": latency(sklearn_score, raw[:size]),
+                              "compiled_ms": latency(compiled_score, raw[:size])}
+
+    # Import, load and score one 47-county batch in a fresh interpreter
+    cold = {
+        "sklearn": _cold_start(
+            "import numpy as np; from app.models.county_energy_model import CountyEnergyPlanner\n"
+            f"p = CountyEnergyPlanner(); p.load_model({model_path!r}); s = p.scaler.transform(np.zeros((47, 7)))\n"
+            "p.priority_model.predict(s); p.cluster_model.predict(s)"
+        ),
+        "compiled": _cold_start(
+            "import numpy as np; from app.models.compiled_planner import load_compiled\n"
+            f"c = load_compiled({compiled_path!r}); s = c['scaler'].transform(np.zeros((47, 7)))\n"
+            "c['priority_model'].predict(s); c['cluster_model'].predict(s)"
+        ),
+    }
+    return {"compiled_path": compiled_path, "parity": parity, "latency_ms": batches, "cold_start": cold}
+
+
+if __name__ == "__main__":
+    # python -m app.models.compiled_planner app/models/county_energy_model_kaggle.pkl [output.planner]
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m app.models.compiled_planner MODEL.pkl [OUTPUT.planner]")
+    print(json.dumps(benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None), indent=2))
@@ -5,32 +5,38 @@ Designed for seamless integration with existing systems
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.cluster import KMeans
-from sklearn.model_selection import cross_val_score, train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
-import joblib
 import logging
 from typing import Dict, List, Tuple, Optional, Union
 from datetime import datetime
 import json
+import hashlib
+import math
+import time
+from collections import OrderedDict, deque
 from pathlib import Path
+import platform
+from app.models.stage_timer import StageTimer, timed_operation
 import warnings
-import sqlalchemy as db
 warnings.filterwarnings('ignore')
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('county_planner.log'),
-        logging.StreamHandler()
-    ]
-)
+# scikit-learn and joblib are imported where they are used, so importing this
+# module (and the API routers that use it) does not pay for loading them.
+
+# Handlers are set up by the application (app.utils.logging_setup.configure_logging),
+# which writes records from a background thread; importing this module configures nothing
 logger = logging.getLogger(__name__)
 
+MODEL_ARTIFACT_KEYS = ['priority_model', 'scaler', 'cluster_model', 'feature_columns']
+FEATURE_COLUMNS = [
+    'population', 'hospitals', 'schools', 'blackout_freq',
+    'economic_activity', 'grid_distance', 'energy_deficit'
+]
+
+
+class ModelArtifactError(Exception):
+    """A persisted planner model cannot be used with the installed libraries"""
+
+
 class CountyEnergyPlanner:
     def __init__(self, config: Optional[Dict] = None, db_connection=None):
         """
@@ -47,142 +53,144 @@ class CountyEnergyPlanner:
         if config:
             self.config.update(config)
         
-        # Initialize models
-        self.priority_model = RandomForestRegressor(
-            n_estimators=self.config['model']['n_estimators'],
-            random_state=self.config['model']['random_state'],
-            max_depth=self.config['model']['max_depth'],
-            min_samples_split=self.config['model']['min_samples_split']
-        )
-        
-        self.scaler = StandardScaler()
-        self.cluster_model = KMeans(
-            n_clusters=self.config['clustering']['n_clusters'],
-            random_state=self.config['model']['random_state']
-        )
+        # Models are created by train_model or restored by load_model
+        self.priority_model = None
+        self.scaler = None
+        self.cluster_model = None
+        self.db_connection = db_connection
         
         # Model metadata
         self.model_version = "1.0.0"
         self.last_trained = None
         self.feature_columns = None
         self.is_trained = False
+        self.training_history: List[Dict] = []
+
+        # State for incremental updates, set by train_model
+        self.reference_profile: Optional[Dict] = None
+        self.cluster_counts: Optional[np.ndarray] = None
+        self.rows_seen = 0
         
-        # Results cache for performance
-        self._results_cache = {}
-        self._cache_timestamp = None
+        # Results cache keyed by input content and model version (LRU)
+        self._results_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._cache_stats = self._empty_cache_stats()
+
+        # Per-stage timings of preprocessing, prioritization and training (see StageTimer)
+        self.timer = StageTimer()
         
-        logger.info(f"CountyEnergyPlanner initialized with version {self.model_version}")
+        logger.debug(f"CountyEnergyPlanner initialized with version {self.model_version}")
     
     def _load_default_config(self) -> Dict:
-            """Load default configuration"""
-            return {
-                'model': {
-                    'n_estimators': 100,
-                    'random_state': 42,
-                    'max_depth': 10,
-                    'min_samples_split': 5
-                },
-                'clustering': {
-                    'n_clusters': 3
-                },
-                'data': {
-                    'required_columns': [
-                        'county_name', 'population', 'hospitals', 'schools',
-                        'blackout_freq', 'economic_activity', 'grid_distance',
-                        'current_kwh'
-                    ],
-                    'energy_per_capita': 50,
-                    'cache_duration_minutes': 30
-                },
-                'recommendations': {
-                    'solar_threshold': 15,  # km from grid
-                    'grid_extension_threshold': 10,  # km from grid
-                    'top_counties_count': 10
-                }
+        """Load default configuration"""
+        return {
+            'model': {
+                'n_estimators': 100,
+                'random_state': 42,
+                'max_depth': 10,
+                'min_samples_split': 5,
+                'max_trees': 300  # incremental updates drop the oldest trees beyond this (or n_estimators + new trees)
+            },
+            'clustering': {
+                'n_clusters': 3
+            },
+            'data': {
+                'required_columns': [
+                    'county_name', 'population', 'hospitals', 'schools',
+                    'blackout_freq', 'economic_activity', 'grid_distance',
+                    'current_kwh'
+                ],
+                'energy_per_capita': 50,
+                'cache_max_entries': 32
+            },
+            'recommendations': {
+                'solar_threshold': 15,  # km from grid
+                'grid_extension_threshold': 10,  # km from grid
+                'top_counties_count': 10
+            },
+            'drift': {
+                'bins': 10,
+                'psi_threshold': 0.2,  # per feature; above 0.2 is conventionally a significant shift
+                'r2_drop': 0.05  # allowed fall in R² on new rows versus the training test R²
             }
-    
+        }
+
+    def _build_estimators(self) -> None:
+        """Create untrained estimators from the current configuration"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.cluster import KMeans
+
+        self.priority_model = RandomForestRegressor(
+            n_estimators=self.config['model']['n_estimators'],
+            random_state=self.config['model']['random_state'],
+            max_depth=self.config['model']['max_depth'],
+            min_samples_split=self.config['model']['min_samples_split'],
+            max_features=self.config['model'].get('max_features', 1.0)
+        )
+        self.scaler = StandardScaler()
+        self.cluster_model = KMeans(
+            n_clusters=self.config['clustering']['n_clusters'],
+            random_state=self.config['model']['random_state']
+        )
+
     def validate_input_data(self, data: pd.DataFrame) -> Tuple[bool, List[str]]:
-            """Validate input data structure and content"""
-            errors = []
-            
-            # Check if DataFrame is empty
-            if data.empty:
-                errors.append("Input data is empty")
-                return False, errors
-            
-            # Check required columns
-            required_cols = self.config['data']['required_columns']
-            missing_cols = [col for col in required_cols if col not in data.columns]
-            if missing_cols:
-                errors.append(f"Missing required columns: {missing_cols}")
-            
-            # Check data types and ranges
-            numeric_cols = ['population', 'hospitals', 'schools', 'blackout_freq', 
-                        'economic_activity', 'grid_distance', 'current_kwh']
-            
-            for col in numeric_cols:
-                if col in data.columns:
-                    if not pd.api.types.is_numeric_dtype(data[col]):
-                        errors.append(f"Column {col} must be numeric")
-                    
-                    if data[col].min() < 0:
-                        errors.append(f"Column {col} contains negative values")
-            
-            # Check for duplicate counties
-            if 'county_name' in data.columns:
-                duplicates = data['county_name'].duplicated().sum()
-                if duplicates > 0:
-                    errors.append(f"Found {duplicates} duplicate county names")
-            
-            return len(errors) == 0, errors
-        
-        def preprocess_data(self, county_data: pd.DataFrame, fit_scaler: bool = True) -> Tuple[pd.DataFrame, List[str]]:
-            """
-            Preprocess county data with robust error handling
-            
-            Args:
-                county_data: Raw county data
-                fit_scaler: Whether to fit the scaler (True for training, False for prediction)
-            
-            Returns:
-                Preprocessed data and feature columns
-            """
-            try:
-                # Validate input
-                is_valid, errors = self.validate_input_data(county_data)
-                if not is_valid:
-                    raise ValueError(f"Data validation failed: {errors}")
-                
-                # Create a copy to avoid modifying original data
-                data = county_data.copy()
-                
-                # Handle missing values with different strategies
-                numeric_columns = data.select_dtypes(include=[np.number]).columns
-                
-                # For critical columns, use median; for others, use mean
-                critical_cols = ['population', 'current_kwh']
-                for col in numeric_columns:
-                    if col in critical_cols:
-                        data[col].fillna(data[col].median(), inplace=True)
-                    else:
-                        data[col].fillna(data[col].mean(), inplace=True)
-                
-                # Calculate energy deficit
-                data['energy_deficit'] = self.calculate_energy_deficit(data)
-                
-                # Define feature columns for model
-                feature_columns = [
-                    'population', 'hospitals', 'schools', 'blackout_freq',
-                    'economic_activity', 'grid_distance', 'energy_deficit'
-                ]
-                
-                # Ensure all feature columns exist
-                for col in feature_columns:
-                    if col not in data.columns:
-                        logger.warning(f"Missing feature column {col}, filling with zeros")
-                        data[col] = 0
-                
-                # Scale features
+        """Validate input data structure and content"""
+        errors = []
+
+        # Check if DataFrame is empty
+        if data.empty:
+            errors.append("Input data is empty")
+            return False, errors
+
+        # Check required columns
+        required_cols = self.config['data']['required_columns']
+        missing_cols = [col for col in required_cols if col not in data.columns]
+        if missing_cols:
+            errors.append(f"Missing required columns: {missing_cols}")
+
+        # Check data types and ranges
+        numeric_cols = ['population', 'hospitals', 'schools', 'blackout_freq', 
+                    'economic_activity', 'grid_distance', 'current_kwh']
+
+        for col in numeric_cols:
+            if col in data.columns:
+                if not pd.api.types.is_numeric_dtype(data[col]):
+                    errors.append(f"Column {col} must be numeric")
+
+                if data[col].min() < 0:
+                    errors.append(f"Column {col} contains negative values")
+
+        # Check for duplicate counties
+        if 'county_name' in data.columns:
+            duplicates = data['county_name'].duplicated().sum()
+            if duplicates > 0:
+                errors.append(f"Found {duplicates} duplicate county names")
+
+        return len(errors) == 0, errors
+
+    @timed_operation('preprocess_data')
+    def preprocess_data(self, county_data: pd.DataFrame, fit_scaler: bool = True,
+                        prepared: bool = False) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Preprocess county data with robust error handling
+
+        Args:
+            county_data: Raw county data
+            fit_scaler: Whether to fit the scaler (True for training, False for prediction)
+            prepared: county_data already went through _prepare_features (as rows from
+                the feature store do), so only scaling is left
+
+        Returns:
+            Preprocessed data and feature columns
+        """
+        try:
+            if prepared:
+                data, feature_columns = county_data, list(FEATURE_COLUMNS)
+            else:
+                data, feature_columns = self._prepare_features(county_data)
+
+            # Scale features
+            with self.timer.stage('scale', len(data)):
                 if fit_scaler:
                     scaled_features = self.scaler.fit_transform(data[feature_columns])
                     self.feature_columns = feature_columns
@@ -191,307 +199,755 @@ class CountyEnergyPlanner:
                         raise ValueError("Model must be trained before making predictions")
                     # Ensure same feature order as training
                     scaled_features = self.scaler.transform(data[self.feature_columns])
-                
-                # Create scaled DataFrame
-                scaled_df = pd.DataFrame(scaled_features, columns=feature_columns, index=data.index)
-                
-                # Add non-scaled columns back
-                for col in ['county_name']:
-                    if col in data.columns:
-                        scaled_df[col] = data[col].values
-                
-                logger.info(f"Data preprocessing completed for {len(data)} counties")
-                return scaled_df, feature_columns
-                
-            except Exception as e:
-                logger.error(f"Error in data preprocessing: {str(e)}")
-                raise
-        
-        def calculate_energy_deficit(self, county_data: pd.DataFrame) -> pd.Series:
-            """Calculate energy deficit with improved formula"""
-            try:
-                # Base energy need per capita
-                per_capita_need = self.config['data']['energy_per_capita']
-                
-                # Calculate total energy need
-                base_need = county_data['population'] * per_capita_need
-                
-                # Adjust for infrastructure (hospitals, schools need more energy)
-                infrastructure_multiplier = 1 + (county_data['hospitals'] + county_data['schools']) / 100
-                
-                # Adjust for economic activity
-                economic_multiplier = 1 + county_data['economic_activity'] / 100
-                
-                # Total energy need
-                total_need = base_need * infrastructure_multiplier * economic_multiplier
-                
-                # Energy deficit
-                deficit = total_need - county_data['current_kwh']
-                
-                # Ensure non-negative deficit
-                deficit = deficit.clip(lower=0)
-                
-                return deficit
-                
-            except Exception as e:
-                logger.error(f"Error calculating energy deficit: {str(e)}")
-                raise
-        
-        def train_model(self, training_data: pd.DataFrame) -> Dict:
-            """
-            Train the county prioritization model with validation
-            
-            Returns:
-                Training metrics and model performance
-            """
-            try:
-                logger.info("Starting model training...")
-                
-                # Preprocess data
-                processed_data, feature_cols = self.preprocess_data(training_data, fit_scaler=True)
-                
-                # Prepare features and target
-                X = processed_data[feature_cols]
-                y = processed_data['energy_deficit']
-                
-                # Split data for validation
-                X_train, X_test, y_train, y_test = train_test_split(
-                    X, y, test_size=0.2, random_state=self.config['model']['random_state']
-                )
-                
-                # Train priority model
+
+            # Create scaled DataFrame
+            scaled_df = pd.DataFrame(scaled_features, columns=feature_columns, index=data.index)
+
+            # Add non-scaled columns back
+            for col in ['county_name']:
+                if col in data.columns:
+                    scaled_df[col] = data[col].values
+
+            logger.debug("Data preprocessing completed", extra={'rows': len(data)})
+            return scaled_df, feature_columns
+
+        except Exception as e:
+            logger.error(f"Error in data preprocessing: {str(e)}")
+            raise
+
+    @timed_operation('prepare_features')
+    def _prepare_features(self, county_data: pd.DataFrame,
+                          fill_values: Optional[Dict[str, float]] = None) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Validate, fill missing values and derive the energy deficit (unscaled)
+
+        Missing values take fill_values, by default this frame's own (see _fill_values).
+        """
+        rows = len(county_data)
+        # Validate input
+        with self.timer.stage('validate', rows):
+            is_valid, errors = self.validate_input_data(county_data)
+        if not is_valid:
+            raise ValueError(f"Data validation failed: {errors}")
+
+        with self.timer.stage('fill_missing', rows):
+            # Create a copy to avoid modifying original data
+            data = county_data.copy()
+
+            # Handle missing values with different strategies
+            if fill_values is None:
+                fill_values = self._fill_values(data)
+            for col, value in fill_values.items():
+                data[col] = data[col].fillna(value)
+
+        # Calculate energy deficit
+        with self.timer.stage('energy_deficit', rows):
+            data['energy_deficit'] = self.calculate_energy_deficit(data)
+
+        # Define feature columns for model
+        feature_columns = list(FEATURE_COLUMNS)
+
+        # Ensure all feature columns exist
+        for col in feature_columns:
+            if col not in data.columns:
+                logger.warning(f"Missing feature column {col}, filling with zeros")
+                data[col] = 0
+
+        return data, feature_columns
+
+    @staticmethod
+    def _fill_values(county_data: pd.DataFrame) -> Dict[str, float]:
+        """Missing-value fill per numeric column"""
+        # For critical columns, use median; for others, use mean
+        critical_cols = ['population', 'current_kwh']
+        return {
+            col: county_data[col].median() if col in critical_cols else county_data[col].mean()
+            for col in county_data.select_dtypes(include=[np.number]).columns
+        }
+
+    def calculate_energy_deficit(self, county_data: pd.DataFrame) -> pd.Series:
+        """Calculate energy deficit with improved formula"""
+        try:
+            # Base energy need per capita
+            per_capita_need = self.config['data']['energy_per_capita']
+
+            # Calculate total energy need
+            base_need = county_data['population'] * per_capita_need
+
+            # Adjust for infrastructure (hospitals, schools need more energy)
+            infrastructure_multiplier = 1 + (county_data['hospitals'] + county_data['schools']) / 100
+
+            # Adjust for economic activity
+            economic_multiplier = 1 + county_data['economic_activity'] / 100
+
+            # Total energy need
+            total_need = base_need * infrastructure_multiplier * economic_multiplier
+
+            # Energy deficit
+            deficit = total_need - county_data['current_kwh']
+
+            # Ensure non-negative deficit
+            deficit = deficit.clip(lower=0)
+
+            return deficit
+
+        except Exception as e:
+            logger.error(f"Error calculating energy deficit: {str(e)}")
+            raise
+
+    @timed_operation('train_model')
+    def train_model(self, training_data: pd.DataFrame, prepared: bool = False) -> Dict:
+        """
+        Train the county prioritization model with validation
+
+        prepared: training_data already holds engineered features (see preprocess_data)
+
+        Returns:
+            Training metrics and model performance
+        """
+        from sklearn.model_selection import cross_val_score, train_test_split
+        from sklearn.metrics import mean_squared_error
+
+        try:
+            logger.info("Starting model training...")
+            self._build_estimators()
+
+            # Preprocess data
+            processed_data, feature_cols = self.preprocess_data(training_data, fit_scaler=True, prepared=prepared)
+
+            # Prepare features and target
+            X = processed_data[feature_cols]
+            y = processed_data['energy_deficit']
+
+            # Split data for validation
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=self.config['model']['random_state']
+            )
+
+            # Train priority model
+            with self.timer.stage('fit_forest', len(X_train)):
                 self.priority_model.fit(X_train, y_train)
-                
-                # Train clustering model
+
+            # Train clustering model
+            with self.timer.stage('fit_clusters', len(X)):
                 self.cluster_model.fit(X)
-                
-                # Validate model
+
+            # Validate model
+            with self.timer.stage('score', len(X)):
                 train_score = self.priority_model.score(X_train, y_train)
                 test_score = self.priority_model.score(X_test, y_test)
-                
-                # Cross-validation
+
+            # Cross-validation
+            with self.timer.stage('cross_validation', len(X)):
                 cv_scores = cross_val_score(self.priority_model, X, y, cv=5)
-                
-                # Predictions for metrics
-                y_pred = self.priority_model.predict(X_test)
-                mse = mean_squared_error(y_test, y_pred)
-                rmse = np.sqrt(mse)
-                
-                # Update model metadata
-                self.last_trained = datetime.now()
-                self.is_trained = True
-                
-                # Training metrics
-                metrics = {
-                    'train_r2': train_score,
-                    'test_r2': test_score,
-                    'cv_mean': cv_scores.mean(),
-                    'cv_std': cv_scores.std(),
-                    'rmse': rmse,
-                    'feature_importance': dict(zip(feature_cols, self.priority_model.feature_importances_)),
-                    'training_samples': len(X_train),
-                    'test_samples': len(X_test)
-                }
-                
-                logger.info(f"Model training completed. Test R² Score: {test_score:.3f}")
-                logger.info(f"Cross-validation Score: {cv_scores.mean():.3f} (±{cv_scores.std():.3f})")
-                
-                return metrics
-                
-            except Exception as e:
-                logger.error(f"Error during model training: {str(e)}")
-                raise
-        
-        def prioritize_counties(self, county_data: pd.DataFrame, use_cache: bool = True) -> Dict:
-            """
-            Generate county prioritization with caching for performance
-            
-            Args:
-                county_data: County data for analysis
-                use_cache: Whether to use cached results if available
-            
-            Returns:
-                Dictionary containing recommendations and priority rankings
-            """
-            try:
-                # Check cache
-                if use_cache and self._is_cache_valid():
-                    logger.info("Using cached results")
-                    return self._results_cache
-                
-                if not self.is_trained:
-                    raise ValueError("Model must be trained before making predictions")
-                
-                logger.info(f"Prioritizing {len(county_data)} counties...")
-                
-                # Preprocess data (don't fit scaler)
-                processed_data, _ = self.preprocess_data(county_data, fit_scaler=False)
-                
-                # Generate predictions
-                feature_data = processed_data[self.feature_columns]
-                priority_scores = self.priority_model.predict(feature_data)
-                clusters = self.cluster_model.predict(feature_data)
-                
-                # Add results to dataframe
-                results_df = county_data.copy()
-                results_df['priority_score'] = priority_scores
-                results_df['cluster'] = clusters
-                results_df['energy_deficit'] = processed_data['energy_deficit'].values
-                
-                # Generate recommendations by cluster and criteria
-                recommendations = self._generate_recommendations(results_df)
-                
-                # Get top priority counties
+
+            # Predictions for metrics
+            y_pred = self.priority_model.predict(X_test)
+            mse = mean_squared_error(y_test, y_pred)
+            rmse = np.sqrt(mse)
+
+            # Update model metadata
+            self.last_trained = datetime.now()
+            self.is_trained = True
+            self.clear_cache()
+            with self.timer.stage('drift_reference', len(X)):
+                self.reference_profile = self._reference_profile(X.to_numpy(), test_score)
+            self.cluster_counts = np.bincount(self.cluster_model.labels_, minlength=self.cluster_model.n_clusters)
+            self.rows_seen = len(X)
+
+            # Training metrics
+            metrics = {
+                'train_r2': train_score,
+                'test_r2': test_score,
+                'cv_mean': cv_scores.mean(),
+                'cv_std': cv_scores.std(),
+                'rmse': rmse,
+                'feature_importance': dict(zip(feature_cols, self.priority_model.feature_importances_)),
+                'training_samples': len(X_train),
+                'test_samples': len(X_test)
+            }
+
+            logger.info(f"Model training completed. Test R² Score: {test_score:.3f}")
+            logger.info(f"Cross-validation Score: {cv_scores.mean():.3f} (±{cv_scores.std():.3f})")
+
+            self.training_history.append(metrics)
+            return metrics
+
+        except Exception as e:
+            logger.error(f"Error during model training: {str(e)}")
+            raise
+
+    def _reference_profile(self, X: np.ndarray, test_r2: float) -> Dict:
+        """Per-feature quantile bins of the (scaled) training data, for drift checks"""
+        bins = self.config['drift']['bins']
+        edges = np.quantile(X, np.linspace(0, 1, bins + 1)[1:-1], axis=0).T
+        return {
+            'bin_edges': edges.tolist(),
+            'bin_shares': [self._bin_shares(X[:, i], edges[i]).tolist() for i in range(X.shape[1])],
+            'test_r2': float(test_r2),
+            'rows': len(X),
+        }
+
+    @staticmethod
+    def _bin_shares(values: np.ndarray, edges, smoothing: float = 0.0) -> np.ndarray:
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1) + smoothing
+        return counts / counts.sum()
+
+    @timed_operation('check_drift')
+    def check_drift(self, new_data: pd.DataFrame) -> Dict:
+        """
+        Compare new rows with the training data the model was fitted on
+
+        Each feature's population stability index over the training quantile bins is
+        checked against psi_threshold, and the model's R² on the new rows against its
+        training test R². Either failing means an incremental update is not enough.
+        """
+        if self.reference_profile is None:
+            raise ValueError("Model has no drift reference; train it fully first")
+        processed, feature_columns = self.preprocess_data(new_data, fit_scaler=False)
+        X = processed[feature_columns].to_numpy()
+        thresholds = self.config['drift']
+
+        psi = {}
+        for i, column in enumerate(feature_columns):
+            expected = np.maximum(np.asarray(self.reference_profile['bin_shares'][i]), 1e-4)
+            # Half a row per bin, so bins a small batch happens to miss do not dominate
+            actual = self._bin_shares(X[:, i], self.reference_profile['bin_edges'][i], smoothing=0.5)
+            psi[column] = float(((actual - expected) * np.log(actual / expected)).sum())
+        # rows * PSI of an undrifted sample is roughly chi-squared with bins - 1 degrees of
+        # freedom; allow for its mean plus two standard deviations, which small batches need
+        psi_limit = thresholds['psi_threshold'] + 2 * (thresholds['bins'] - 1) / len(X)
+        reasons = [f"{column} PSI {value:.3f} > {psi_limit:.3f}" for column, value in psi.items() if value > psi_limit]
+
+        r2 = None
+        if len(X) > 1 and processed['energy_deficit'].nunique() > 1:
+            r2 = float(self.priority_model.score(processed[feature_columns], processed['energy_deficit']))
+            floor = self.reference_profile['test_r2'] - thresholds['r2_drop']
+            if r2 < floor:
+                reasons.append(f"R² on new rows {r2:.3f} < {floor:.3f}")
+        return {'drifted': bool(reasons), 'reasons': reasons, 'psi': psi, 'r2_new_rows': r2, 'rows': len(X)}
+
+    @timed_operation('update_model')
+    def update_model(self, new_data: pd.DataFrame) -> Dict:
+        """
+        Fold new rows into the trained model without revisiting the history
+
+        Unless check_drift finds a shift (then a full retrain is needed and nothing
+        changes), the forest is warm-started with extra trees fitted on the new rows
+        only, as many as the new rows' share of all rows seen, keeping at most
+        max_trees, or n_estimators plus the new trees if that is more (the oldest
+        go first). KMeans centroids take a mini-batch step:
+        each moves toward its new members with learning rate 1/count, so history and
+        new rows are weighted by size. Scaler and feature bins stay fixed, as the
+        existing trees depend on them. Cost scales with len(new_data).
+        """
+        if not self.is_trained or not hasattr(self.priority_model, 'estimators_'):
+            raise ValueError("Incremental updates need a trained scikit-learn model")
+        started = time.perf_counter()
+        drift = self.check_drift(new_data)
+        if drift['drifted']:
+            logger.info(f"Drift detected, full retrain required: {drift['reasons']}")
+            return {'action': 'retrain_required', 'drift': drift}
+
+        processed, feature_columns = self.preprocess_data(new_data, fit_scaler=False)
+        X = processed[feature_columns]
+        forest = self.priority_model
+        trees_before = len(forest.estimators_)
+        new_trees = max(1, math.ceil(self.config['model']['n_estimators'] * len(X) / (self.rows_seen + len(X))))
+        forest.set_params(warm_start=True, n_estimators=trees_before + new_trees)
+        with self.timer.stage('fit_forest', len(X)):
+            forest.fit(X, processed['energy_deficit'])
+        forest.set_params(warm_start=False)
+        # Never below a full forest plus this update's trees, whatever n_estimators tuning picked
+        max_trees = max(self.config['model']['max_trees'], self.config['model']['n_estimators'] + new_trees)
+        if len(forest.estimators_) > max_trees:
+            forest.estimators_ = forest.estimators_[-max_trees:]
+            forest.set_params(n_estimators=max_trees)
+
+        centers = self.cluster_model.cluster_centers_
+        labels = self.cluster_model.predict(X)
+        batch_counts = np.bincount(labels, minlength=len(centers))
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, X.to_numpy())
+        counts = self.cluster_counts + batch_counts
+        self.cluster_model.cluster_centers_ = centers + (sums - batch_counts[:, None] * centers) / np.maximum(counts, 1)[:, None]
+        self.cluster_counts = counts
+
+        self.rows_seen += len(X)
+        self.last_trained = datetime.now()
+        self.clear_cache()
+        metrics = {
+            'type': 'incremental_update',
+            'rows': len(X),
+            'rows_seen': self.rows_seen,
+            'trees_added': new_trees,
+            'trees': len(forest.estimators_),
+            'centroid_shift': float(np.linalg.norm(self.cluster_model.cluster_centers_ - centers, axis=1).max()),
+            'r2_new_rows_before': drift['r2_new_rows'],
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        self.training_history.append(metrics)
+        logger.info(f"Model updated with {len(X)} rows: {new_trees} trees added, {metrics['trees']} in total")
+        return {'action': 'updated', 'drift': drift, 'metrics': metrics}
+
+    def tune_model(self, training_data: pd.DataFrame, report_path: Optional[str] = None, **options) -> Dict:
+        """
+        Search hyperparameters in parallel, then train with the best settings
+
+        Options are passed to planner_tuning.tune. Returns its ranked report, plus
+        the metrics of the final training run.
+        """
+        from app.models.planner_tuning import tune, write_report
+
+        report = tune(training_data, config=self.config, random_state=self.config['model']['random_state'], **options)
+        for section, values in report['best_config'].items():
+            if values:
+                self.config[section].update(values)
+        report['training_metrics'] = self.train_model(training_data)
+        if report_path:
+            write_report(report, report_path)
+        logger.info(f"Tuning finished in {report['elapsed_seconds']:.1f}s, using {report['best_config']}")
+        return report
+
+    @timed_operation('prioritize_counties')
+    def prioritize_counties(self, county_data: pd.DataFrame, use_cache: bool = True) -> Dict:
+        """
+        Generate county prioritization with caching for performance
+
+        Results are cached per content hash of county_data and model version, in a
+        bounded LRU. On a miss, rows whose (missing-value filled) inputs match a row of
+        the most recent result reuse its scores, so only changed rows are predicted.
+
+        Args:
+            county_data: County data for analysis
+            use_cache: Whether to use cached results if available
+
+        Returns:
+            Dictionary containing recommendations and priority rankings
+        """
+        try:
+            if not self.is_trained:
+                raise ValueError("Model must be trained before making predictions")
+
+            with self.timer.stage('cache_lookup', len(county_data)):
+                key = self._cache_key(county_data)
+            if use_cache and key in self._results_cache:
+                self._results_cache.move_to_end(key)
+                self._cache_stats['hits'] += 1
+                logger.debug("Using cached results", extra={'rows': len(county_data)})
+                return self._results_cache[key]['results']
+
+            started = time.perf_counter()
+            self._cache_stats['misses'] += 1
+
+            # Fill and derive features (don't fit scaler), then score only unseen rows
+            data, _ = self._prepare_features(county_data)
+            with self.timer.stage('row_hashing', len(data)):
+                row_hashes = pd.util.hash_pandas_object(data[self.feature_columns], index=False).to_numpy()
+            priority_scores, clusters = self._score_rows(data, row_hashes, reuse=use_cache)
+
+            # Add results to dataframe
+            results_df = county_data.copy()
+            results_df['priority_score'] = priority_scores
+            results_df['cluster'] = clusters
+            results_df['energy_deficit'] = data['energy_deficit'].values
+
+            # Generate recommendations by cluster and criteria
+            recommendations = self._generate_recommendations(results_df)
+
+            # Get top priority counties
+            with self.timer.stage('rank', len(results_df)):
                 top_counties = results_df.nlargest(
-                    self.config['recommendations']['top_counties_count'], 
+                    self.config['recommendations']['top_counties_count'],
                     'priority_score'
-                )
-                
-                # Prepare results
-                results = {
-                    'recommendations': recommendations,
-                    'top_counties': top_counties.to_dict('records'),
-                    'summary_stats': {
-                        'total_counties': len(county_data),
-                        'avg_priority_score': float(priority_scores.mean()),
-                        'high_priority_counties': int((priority_scores > priority_scores.mean() + priority_scores.std()).sum()),
-                        'cluster_distribution': {f'cluster_{i}': int((clusters == i).sum()) 
-                                            for i in range(self.config['clustering']['n_clusters'])}
-                    },
-                    'generated_at': datetime.now().isoformat(),
-                    'model_version': self.model_version
+                ).to_dict('records')
+
+            # Prepare results
+            results = {
+                'recommendations': recommendations,
+                'top_counties': top_counties,
+                'summary_stats': {
+                    'total_counties': len(county_data),
+                    'avg_priority_score': float(priority_scores.mean()),
+                    'high_priority_counties': int((priority_scores > priority_scores.mean() + priority_scores.std()).sum()),
+                    'cluster_distribution': {f'cluster_{i}': int((clusters == i).sum())
+                                        for i in range(self.config['clustering']['n_clusters'])}
+                },
+                'generated_at': datetime.now().isoformat(),
+                'model_version': self.model_version
+            }
+
+            # Cache results with the per-row scores for incremental reuse
+            self._results_cache[key] = {
+                'results': results,
+                'row_hashes': row_hashes,
+                'priority_score': priority_scores,
+                'cluster': clusters,
+            }
+            self._results_cache.move_to_end(key)
+            while len(self._results_cache) > self.config['data']['cache_max_entries']:
+                self._results_cache.popitem(last=False)
+                self._cache_stats['evictions'] += 1
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._cache_stats['recompute_ms'].append(elapsed_ms)
+
+            logger.info("County prioritization completed",
+                        extra={'rows': len(county_data), 'duration_ms': round(elapsed_ms, 3)})
+            return results
+
+        except Exception as e:
+            logger.error(f"Error in county prioritization: {str(e)}")
+            raise
+
+    def _cache_key(self, county_data: pd.DataFrame) -> str:
+        """Content hash of the input frame (values, index and column names) plus model version"""
+        digest = hashlib.sha1(pd.util.hash_pandas_object(county_data, index=True).to_numpy().tobytes())
+        digest.update(json.dumps([str(col) for col in county_data.columns]).encode())
+        return f"{self.model_version}:{self.last_trained}:{digest.hexdigest()}"
+
+    def _score_rows(self, data: pd.DataFrame, row_hashes: np.ndarray, reuse: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Priority score and cluster per row, predicting only rows absent from the latest cached result"""
+        priority_scores = np.empty(len(data))
+        clusters = np.empty(len(data), dtype=np.int64)
+        pending = np.ones(len(data), dtype=bool)
+
+        latest = next(reversed(self._results_cache.values()), None) if reuse else None
+        if latest is not None and len(latest['row_hashes']):
+            order = np.argsort(latest['row_hashes'])
+            known = latest['row_hashes'][order]
+            position = np.minimum(np.searchsorted(known, row_hashes), len(known) - 1)
+            found = known[position] == row_hashes
+            source = order[position[found]]
+            priority_scores[found] = latest['priority_score'][source]
+            clusters[found] = latest['cluster'][source]
+            pending = ~found
+
+        if pending.any():
+            rows = int(pending.sum())
+            with self.timer.stage('scale', rows):
+                features = data.loc[pending, self.feature_columns]
+                scaled = pd.DataFrame(self.scaler.transform(features), columns=self.feature_columns)
+            with self.timer.stage('predict_priority', rows):
+                priority_scores[pending] = self.priority_model.predict(scaled)
+            with self.timer.stage('predict_cluster', rows):
+                clusters[pending] = self.cluster_model.predict(scaled)
+
+        self._cache_stats['rows_reused'] += int(len(data) - pending.sum())
+        self._cache_stats['rows_recomputed'] += int(pending.sum())
+        return priority_scores, clusters
+
+    @timed_operation('predict_batch')
+    def predict_batch(self, rows: Union[pd.DataFrame, List[Dict]]) -> Dict[str, np.ndarray]:
+        """
+        Score many county feature rows in one vectorized pass
+
+        Unlike prioritize_counties this does not validate county names or impute from
+        the batch itself: missing values take the training mean (the scaler's mean),
+        so every row scores the same whatever else is in the batch. The scaler, the
+        RandomForest and KMeans each run once over the whole matrix.
+
+        Returns:
+            Arrays aligned with the input rows: priority_score, cluster,
+            energy_deficit and recommended_solution
+        """
+        if not self.is_trained:
+            raise ValueError("Model must be trained before making predictions")
+
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame.from_records(rows)
+        if frame.empty:
+            raise ValueError("Input data is empty")
+        inputs = [col for col in self.config['data']['required_columns'] if col != 'county_name']
+        missing_cols = [col for col in inputs if col not in frame.columns]
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+
+        with self.timer.stage('validate', len(frame)):
+            numeric = frame[inputs].apply(pd.to_numeric, errors='coerce')
+            if (numeric < 0).to_numpy().any():
+                negative = [col for col in inputs if (numeric[col] < 0).any()]
+                raise ValueError(f"Columns contain negative values: {negative}")
+        with self.timer.stage('energy_deficit', len(frame)):
+            numeric['energy_deficit'] = self.calculate_energy_deficit(numeric)
+
+        with self.timer.stage('scale', len(frame)):
+            features = numeric[self.feature_columns].to_numpy(dtype=float)
+            features = np.where(np.isnan(features), self.scaler.mean_, features)
+            scaled = self.scaler.transform(pd.DataFrame(features, columns=self.feature_columns))
+        return self.score_scaled(scaled, features)
+
+    @timed_operation('score_scaled')
+    def score_scaled(self, scaled: np.ndarray, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Priority score, cluster and recommended solution for already scaled rows
+
+        features holds the same rows unscaled, in feature_columns order, for the
+        energy deficit and grid distance.
+        """
+        scaled = pd.DataFrame(scaled, columns=self.feature_columns)
+        grid_distance = features[:, self.feature_columns.index('grid_distance')]
+        thresholds = self.config['recommendations']
+        with self.timer.stage('recommend', len(scaled)):
+            solution = np.select(
+                [grid_distance > thresholds['solar_threshold'],
+                 grid_distance <= thresholds['grid_extension_threshold']],
+                ['solar_minigrid', 'grid_extension'],
+                default='hybrid_solution'
+            )
+        with self.timer.stage('predict_priority', len(scaled)):
+            priority_scores = self.priority_model.predict(scaled)
+        with self.timer.stage('predict_cluster', len(scaled)):
+            clusters = self.cluster_model.predict(scaled)
+
+        return {
+            'priority_score': priority_scores,
+            'cluster': clusters,
+            'energy_deficit': features[:, self.feature_columns.index('energy_deficit')],
+            'recommended_solution': solution,
+        }
+
+    def get_recommendations(self, county: Dict) -> Dict:
+        """Model recommendation for a single county (a one-row predict_batch)"""
+        scores = self.predict_batch([county])
+        return {
+            'county_name': county.get('county_name'),
+            'solution': str(scores['recommended_solution'][0]),
+            'priority_score': float(scores['priority_score'][0]),
+            'cluster': int(scores['cluster'][0]),
+            'energy_deficit': float(scores['energy_deficit'][0]),
+            'model_version': self.model_version,
+            'source': 'ai_model'
+        }
+
+    @timed_operation('recommendations')
+    def _generate_recommendations(self, results_df: pd.DataFrame) -> Dict:
+        """Generate technology recommendations based on clustering and criteria"""
+        try:
+            recommendations = {}
+
+            # Solar mini-grid recommendations (remote areas with high energy deficit)
+            solar_candidates = results_df[
+                (results_df['grid_distance'] > self.config['recommendations']['solar_threshold']) &
+                (results_df['energy_deficit'] > results_df['energy_deficit'].median())
+            ]
+            recommendations['solar_minigrid'] = solar_candidates['county_name'].tolist()
+
+            # Grid extension recommendations (close to existing grid)
+            grid_candidates = results_df[
+                results_df['grid_distance'] <= self.config['recommendations']['grid_extension_threshold']
+            ]
+            recommendations['grid_extension'] = grid_candidates['county_name'].tolist()
+
+            # Hybrid solution recommendations (medium distance, high activity)
+            hybrid_candidates = results_df[
+                (results_df['grid_distance'].between(10, 20)) &
+                (results_df['economic_activity'] > results_df['economic_activity'].median())
+            ]
+            recommendations['hybrid_solution'] = hybrid_candidates['county_name'].tolist()
+
+            # Priority intervention (top 20% by priority score)
+            priority_threshold = results_df['priority_score'].quantile(0.8)
+            recommendations['immediate_intervention'] = results_df[
+                results_df['priority_score'] >= priority_threshold
+            ]['county_name'].tolist()
+
+            return recommendations
+
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {str(e)}")
+            return {}
+
+    @staticmethod
+    def _empty_cache_stats() -> Dict:
+        return {'hits': 0, 'misses': 0, 'evictions': 0, 'rows_reused': 0, 'rows_recomputed': 0,
+                'recompute_ms': deque(maxlen=100)}
+
+    def save_model(self, filepath: str) -> None:
+        """
+        Save the trained model and metadata
+
+        A path ending in .planner writes the compiled layout instead of a pickle: a
+        directory of uncompressed .npy arrays that workers memory-map and share, and
+        a manifest with checksums, feature columns and version. It serves
+        predictions but cannot be retrained or updated incrementally.
+        """
+        import joblib
+        import sklearn
+        from app.models.compiled_planner import COMPILED_SUFFIX, save_compiled
+
+        try:
+            if not self.is_trained:
+                raise ValueError("Cannot save untrained model")
+            if filepath.rstrip('/').endswith(COMPILED_SUFFIX):
+                manifest = save_compiled(self, filepath)
+                logger.info(f"Compiled model saved to {filepath} (checksum {manifest['checksum'][:12]})")
+                return
+
+            model_data = {
+                'priority_model': self.priority_model,
+                'scaler': self.scaler,
+                'cluster_model': self.cluster_model,
+                'feature_columns': self.feature_columns,
+                'config': self.config,
+                'model_version': self.model_version,
+                'last_trained': self.last_trained,
+                'training_history': self.training_history,
+                'reference_profile': self.reference_profile,
+                'cluster_counts': self.cluster_counts,
+                'rows_seen': self.rows_seen,
+                'metadata': {
+                    'saved_at': datetime.now().isoformat(),
+                    'python_version': platform.python_version(),
+                    'sklearn_version': sklearn.__version__,
                 }
-                
-                # Cache results
-                self._results_cache = results
-                self._cache_timestamp = datetime.now()
-                
-                logger.info("County prioritization completed successfully")
-                return results
-                
-            except Exception as e:
-                logger.error(f"Error in county prioritization: {str(e)}")
-                raise
-        
-        def _generate_recommendations(self, results_df: pd.DataFrame) -> Dict:
-            """Generate technology recommendations based on clustering and criteria"""
-            try:
-                recommendations = {}
-                
-                # Solar mini-grid recommendations (remote areas with high energy deficit)
-                solar_candidates = results_df[
-                    (results_df['grid_distance'] > self.config['recommendations']['solar_threshold']) &
-                    (results_df['energy_deficit'] > results_df['energy_deficit'].median())
-                ]
-                recommendations['solar_minigrid'] = solar_candidates['county_name'].tolist()
-                
-                # Grid extension recommendations (close to existing grid)
-                grid_candidates = results_df[
-                    results_df['grid_distance'] <= self.config['recommendations']['grid_extension_threshold']
-                ]
-                recommendations['grid_extension'] = grid_candidates['county_name'].tolist()
-                
-                # Hybrid solution recommendations (medium distance, high activity)
-                hybrid_candidates = results_df[
-                    (results_df['grid_distance'].between(10, 20)) &
-                    (results_df['economic_activity'] > results_df['economic_activity'].median())
-                ]
-                recommendations['hybrid_solution'] = hybrid_candidates['county_name'].tolist()
-                
-                # Priority intervention (top 20% by priority score)
-                priority_threshold = results_df['priority_score'].quantile(0.8)
-                recommendations['immediate_intervention'] = results_df[
-                    results_df['priority_score'] >= priority_threshold
-                ]['county_name'].tolist()
-                
-                return recommendations
-                
-            except Exception as e:
-                logger.error(f"Error generating recommendations: {str(e)}")
-                return {}
-        
-        def _is_cache_valid(self) -> bool:
-            """Check if cached results are still valid"""
-            if not self._results_cache or not self._cache_timestamp:
-                return False
-            
-            cache_age = (datetime.now() - self._cache_timestamp).total_seconds() / 60
-            return cache_age < self.config['data']['cache_duration_minutes']
-        
-        def save_model(self, filepath: str) -> None:
-            """Save the trained model and metadata"""
+            }
+
+            joblib.dump(model_data, filepath)
+            logger.info(f"Model saved successfully to {filepath}")
+
+        except Exception as e:
+            logger.error(f"Error saving model: {str(e)}")
+            raise
+
+    def load_model(self, filepath: str) -> None:
+        """
+        Load a pre-trained model
+
+        The artifact is checked before it replaces anything: it must unpickle under the
+        installed scikit-learn without version warnings, contain every component, and
+        predict on a probe row. Any failure raises ModelArtifactError with the reason.
+        A compiled .planner directory (see save_model) loads without scikit-learn,
+        its arrays memory-mapped read-only.
+        """
+        from app.models.compiled_planner import is_compiled_artifact
+
+        try:
+            if not Path(filepath).exists():
+                raise FileNotFoundError(f"Model file not found: {filepath}")
+            model_data = self._load_compiled(filepath) if is_compiled_artifact(filepath) else self._unpickle(filepath)
+
+            if not isinstance(model_data, dict):
+                raise ModelArtifactError(f"{filepath} does not contain a planner model dictionary")
+            missing = [key for key in MODEL_ARTIFACT_KEYS if key not in model_data]
+            if missing:
+                raise ModelArtifactError(f"{filepath} is missing model components: {missing}")
+
+            feature_columns = list(model_data['feature_columns'])
+            probe = pd.DataFrame(np.zeros((1, len(feature_columns))), columns=feature_columns)
             try:
-                if not self.is_trained:
-                    raise ValueError("Cannot save untrained model")
-                
-                model_data = {
-                    'priority_model': self.priority_model,
-                    'scaler': self.scaler,
-                    'cluster_model': self.cluster_model,
-                    'feature_columns': self.feature_columns,
-                    'config': self.config,
-                    'model_version': self.model_version,
-                    'last_trained': self.last_trained,
-                    'metadata': {
-                        'saved_at': datetime.now().isoformat(),
-                        'python_version': f"{'.'.join(map(str, [3, 8, 0]))}",  # Placeholder
-                    }
-                }
-                
-                joblib.dump(model_data, filepath)
-                logger.info(f"Model saved successfully to {filepath}")
-                
+                scaled = pd.DataFrame(model_data['scaler'].transform(probe), columns=feature_columns)
+                model_data['priority_model'].predict(scaled)
+                model_data['cluster_model'].predict(scaled)
             except Exception as e:
-                logger.error(f"Error saving model: {str(e)}")
-                raise
-        
-        def load_model(self, filepath: str) -> None:
-            """Load a pre-trained model"""
+                raise ModelArtifactError(f"{filepath} failed a probe prediction: {e}") from e
+
+            # Load model components
+            self.priority_model = model_data['priority_model']
+            self.scaler = model_data['scaler']
+            self.cluster_model = model_data['cluster_model']
+            self.feature_columns = feature_columns
+            # Merge per section so settings the artifact predates keep their defaults
+            for section, values in model_data.get('config', {}).items():
+                if isinstance(values, dict) and isinstance(self.config.get(section), dict):
+                    self.config[section].update(values)
+                else:
+                    self.config[section] = values
+            self.model_version = model_data.get('model_version', 'unknown')
+            self.last_trained = model_data.get('last_trained')
+            self.training_history = list(model_data.get('training_history', []))
+            self.reference_profile = model_data.get('reference_profile')
+            self.cluster_counts = model_data.get('cluster_counts')
+            self.rows_seen = model_data.get('rows_seen', 0)
+            self.is_trained = True
+            self.clear_cache()
+
+            logger.info(f"Model loaded successfully from {filepath}")
+            logger.info(f"Model version: {self.model_version}, Last trained: {self.last_trained}")
+
+        except Exception as e:
+            logger.error(f"Error loading model: {str(e)}")
+            raise
+
+    @staticmethod
+    def _unpickle(filepath: str):
+        """joblib artifact contents, refusing ones pickled by a different scikit-learn"""
+        import joblib
+        import sklearn
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
             try:
-                if not Path(filepath).exists():
-                    raise FileNotFoundError(f"Model file not found: {filepath}")
-                
                 model_data = joblib.load(filepath)
-                
-                # Load model components
-                self.priority_model = model_data['priority_model']
-                self.scaler = model_data['scaler']
-                self.cluster_model = model_data['cluster_model']
-                self.feature_columns = model_data['feature_columns']
-                self.config.update(model_data.get('config', {}))
-                self.model_version = model_data.get('model_version', 'unknown')
-                self.last_trained = model_data.get('last_trained')
-                self.is_trained = True
-                
-                logger.info(f"Model loaded successfully from {filepath}")
-                logger.info(f"Model version: {self.model_version}, Last trained: {self.last_trained}")
-                
             except Exception as e:
-                logger.error(f"Error loading model: {str(e)}")
-                raise
-        
-        def get_model_info(self) -> Dict:
-            """Get comprehensive model information"""
-            return {
-                'model_version': self.model_version,
-                'is_trained': self.is_trained,
-                'last_trained': self.last_trained.isoformat() if self.last_trained else None,
-                'feature_columns': self.feature_columns,
-                'config': self.config,
-                'cache_status': {
-                    'has_cache': bool(self._results_cache),
-                    'cache_valid': self._is_cache_valid(),
-                    'cache_timestamp': self._cache_timestamp.isoformat() if self._cache_timestamp else None
-                }
-            }
-        
-        def clear_cache(self) -> None:
-            """Clear the results cache"""
-            self._results_cache = {}
-            self._cache_timestamp = None
-            logger.info("Results cache cleared")
-            
-        self.db_connection = db_connection
+                raise ModelArtifactError(
+                    f"Cannot unpickle {filepath} with scikit-learn {sklearn.__version__}: {e}"
+                ) from e
+        version_warnings = [str(w.message).split('.')[0] for w in caught
+                            if 'unpickle estimator' in str(w.message)]
+        if version_warnings:
+            raise ModelArtifactError(
+                f"{filepath} was saved with a different scikit-learn than the installed "
+                f"{sklearn.__version__}: {version_warnings[0]}"
+            )
+        return model_data
+
+    @staticmethod
+    def _load_compiled(filepath: str) -> Dict:
+        """Model dictionary from a compiled artifact, with NumPy stand-ins for the estimators"""
+        from app.models.compiled_planner import load_compiled
+
+        try:
+            compiled = load_compiled(filepath)
+        except Exception as e:
+            raise ModelArtifactError(f"Cannot read compiled planner {filepath}: {e}") from e
+        metadata = compiled.pop('metadata')
+        last_trained = metadata.get('last_trained')
+        return {
+            **compiled,
+            'feature_columns': metadata['feature_columns'],
+            'config': metadata.get('config', {}),
+            'model_version': metadata.get('model_version', 'unknown'),
+            'last_trained': datetime.fromisoformat(last_trained) if last_trained else None,
+            'training_history': metadata.get('training_history', []),
+        }
+
+    def get_model_info(self) -> Dict:
+        """Get comprehensive model information"""
+        return {
+            'model_version': self.model_version,
+            'is_trained': self.is_trained,
+            'last_trained': self.last_trained.isoformat() if self.last_trained else None,
+            'training_metrics': self.training_history[-1] if self.training_history else None,
+            'feature_columns': self.feature_columns,
+            'config': self.config,
+            'cache_status': self._cache_status()
+        }
+
+    def _cache_status(self) -> Dict:
+        """Result cache size, hit rate and recompute timings"""
+        stats = self._cache_stats
+        lookups = stats['hits'] + stats['misses']
+        recompute_ms = list(stats['recompute_ms'])
+        return {
+            'entries': len(self._results_cache),
+            'max_entries': self.config['data']['cache_max_entries'],
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else None,
+            'evictions': stats['evictions'],
+            'rows_reused': stats['rows_reused'],
+            'rows_recomputed': stats['rows_recomputed'],
+            'recompute_ms': {
+                'last': round(recompute_ms[-1], 3),
+                'mean': round(float(np.mean(recompute_ms)), 3),
+                'max': round(max(recompute_ms), 3),
+            } if recompute_ms else None
+        }
+
+    def clear_cache(self) -> None:
+        """Clear the results cache and its statistics"""
+        self._results_cache = OrderedDict()
+        self._cache_stats = self._empty_cache_stats()
+        logger.debug("Results cache cleared")
     
     def load_data_from_db(self, query: str) -> pd.DataFrame:
         """Load data directly from database"""
@@ -506,6 +962,9 @@ class CountyEnergyPlanner:
 
 # Example usage and testing
 if __name__ == "__main__":
+    from app.utils.logging_setup import configure_logging
+
+    configure_logging()
     # Example usage
     try:
         # Initialize planner
@@ -23,7 +23,10 @@ class SimulationResult(BaseModel):
     simulation_id: str
     county_id: str
     total_cost: float
-    payback_period: int
+    payback_period: Optional[int]
     energy_generated: float
     co2_saved: float
+    npv: Optional[float] = None
+    irr: Optional[float] = None
+    lcoe: Optional[float] = None
     status: str
\ No newline at end of file
@@ -0,0 +1,282 @@
+"""
+Planner Stage Timing
+Per-stage latency, throughput and peak memory of the county planner's calls, with a
+sampled mode so serving pays next to nothing for it
+"""
+
+import functools
+import random
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+MODES = ('off', 'sampled', 'all')
+MEMORY_SAMPLE_EVERY = 10  # with track_memory, every 10th timed call measures memory instead of time
+
+# The sampled top-level call the current thread or task is inside: None outside any,
+# _SKIPPED when it was not sampled, otherwise its _Operation
+_current: ContextVar = ContextVar('planner_stage_operation', default=None)
+_SKIPPED = object()
+
+
+class StageStats:
+    def __init__(self, latency_window: int = 200):
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.memory_samples = 0
+        self.peak_memory_bytes: Optional[int] = None  # largest heap growth seen within the stage
+        self.last_peak_memory_bytes: Optional[int] = None
+        self.duration_ms = deque(maxlen=latency_window)
+
+    def record(self, seconds: Optional[float], rows: int, peak_memory: Optional[int]) -> None:
+        if seconds is not None:
+            self.calls += 1
+            self.rows += rows
+            self.seconds += seconds
+            self.duration_ms.append(seconds * 1000)
+        if peak_memory is not None:
+            self.memory_samples += 1
+            self.last_peak_memory_bytes = peak_memory
+            self.peak_memory_bytes = max(peak_memory, self.peak_memory_bytes or 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'rows': self.rows,
+            'seconds': round(self.seconds, 6),
+            'rows_per_sec': round(self.rows / self.seconds, 1) if self.rows and self.seconds else None,
+            'duration_ms': self._percentiles(self.duration_ms),
+            'memory_samples': self.memory_samples,
+            'peak_memory_bytes': {'last': self.last_peak_memory_bytes, 'max': self.peak_memory_bytes}
+            if self.peak_memory_bytes is not None else None,
+        }
+
+    @staticmethod
+    def _percentiles(samples) -> Optional[Dict[str, float]]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+        return {'p50': pick(0.5), 'p95': pick(0.95), 'max': round(ordered[-1], 3)}
+
+
+class _Noop:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Skipped:
+    """An unsampled top-level call: marks it so its stages are not sampled on their own"""
+
+    def __enter__(self):
+        self._token = _current.set(_SKIPPED)
+
+    def __exit__(self, *exc) -> bool:
+        _current.reset(self._token)
+        return False
+
+
+class _Stage:
+    def __init__(self, operation: "_Operation", stage_name: str, rows: int):
+        self.operation = operation
+        self.stage_name = stage_name
+        self.rows = rows
+
+    def __enter__(self):
+        operation = self.operation
+        if operation.memory:
+            # Each stage measures its own peak; fold the enclosing stage's peak so far
+            # into its running maximum before resetting the shared tracemalloc peak
+            current, peak = tracemalloc.get_traced_memory()
+            if operation.frames:
+                operation.frames[-1][1] = max(operation.frames[-1][1], peak)
+            tracemalloc.reset_peak()
+            operation.frames.append([current, current])
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, *exc) -> bool:
+        seconds = time.perf_counter() - self.started
+        operation = self.operation
+        peak_memory = None
+        if operation.memory:
+            seconds = None  # tracemalloc slows the call; its time would skew the latencies
+            start, running = operation.frames.pop()
+            top = max(running, tracemalloc.get_traced_memory()[1])
+            peak_memory = top - start
+            if operation.frames:
+                operation.frames[-1][1] = max(operation.frames[-1][1], top)
+            tracemalloc.reset_peak()
+        if exc_type is None:
+            operation.timer._record(f"{operation.name}.{self.stage_name}", seconds, self.rows, peak_memory)
+        return False
+
+
+class _Operation(_Stage):
+    """A sampled top-level call, recorded as its own "total" stage"""
+
+    def __init__(self, timer: "StageTimer", name: str, rows: int, memory: bool):
+        super().__init__(self, 'total', rows)
+        self.timer = timer
+        self.name = name
+        self.frames = []
+        self.wants_memory = memory
+        self.memory = False
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        # tracemalloc is process-wide: one operation at a time measures memory, and
+        # none does while someone else is tracing (this call is then timed instead)
+        timer = self.timer
+        if self.wants_memory and timer._memory_lock.acquire(blocking=False):
+            if tracemalloc.is_tracing():
+                timer._memory_lock.release()
+            else:
+                tracemalloc.start()
+                self.memory = True
+        super().__enter__()
+
+    def __exit__(self, *exc) -> bool:
+        try:
+            return super().__exit__(*exc)
+        finally:
+            if self.memory:
+                tracemalloc.stop()
+                self.timer._memory_lock.release()
+            _current.reset(self._token)
+
+
+class StageTimer:
+    """
+    Times the stages of planner calls
+
+    A top-level call (operation) and the stages inside it are recorded under
+    "operation.stage". Mode "all" times every call, "sampled" a random sample_rate
+    share of them (the decision is made once per top-level call, so a sampled call
+    is timed throughout and an unsampled one costs a few attribute lookups per
+    stage), "off" none. With track_memory, one timed call in MEMORY_SAMPLE_EVERY
+    runs under tracemalloc instead and each stage reports its peak growth of the
+    Python heap (NumPy and pandas buffers included). tracemalloc makes that call a
+    few times slower, so its time is not recorded.
+    """
+
+    def __init__(self, mode: str = 'all', sample_rate: float = 1.0, track_memory: bool = False,
+                 latency_window: int = 200):
+        self.latency_window = latency_window
+        self._stats: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self.operations = 0
+        self.sampled_operations = 0
+        self.configure(mode, sample_rate, track_memory)
+
+    def configure(self, mode: Optional[str] = None, sample_rate: Optional[float] = None,
+                  track_memory: Optional[bool] = None) -> None:
+        mode = mode if mode is not None else self.mode
+        sample_rate = sample_rate if sample_rate is not None else self.sample_rate
+        if mode not in MODES:
+            raise ValueError(f"Unknown stage timing mode {mode!r}; expected one of {MODES}")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be between 0 and 1, got {sample_rate}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        if track_memory is not None:
+            self.track_memory = track_memory
+
+    def operation(self, name: str, rows: int = 0):
+        """Context manager for a top-level call; nested inside another it is one of its stages"""
+        if _current.get() is not None:
+            return self.stage(name, rows)
+        if self.mode == 'off':
+            return _NOOP
+        self.operations += 1
+        if self.mode == 'sampled' and random.random() >= self.sample_rate:
+            return _Skipped()
+        self.sampled_operations += 1
+        memory = self.track_memory and self.sampled_operations % MEMORY_SAMPLE_EVERY == 0
+        return _Operation(self, name, rows, memory)
+
+    def stage(self, name: str, rows: int = 0):
+        """Context manager for one stage of the current call (outside one, it is timed as its own call)"""
+        operation = _current.get()
+        if operation is None:
+            return self.operation(name, rows)
+        if operation is _SKIPPED:
+            return _NOOP
+        return _Stage(operation, name, rows)
+
+    def _record(self, key: str, seconds: float, rows: int, peak_memory: Optional[int]) -> None:
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StageStats(self.latency_window)
+            stats.record(seconds, rows, peak_memory)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.operations = 0
+            self.sampled_operations = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Settings, call counts and per-stage statistics, keyed "operation.stage" """
+        with self._lock:
+            stages = {key: stats.snapshot() for key, stats in sorted(self._stats.items())}
+        return {
+            'mode': self.mode,
+            'sample_rate': self.sample_rate,
+            'track_memory': self.track_memory,
+            'operations': self.operations,
+            'sampled_operations': self.sampled_operations,
+            'stages': stages,
+        }
+
+    def prometheus(self, prefix: str = 'county_planner') -> str:
+        """Per-stage counters and memory gauges in the Prometheus text exposition format"""
+        with self._lock:
+            stats = sorted(self._stats.items())
+        families = [
+            ('stage_calls_total', 'counter', 'Timed stage executions', lambda s: s.calls),
+            ('stage_rows_total', 'counter', 'Rows processed by timed stage executions', lambda s: s.rows),
+            ('stage_seconds_total', 'counter', 'Time spent in timed stage executions', lambda s: s.seconds),
+            ('stage_memory_samples_total', 'counter', 'Stage executions measured for memory',
+             lambda s: s.memory_samples),
+            ('stage_peak_memory_bytes', 'gauge', 'Largest Python heap growth within the stage',
+             lambda s: s.peak_memory_bytes),
+        ]
+        lines = [
+            f"# HELP {prefix}_operations_total Top-level planner calls",
+            f"# TYPE {prefix}_operations_total counter",
+            f"{prefix}_operations_total {self.operations}",
+            f"# HELP {prefix}_sampled_operations_total Top-level planner calls that were timed",
+            f"# TYPE {prefix}_sampled_operations_total counter",
+            f"{prefix}_sampled_operations_total {self.sampled_operations}",
+        ]
+        for name, kind, description, value in families:
+            lines += [f"# HELP {prefix}_{name} {description}", f"# TYPE {prefix}_{name} {kind}"]
+            for key, stage in stats:
+                if value(stage) is None:
+                    continue
+                operation, stage_name = key.split('.', 1)
+                lines.append(f'{prefix}_{name}{{operation="{operation}",stage="{stage_name}"}} {value(stage)}')
+        return "\n".join(lines) + "\n"
+
+
+def timed_operation(name: str):
+    """Time a planner method as an operation of self.timer, counting len() of its first argument as rows"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, data, *args, **kwargs):
+            with self.timer.operation(name, len(data)):
+                return method(self, data, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -6,12 +6,15 @@ Integrates with Claude/Gemini for intelligent analysis
 import os
 import json
 import asyncio
+import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import aiohttp
 from pydantic import BaseModel
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 class CountyAnalysisRequest(BaseModel):
     county_name: str
     population: int
@@ -61,7 +64,7 @@ class AIAgentService:
             else:
                 return self._get_rule_based_recommendation(county_data)
         except Exception as e:
-            print(f"AI service error: {e}")
+            logger.error(f"AI service error: {e}", extra={"county": county_data.county_name})
             return self._get_rule_based_recommendation(county_data)
     
     def _create_analysis_prompt(self, county_data: CountyAnalysisRequest) -> str:
@@ -150,7 +153,7 @@ Respond in JSON format matching this structure:
                             recommendation_data = json.loads(json_str)
                             return AIRecommendation(**recommendation_data)
                         except (json.JSONDecodeError, IndexError, ValueError) as e:
-                            print(f"JSON parsing failed: {e}. Using fallback.")
+                            logger.warning(f"JSON parsing failed: {e}. Using fallback.", extra={"county": county_data.county_name})
                             return self._get_rule_based_recommendation(county_data)
                     elif response.status == 401:
                         raise Exception("Claude API key is invalid or expired")
@@ -162,7 +165,7 @@ Respond in JSON format matching this structure:
         except asyncio.TimeoutError:
             raise Exception("Claude API request timeout")
         except Exception as e:
-            print(f"Claude API error: {e}")
+            logger.error(f"Claude API error: {e}", extra={"county": county_data.county_name})
             return self._get_rule_based_recommendation(county_data)
 
     async def _get_gemini_recommendation(self, prompt: str, county_data: CountyAnalysisRequest) -> AIRecommendation:
@@ -214,7 +217,7 @@ Respond in JSON format matching this structure:
                                 recommendation_data = json.loads(json_str)
                                 return AIRecommendation(**recommendation_data)
                             except (json.JSONDecodeError, IndexError, ValueError) as e:
-                                print(f"JSON parsing failed: {e}. Using fallback.")
+                                logger.warning(f"JSON parsing failed: {e}. Using fallback.", extra={"county": county_data.county_name})
                                 return self._get_rule_based_recommendation(county_data)
                         else:
                             raise Exception("Unexpected Gemini API response format")
@@ -231,7 +234,7 @@ Respond in JSON format matching this structure:
         except asyncio.TimeoutError:
             raise Exception("Gemini API request timeout")
         except Exception as e:
-            print(f"Gemini API error: {e}")
+            logger.error(f"Gemini API error: {e}", extra={"county": county_data.county_name})
             return self._get_rule_based_recommendation(county_data)
 
     def _get_rule_based_recommendation(self, county_data: CountyAnalysisRequest) -> AIRecommendation:
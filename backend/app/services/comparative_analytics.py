@@ -0,0 +1,179 @@
+"""
+Comparative Analytics Service
+Ranks, percentiles, z-scores and peer-group comparisons over the county table
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from app.services.data_service import DataService
+
+# Former provinces, used as peer groups
+COUNTY_REGIONS = {
+    "Nairobi": ["Nairobi"],
+    "Central": ["Nyandarua", "Nyeri", "Kirinyaga", "Murang'a", "Kiambu"],
+    "Coastal": ["Mombasa", "Kwale", "Kilifi", "Tana River", "Lamu", "Taita-Taveta"],
+    "Eastern": ["Marsabit", "Isiolo", "Meru", "Tharaka-Nithi", "Embu", "Kitui", "Machakos", "Makueni"],
+    "North Eastern": ["Garissa", "Wajir", "Mandera"],
+    "Rift Valley": ["Turkana", "West Pokot", "Samburu", "Trans Nzoia", "Uasin Gishu", "Elgeyo-Marakwet", "Nandi",
+                    "Baringo", "Laikipia", "Nakuru", "Narok", "Kajiado", "Kericho", "Bomet"],
+    "Western": ["Kakamega", "Vihiga", "Bungoma", "Busia"],
+    "Nyanza": ["Siaya", "Kisumu", "Homa Bay", "Migori", "Kisii", "Nyamira"],
+}
+REGION_OF_COUNTY = {county: region for region, counties in COUNTY_REGIONS.items() for county in counties}
+
+# Names the dashboard uses for county table columns
+METRIC_ALIASES = {
+    "efficiency": "avg_reliability_score",
+    "reliability": "avg_reliability_score",
+    "solar_potential": "avg_solar_irradiance",
+    "investment": "investment_needed",
+    "priority": "priority_score",
+    "access": "energy_access_score",
+}
+
+MAX_CACHED_COMPARISONS = 32
+
+
+def _tie_bounds(values: np.ndarray):
+    """
+    Column-wise sort order and, for every row, how many values are below it and how many equal it
+
+    One argsort over the whole matrix; tie runs are located with accumulate scans.
+    """
+    n = values.shape[0]
+    order = np.argsort(values, axis=0, kind="stable")
+    ordered = np.take_along_axis(values, order, axis=0)
+    positions = np.broadcast_to(np.arange(n)[:, None], values.shape)
+
+    starts_run = np.ones(values.shape, dtype=bool)
+    starts_run[1:] = ordered[1:] != ordered[:-1]
+    run_start = np.maximum.accumulate(np.where(starts_run, positions, 0), axis=0)
+    ends_run = np.ones(values.shape, dtype=bool)
+    ends_run[:-1] = starts_run[1:]
+    run_end = np.minimum.accumulate(np.where(ends_run, positions, n - 1)[::-1], axis=0)[::-1]
+
+    below = np.empty(values.shape, dtype=np.intp)
+    equal = np.empty(values.shape, dtype=np.intp)
+    np.put_along_axis(below, order, run_start, axis=0)
+    np.put_along_axis(equal, order, run_end - run_start + 1, axis=0)
+    return order, below, equal
+
+
+def _zscore(values: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, (values - mean) / std, 0.0)
+
+
+def compare(values: np.ndarray, groups: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compare every row of a (rows, metrics) matrix against all rows and against its peer group
+
+    groups holds an integer peer-group id per row. Everything is computed with
+    whole-matrix sorts, scans and bincounts; there is no per-row or per-metric loop.
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups, dtype=np.intp)
+    rows, metrics = values.shape
+    n_groups = int(groups.max()) + 1 if rows else 0
+
+    mean = values.mean(axis=0)
+    std = values.std(axis=0)
+
+    # Group sums via one bincount over (group, metric) cells
+    cells = (groups[:, None] * metrics + np.arange(metrics)).ravel()
+    group_size = np.bincount(groups, minlength=n_groups).astype(float)
+    group_sum = np.bincount(cells, values.ravel(), minlength=n_groups * metrics).reshape(n_groups, metrics)
+    group_sq = np.bincount(cells, (values ** 2).ravel(), minlength=n_groups * metrics).reshape(n_groups, metrics)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        group_mean = group_sum / group_size[:, None]
+        group_std = np.sqrt(np.clip(group_sq / group_size[:, None] - group_mean ** 2, 0, None))
+
+    order, below, equal = _tie_bounds(values)
+
+    # Rank within the peer group: order rows by (group, descending value) in one integer sort
+    descending = np.empty((rows, metrics), dtype=np.intp)
+    np.put_along_axis(descending, order[::-1], np.broadcast_to(np.arange(rows)[:, None], (rows, metrics)), axis=0)
+    peer_order = np.argsort(groups[:, None] * rows + descending, axis=0)
+    group_start = np.concatenate([[0], np.cumsum(group_size)[:-1]]).astype(np.intp)
+    peer_rank = np.empty((rows, metrics), dtype=np.intp)
+    np.put_along_axis(peer_rank, peer_order, np.arange(rows)[:, None] - group_start[groups[peer_order]] + 1, axis=0)
+
+    return {
+        # Competition ranking: 1 for the largest value, ties share the best rank
+        "rank": rows - (below + equal) + 1,
+        # Ties count as half below
+        "percentile": (below + 0.5 * equal) / rows * 100,
+        "z_score": _zscore(values, mean, std),
+        "peer_rank": peer_rank,
+        "peer_z_score": _zscore(values, group_mean[groups], group_std[groups]),
+        "mean": mean,
+        "std": std,
+        "group_size": group_size,
+        "group_mean": group_mean,
+    }
+
+
+class ComparativeAnalyticsService:
+    def __init__(self, data_service: Optional[DataService] = None):
+        self.data_service = data_service or DataService()
+        self._table: Optional[Dict[str, Any]] = None
+        self._results: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+    async def get_table(self) -> Dict[str, Any]:
+        """Columnar county table (name -> array) for the current dataset version"""
+        version = self.data_service.dataset_version()
+        if self._table is None or self._table["version"] != version:
+            counties = [county.dict() for county in await self.data_service.load_counties()]
+            if not counties:
+                raise ValueError("No county data available for comparison")
+            columns = {
+                key: np.array([c[key] for c in counties], dtype=float)
+                for key, value in counties[0].items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+            }
+            # Same per-person cost estimate as DataService.load_counties
+            cost_per_person = np.where(columns["energy_access_score"] < 50, 8000, 5000)
+            columns["investment_needed"] = columns["population"] * cost_per_person
+
+            regions = [REGION_OF_COUNTY.get(c["county_name"], "Other") for c in counties]
+            region_names, region_ids = np.unique(regions, return_inverse=True)
+            self._table = {
+                "version": version,
+                "names": [c["county_name"] for c in counties],
+                "regions": regions,
+                "region_names": list(region_names),
+                "region_ids": region_ids,
+                "columns": columns,
+            }
+            self._results.clear()
+        return self._table
+
+    def resolve_metrics(self, table: Dict[str, Any], metrics: List[str]) -> List[str]:
+        """Map dashboard metric names to table columns, rejecting unknown ones"""
+        resolved = [METRIC_ALIASES.get(metric, metric) for metric in metrics]
+        unknown = [metric for metric, column in zip(metrics, resolved) if column not in table["columns"]]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {unknown}. Available: {sorted(table['columns'])}")
+        return resolved
+
+    async def compare_counties(self, metrics: List[str]) -> Dict[str, Any]:
+        """Comparison of all counties on the given metrics, cached per (metrics, dataset version)"""
+        table = await self.get_table()
+        columns = self.resolve_metrics(table, metrics)
+        key = (table["version"], tuple(columns))
+        result = self._results.get(key)
+        if result is None:
+            values = np.column_stack([table["columns"][column] for column in columns])
+            result = {"columns": columns, "values": values, **compare(values, table["region_ids"])}
+            self._results[key] = result
+            if len(self._results) > MAX_CACHED_COMPARISONS:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(key)
+        return {**result, "table": table}
+
+
+comparative_analytics = ComparativeAnalyticsService()
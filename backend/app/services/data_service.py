@@ -1,9 +1,13 @@
+import hashlib
 import json
+import logging
 import os
 import pandas as pd
 from typing import List, Dict, Any
 from app.models.county import County
 
+logger = logging.getLogger(__name__)
+
 class DataService:
     def __init__(self, data_dir: str = None):
         if data_dir is None:
@@ -13,7 +17,7 @@ class DataService:
             self.data_dir = os.path.join(project_root, "Energy-data-pipeline", "data")
         else:
             self.data_dir = data_dir
-        print(f"DataService initialized with data_dir: {self.data_dir}")
+        logger.debug(f"DataService initialized with data_dir: {self.data_dir}")
     
     async def load_counties(self) -> List[County]:
         """Load county data from real Kenya energy datasets"""
@@ -75,7 +79,7 @@ class DataService:
             
             return counties
         except Exception as e:
-            print(f"Error loading counties from real data: {e}")
+            logger.error(f"Error loading counties from real data: {e}")
             return []
     
     def _get_county_centroid(self, county_name: str) -> List[float]:
@@ -244,6 +248,16 @@ class DataService:
         }
         return grid_distances.get(county_name, 35.0)  # Default medium-high distance
     
+    def dataset_version(self) -> str:
+        """Identifier that changes whenever any data file is added, removed or modified"""
+        stamps = []
+        for root, _, files in os.walk(self.data_dir):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                stamps.append(f"{os.path.relpath(path, self.data_dir)}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha1("|".join(sorted(stamps)).encode()).hexdigest()[:12]
+    
     async def get_county_by_id(self, county_id: str) -> County:
         """Get specific county by ID"""
         counties = await self.load_counties()
@@ -264,7 +278,7 @@ class DataService:
             df = pd.read_csv(file_path)
             return df.to_dict('records')
         except Exception as e:
-            print(f"Error loading generation data: {e}")
+            logger.error(f"Error loading generation data: {e}")
             return []
     
     async def load_outage_data(self) -> List[Dict[str, Any]]:
@@ -274,7 +288,7 @@ class DataService:
             df = pd.read_csv(file_path)
             return df.to_dict('records')
         except Exception as e:
-            print(f"Error loading outage data: {e}")
+            logger.error(f"Error loading outage data: {e}")
             return []
     
     async def load_weather_data(self) -> List[Dict[str, Any]]:
@@ -284,7 +298,7 @@ class DataService:
             df = pd.read_csv(file_path)
             return df.to_dict('records')
         except Exception as e:
-            print(f"Error loading weather data: {e}")
+            logger.error(f"Error loading weather data: {e}")
             return []
     
     async def load_blackout_analytics(self) -> List[Dict[str, Any]]:
@@ -294,5 +308,5 @@ class DataService:
             df = pd.read_csv(file_path)
             return df.to_dict('records')
         except Exception as e:
-            print(f"Error loading blackout analytics: {e}")
+            logger.error(f"Error loading blackout analytics: {e}")
             return []
\ No newline at end of file
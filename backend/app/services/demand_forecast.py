@@ -0,0 +1,136 @@
+"""
+Demand Forecast Service
+Per-county hourly electricity demand models fitted from the county table
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from app.services.data_service import DataService
+
+HOURS_PER_WEEK = 168
+HOUR_OF_DAY = np.arange(HOURS_PER_WEEK) % 24
+DAY_OF_WEEK = np.arange(HOURS_PER_WEEK) // 24  # Monday = 0
+
+# Kenya's recorded national peak (KPLC, 2024); the fitted models are scaled to reproduce it
+NATIONAL_PEAK_MW = 2177.0
+
+HOUSEHOLD_SIZE = 3.9
+RESIDENTIAL_KWH_PER_HOUSEHOLD_DAY = 1.0  # connected household at average affluence
+COMMERCIAL_KWH_PER_CAPITA_DAY = 0.35  # connected population, commerce and small industry
+HOSPITAL_KW = 80.0  # continuous load per hospital
+SCHOOL_KW = 5.0  # load per school during school hours
+COOLING_THRESHOLD_C = 24.0
+COOLING_SENSITIVITY = 0.03  # extra daytime commercial load per °C above the threshold
+
+
+def _normalised(profile: np.ndarray) -> np.ndarray:
+    return profile / profile.mean()
+
+
+# Hour-of-week shapes, each with a weekly mean of 1
+RESIDENTIAL_PROFILE = _normalised(
+    np.select([(HOUR_OF_DAY >= 18) & (HOUR_OF_DAY <= 22), (HOUR_OF_DAY >= 6) & (HOUR_OF_DAY <= 8),
+               (HOUR_OF_DAY >= 9) & (HOUR_OF_DAY <= 17)], [1.8, 1.2, 0.8], default=0.5)
+    * np.where(DAY_OF_WEEK >= 5, 1.05, 1.0)
+)
+COMMERCIAL_PROFILE = _normalised(
+    np.where((HOUR_OF_DAY >= 8) & (HOUR_OF_DAY <= 18), 1.6, 0.6)
+    * np.select([DAY_OF_WEEK == 5, DAY_OF_WEEK == 6], [0.8, 0.6], default=1.0)
+)
+SCHOOL_PROFILE = ((HOUR_OF_DAY >= 8) & (HOUR_OF_DAY <= 16) & (DAY_OF_WEEK < 5)).astype(float)
+COOLING_HOURS = ((HOUR_OF_DAY >= 10) & (HOUR_OF_DAY <= 17)).astype(float)
+
+
+def fit_county_models(counties: List[Dict[str, Any]], weather: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fit one demand model per county and return their hour-of-week curves (MW)
+
+    Each county's demand is residential + commercial + institutional load. Component
+    sizes come from population, energy access, poverty (as an affluence proxy),
+    hospitals and schools; commercial load rises with temperature during the day.
+    A single national factor then calibrates all counties to NATIONAL_PEAK_MW.
+    """
+    population = np.array([c["population"] for c in counties], dtype=float)
+    access = np.clip(np.array([c["energy_access_score"] for c in counties], dtype=float) / 100, 0, 1)
+    affluence = 0.5 + (1 - np.clip(np.array([c["poverty_index"] for c in counties], dtype=float) / 100, 0, 1))
+    hospitals = np.array([c["hospitals"] for c in counties], dtype=float)
+    schools = np.array([c["schools"] for c in counties], dtype=float)
+    temperature = np.array([weather.get(c["county_name"], {}).get("temperature", COOLING_THRESHOLD_C)
+                            for c in counties], dtype=float)
+
+    # Average MW of each component
+    residential = population / HOUSEHOLD_SIZE * access * RESIDENTIAL_KWH_PER_HOUSEHOLD_DAY * affluence / 24 / 1000
+    commercial = population * access * COMMERCIAL_KWH_PER_CAPITA_DAY * affluence / 24 / 1000
+    cooling = 1 + COOLING_SENSITIVITY * np.clip(temperature - COOLING_THRESHOLD_C, 0, None)
+
+    weekly = (
+        residential[:, None] * RESIDENTIAL_PROFILE
+        + commercial[:, None] * COMMERCIAL_PROFILE * (1 + (cooling[:, None] - 1) * COOLING_HOURS)
+        + (hospitals * HOSPITAL_KW / 1000)[:, None]
+        + (schools * SCHOOL_KW / 1000)[:, None] * SCHOOL_PROFILE
+    )
+    national_peak = weekly.sum(axis=0).max()
+    scale = NATIONAL_PEAK_MW / national_peak if national_peak > 0 else 0.0
+
+    return {
+        "counties": [c["county_name"] for c in counties],
+        "weekly_mw": (weekly * scale).astype(np.float32),
+        "calibration_factor": float(scale),
+    }
+
+
+class DemandForecastService:
+    def __init__(self, data_service: Optional[DataService] = None):
+        self.data_service = data_service or DataService()
+        self._model: Optional[Dict[str, Any]] = None  # refitted when the dataset version changes
+
+    async def get_model(self) -> Dict[str, Any]:
+        """Fitted county models for the current dataset version"""
+        version = self.data_service.dataset_version()
+        if self._model is None or self._model["version"] != version:
+            counties = [county.dict() for county in await self.data_service.load_counties()]
+            if not counties:
+                raise ValueError("No county data available for demand forecasting")
+            model = fit_county_models(counties, self.data_service._get_weather_data())
+            model["version"] = version
+            model["index"] = {name.lower(): i for i, name in enumerate(model["counties"])}
+            self._model = model
+        return self._model
+
+    async def forecast(self, counties: Optional[List[str]] = None, hours: int = 24,
+                       start: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Hourly demand (MW) for the given counties, or all of them, in one batched lookup
+
+        Returns county names, timestamps and a (counties, hours) demand array.
+        """
+        model = await self.get_model()
+        if counties is None:
+            rows = np.arange(len(model["counties"]))
+        else:
+            unknown = [name for name in counties if name.strip().lower() not in model["index"]]
+            if unknown:
+                raise ValueError(f"Unknown counties: {unknown}")
+            rows = np.array([model["index"][name.strip().lower()] for name in counties], dtype=int)
+
+        start = (start or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        hour_of_week = (start.weekday() * 24 + start.hour + np.arange(hours)) % HOURS_PER_WEEK
+
+        return {
+            "counties": [model["counties"][i] for i in rows],
+            "timestamps": [start + timedelta(hours=h) for h in range(hours)],
+            "demand_mw": model["weekly_mw"][rows[:, None], hour_of_week[None, :]],
+            # Typical-week models lose skill as the horizon grows
+            "confidence": 0.95 - 0.10 * np.minimum(np.arange(hours) / HOURS_PER_WEEK, 1.0),
+            "dataset_version": model["version"],
+        }
+
+    def clear_cache(self) -> None:
+        """Force a refit on the next forecast"""
+        self._model = None
+
+
+demand_forecaster = DemandForecastService()
@@ -0,0 +1,196 @@
+"""
+Feature Store
+Materializes the planner's engineered and scaled feature matrix per dataset version and
+model version, recomputing only the county rows that changed
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.models.county_energy_model import CountyEnergyPlanner, FEATURE_COLUMNS
+from app.services.data_service import DataService
+from app.services.model_registry import PlannerRegistry, planner_registry
+
+INPUT_COLUMNS = ['population', 'hospitals', 'schools', 'blackout_freq',
+                 'economic_activity', 'grid_distance', 'current_kwh']
+ENGINEERED_COLUMNS = INPUT_COLUMNS + ['energy_deficit']
+MAX_SNAPSHOTS = 4
+
+
+def planner_feature_row(county) -> Dict[str, Any]:
+    """Planner model inputs estimated from a county record"""
+    return {
+        "county_name": county.county_name,
+        "population": county.population,
+        "hospitals": county.hospitals,
+        "schools": county.schools,
+        # Blackout frequency based on reliability score (inverse relationship)
+        "blackout_freq": max(0, (100 - county.avg_reliability_score) / 10),
+        # Economic activity based on energy access and population density
+        "economic_activity": min(100, county.energy_access_score * 0.8 + (county.population / 50000) * 20),
+        # Grid distance estimation based on energy access (higher access = closer to grid)
+        "grid_distance": max(0.5, (100 - county.energy_access_score) / 5),
+        # Current kWh estimation based on population and energy access
+        "current_kwh": county.population * county.energy_access_score * 0.1,
+    }
+
+
+class FeatureSet:
+    """
+    One materialized snapshot: engineered features of every county and, when a model
+    is given, the same rows scaled for it. Arrays are read-only and shared by every
+    consumer of the snapshot.
+    """
+
+    def __init__(self, dataset_version: str, model_key: Optional[str], county_names: List[str],
+                 engineered: np.ndarray, scaled: Optional[np.ndarray], row_hashes: np.ndarray,
+                 fill_values: Dict[str, float], energy_per_capita: float):
+        self.dataset_version = dataset_version
+        self.model_key = model_key
+        self.county_names = county_names
+        self.engineered = engineered
+        self.scaled = scaled
+        self.row_hashes = row_hashes
+        self.fill_values = fill_values
+        self.energy_per_capita = energy_per_capita
+        self._rows = {name.lower(): i for i, name in enumerate(county_names)}
+        for array in (engineered, scaled, row_hashes):
+            if array is not None:
+                array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.county_names)
+
+    @property
+    def data_hash(self) -> str:
+        return hashlib.sha1(self.row_hashes.tobytes()).hexdigest()[:12]
+
+    def row(self, county_name: str) -> Optional[int]:
+        """Row index of a county (case-insensitive), or None"""
+        return self._rows.get(county_name.lower())
+
+    def features(self, columns: List[str] = FEATURE_COLUMNS) -> np.ndarray:
+        """Unscaled feature matrix in the given column order"""
+        return self.engineered[:, [ENGINEERED_COLUMNS.index(col) for col in columns]]
+
+    def frame(self) -> pd.DataFrame:
+        """Engineered rows with county names, as train_model(..., prepared=True) takes them"""
+        frame = pd.DataFrame(self.engineered, columns=ENGINEERED_COLUMNS)
+        frame.insert(0, 'county_name', self.county_names)
+        return frame
+
+
+class FeatureStore:
+    def __init__(self, data_service: Optional[DataService] = None, registry: Optional[PlannerRegistry] = None):
+        self.data_service = data_service or DataService()
+        self.registry = registry or planner_registry
+        self._snapshots: "OrderedDict[tuple, FeatureSet]" = OrderedDict()
+        self._engineer: Optional[CountyEnergyPlanner] = None  # default planner for feature engineering only
+        self._lock = asyncio.Lock()
+        self._stats = {'hits': 0, 'builds': 0, 'rows_reused': 0, 'rows_engineered': 0, 'rows_scaled': 0,
+                       'build_ms': deque(maxlen=100)}
+
+    async def get(self, planner: Optional[CountyEnergyPlanner] = None) -> FeatureSet:
+        """
+        Features of the current county table, scaled for planner (default: the serving one)
+
+        Snapshots are kept per (dataset version, model version). A new one starts
+        from the latest: rows with unchanged inputs keep their engineered features
+        (unless the fill values they depended on changed) and, for the same model,
+        their scaled features, so only changed rows are engineered and scaled.
+        """
+        planner = planner if planner is not None else self.registry.planner
+        model_key = f"{planner.model_version}:{planner.last_trained}" if planner is not None else None
+        async with self._lock:
+            version = self.data_service.dataset_version()
+            key = (version, model_key)
+            if key in self._snapshots:
+                self._snapshots.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._snapshots[key]
+
+            started = time.perf_counter()
+            rows = [planner_feature_row(county) for county in await self.data_service.load_counties()]
+            if not rows:
+                raise ValueError("No county data available")
+            snapshot = self._build(version, model_key, pd.DataFrame(rows), planner)
+            self._snapshots[key] = snapshot
+            while len(self._snapshots) > MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+            self._stats['builds'] += 1
+            self._stats['build_ms'].append((time.perf_counter() - started) * 1000)
+            return snapshot
+
+    def _build(self, version: str, model_key: Optional[str], raw: pd.DataFrame,
+               planner: Optional[CountyEnergyPlanner]) -> FeatureSet:
+        engineer = planner or self._default_planner()
+        is_valid, errors = engineer.validate_input_data(raw)
+        if not is_valid:
+            raise ValueError(f"Data validation failed: {errors}")
+        row_hashes = pd.util.hash_pandas_object(raw, index=False).to_numpy()
+        fill_values = {col: float(value) for col, value in engineer._fill_values(raw).items()}
+        energy_per_capita = engineer.config['data']['energy_per_capita']
+
+        engineered = np.empty((len(raw), len(ENGINEERED_COLUMNS)))
+        scaled = np.empty((len(raw), len(FEATURE_COLUMNS))) if planner is not None and planner.is_trained else None
+        reuse_engineered = np.zeros(len(raw), dtype=bool)
+        reuse_scaled = np.zeros(len(raw), dtype=bool)
+
+        previous = next(reversed(self._snapshots.values()), None)
+        if previous is not None and previous.energy_per_capita == energy_per_capita:
+            order = np.argsort(previous.row_hashes)
+            known = previous.row_hashes[order]
+            position = np.minimum(np.searchsorted(known, row_hashes), len(known) - 1)
+            found = known[position] == row_hashes
+            # A row with missing inputs was filled from the whole table's statistics
+            if previous.fill_values != fill_values:
+                found &= ~raw[INPUT_COLUMNS].isna().any(axis=1).to_numpy()
+            source = order[position[found]]
+            reuse_engineered = found
+            engineered[found] = previous.engineered[source]
+            if scaled is not None and previous.scaled is not None and previous.model_key == model_key:
+                reuse_scaled = found
+                scaled[found] = previous.scaled[source]
+
+        pending = ~reuse_engineered
+        if pending.any():
+            data, _ = engineer._prepare_features(raw.loc[pending], fill_values=fill_values)
+            engineered[pending] = data[ENGINEERED_COLUMNS].to_numpy(dtype=float)
+        if scaled is not None and (~reuse_scaled).any():
+            columns = [ENGINEERED_COLUMNS.index(col) for col in planner.feature_columns]
+            unscaled = pd.DataFrame(engineered[~reuse_scaled][:, columns], columns=planner.feature_columns)
+            scaled[~reuse_scaled] = planner.scaler.transform(unscaled)
+
+        self._stats['rows_reused'] += int(reuse_engineered.sum())
+        self._stats['rows_engineered'] += int(pending.sum())
+        self._stats['rows_scaled'] += int((~reuse_scaled).sum()) if scaled is not None else 0
+        return FeatureSet(version, model_key, raw['county_name'].tolist(), engineered, scaled,
+                          row_hashes, fill_values, energy_per_capita)
+
+    def _default_planner(self) -> CountyEnergyPlanner:
+        if self._engineer is None:
+            self._engineer = CountyEnergyPlanner()
+        return self._engineer
+
+    def status(self) -> Dict[str, Any]:
+        """Materialized snapshots and how much of each rebuild was reused"""
+        build_ms = list(self._stats['build_ms'])
+        return {
+            'snapshots': [{'dataset_version': version, 'model': model, 'rows': len(snapshot),
+                           'scaled': snapshot.scaled is not None}
+                          for (version, model), snapshot in self._snapshots.items()],
+            **{name: value for name, value in self._stats.items() if name != 'build_ms'},
+            'build_ms': {
+                'last': round(build_ms[-1], 3) if build_ms else None,
+                'mean': round(float(np.mean(build_ms)), 3) if build_ms else None,
+            },
+        }
+
+
+feature_store = FeatureStore()
@@ -0,0 +1,303 @@
+"""
+Fleet Simulation Service
+Simulates many mini-grid sites at once as a site x hour array
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional
+
+import numpy as np
+
+from app.services.data_service import DataService
+from app.services.solar_resource import SolarResourceService, solar_resource
+from app.services.battery_degradation import assess_degradation
+
+HOURS = np.arange(24)
+
+# Same daily demand shapes as the single-site /api/minigrids/simulate model
+DEMAND_MULTIPLIER = np.select(
+    [((HOURS >= 6) & (HOURS <= 9)) | ((HOURS >= 18) & (HOURS <= 22)), (HOURS >= 12) & (HOURS <= 14)],
+    [1.5, 1.2],
+    default=0.6
+)
+SCHOOL_HOURS = ((HOURS >= 8) & (HOURS <= 16)).astype(float)
+
+DEFAULT_SITE = {
+    "solar_capacity_kw": 50.0,
+    "battery_capacity_kwh": 200.0,
+    "households_served": 100.0,
+    "solar_irradiance_kwh_m2": float("nan"),  # NaN: use the county solar profile unscaled
+    "grid_distance_km": 50.0,
+    "hospitals": 5.0,
+    "schools": 20.0,
+}
+
+DIESEL_COST_PER_KWH = 0.25  # USD, matches the single-site simulation
+
+# Fleets are simulated in shards of SHARD_SIZE sites (one progress step each);
+# above SHARD_SITE_THRESHOLD sites the shards run in worker processes
+SHARD_SITE_THRESHOLD = 2000
+SHARD_SIZE = 1000
+
+
+def site_demand_kw(households, hospitals, schools) -> np.ndarray:
+    """Expected hourly demand (kW) of each site, shape (sites, 24)"""
+    households, hospitals, schools = (np.atleast_1d(np.asarray(v, dtype=float)) for v in (households, hospitals, schools))
+    return (
+        (households * 0.5)[:, None] * DEMAND_MULTIPLIER
+        + (hospitals * 2.0)[:, None]
+        + (schools * 0.3)[:, None] * SCHOOL_HOURS
+    )
+
+
+def simulate_site_block(block: Dict[str, np.ndarray], seed=None) -> Dict[str, np.ndarray]:
+    """
+    Simulate 24 hours for every site in the block, returning (sites, 24) arrays
+
+    block["solar_profile"] holds each site's (24,) irradiance in kW/m²; a site with an
+    explicit solar_irradiance_kwh_m2 has its profile rescaled to that daily total.
+    """
+    rng = np.random.default_rng(seed)
+    n_sites = len(block["solar_capacity_kw"])
+
+    profile = block["solar_profile"]
+    profile_total = profile.sum(axis=1)
+    irradiance = block["solar_irradiance_kwh_m2"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(np.isnan(irradiance) | (profile_total <= 0), 1.0, irradiance / profile_total)
+    generation = (block["solar_capacity_kw"] * scale)[:, None] * profile
+    generation = generation * rng.uniform(0.85, 1.0, (n_sites, 24))
+
+    demand = site_demand_kw(block["households_served"], block["hospitals"], block["schools"])
+    demand = demand * rng.uniform(0.9, 1.1, (n_sites, 24))
+
+    # Battery state of charge is sequential in time but vectorized across sites
+    soc_step = (generation - demand) / block["battery_capacity_kwh"][:, None] * 100
+    battery_soc = np.empty((n_sites, 24))
+    soc = np.full(n_sites, 80.0)
+    for hour in range(24):
+        step = soc_step[:, hour]
+        soc = np.where(step > 0, np.minimum(100, soc + step), np.maximum(20, soc + step))
+        battery_soc[:, hour] = soc
+
+    return {
+        "generation_kw": generation,
+        "demand_kw": demand,
+        "battery_soc": battery_soc,
+        "grid_export": np.maximum(generation - demand, 0),
+    }
+
+
+def summarize_site_block(block: Dict[str, np.ndarray], seed=None) -> Dict[str, np.ndarray]:
+    """Simulate a block and reduce it to per-site totals and fleet hourly sums"""
+    result = simulate_site_block(block, seed)
+    wear = assess_degradation(result["battery_soc"])
+    return {
+        "generation_kwh": result["generation_kw"].sum(axis=1),
+        "demand_kwh": result["demand_kw"].sum(axis=1),
+        "grid_export_kwh": result["grid_export"].sum(axis=1),
+        "min_battery_soc": result["battery_soc"].min(axis=1),
+        "battery_replacement_year": wear["replacement_year"],
+        "battery_fade_first_year": wear["capacity_fade_first_year"],
+        "hourly_generation_kw": result["generation_kw"].sum(axis=0),
+        "hourly_demand_kw": result["demand_kw"].sum(axis=0),
+        "hourly_grid_export": result["grid_export"].sum(axis=0),
+    }
+
+
+def _efficiency_score(generation, demand):
+    """Efficiency score on the same scale as the single-site simulation"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = np.minimum(100, generation / demand * 90)
+    return np.where(demand > 0, score, 0.0)
+
+
+def _mean_or_none(values: np.ndarray):
+    """Mean ignoring NaN, or None if every value is NaN"""
+    finite = values[~np.isnan(values)]
+    return round(float(finite.mean()), 1) if len(finite) else None
+
+
+class FleetSimulationService:
+    def __init__(self, data_service: Optional[DataService] = None, max_workers: Optional[int] = None,
+                 solar: Optional[SolarResourceService] = None):
+        self.data_service = data_service or DataService()
+        self.solar = solar or solar_resource
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+
+    async def build_sites(self, sites: Optional[List[Dict[str, Any]]] = None,
+                          priority_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fill site configs from the county table, or derive one site per county"""
+        if priority_threshold is not None:
+            try:
+                priority_threshold = float(priority_threshold)
+            except (TypeError, ValueError):
+                raise ValueError(f"priority_threshold must be a number, got {priority_threshold!r}")
+        if sites is not None and not isinstance(sites, list):
+            raise ValueError("sites must be a list of site objects")
+        counties = {c.county_name.lower(): c for c in await self.data_service.load_counties()}
+
+        if not sites:
+            sites = [
+                {"county": county.county_name}
+                for county in counties.values()
+                if priority_threshold is None or county.priority_score >= priority_threshold
+            ]
+
+        built = []
+        for site in sites:
+            if not isinstance(site, dict):
+                raise ValueError(f"Each site must be an object, got {site!r}")
+            county = counties.get(str(site.get("county") or site.get("location") or "").lower())
+            defaults = dict(DEFAULT_SITE)
+            if county:
+                defaults["grid_distance_km"] = self.data_service._estimate_grid_distance(county.county_name)
+                # A single site serves at most the default facility footprint
+                defaults["hospitals"] = min(county.hospitals, DEFAULT_SITE["hospitals"])
+                defaults["schools"] = min(county.schools, DEFAULT_SITE["schools"])
+
+            facilities = site.get("priority_facilities") or {}
+            if not isinstance(facilities, dict):
+                raise ValueError("priority_facilities must be an object")
+            config = {key: site.get(key) if site.get(key) is not None else value for key, value in defaults.items()}
+            for key in ("hospitals", "schools"):
+                if facilities.get(key) is not None:
+                    config[key] = facilities[key]
+            for key in DEFAULT_SITE:
+                try:
+                    config[key] = float(config[key])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Site {key} must be a number, got {config[key]!r}")
+            config["county"] = county.county_name if county else (site.get("county") or "Unknown")
+            config["day_of_year"] = site.get("day_of_year")
+            built.append(config)
+        return built
+
+    def simulate(self, sites: List[Dict[str, Any]], seed: Optional[int] = None,
+                 on_progress: Optional[Callable[[int, int, List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        """
+        Simulate all sites together and aggregate per county and nationally
+
+        Args:
+            sites: Site configs as returned by build_sites
+            seed: Optional seed for reproducible runs
+            on_progress: Called as on_progress(shards_done, shards_total, county_rows)
+                with the county aggregates of each shard as it completes
+        """
+        if not sites:
+            raise ValueError("Fleet simulation requires at least one site")
+
+        block = {key: np.array([float(site[key]) for site in sites]) for key in DEFAULT_SITE}
+        block["solar_profile"] = self._solar_profiles(sites)
+        if np.any(block["battery_capacity_kwh"] <= 0):
+            raise ValueError("battery_capacity_kwh must be positive for every site")
+
+        site_counties = [site["county"] for site in sites]
+        n_sites = len(sites)
+        starts = list(range(0, n_sites, SHARD_SIZE))
+        seeds = [seed] if len(starts) == 1 else np.random.SeedSequence(seed).spawn(len(starts))
+        shards = [{key: values[start:start + SHARD_SIZE] for key, values in block.items()} for start in starts]
+
+        parts = [None] * len(shards)
+        for done, (i, part) in enumerate(self._run_shards(shards, seeds, parallel=n_sites > SHARD_SITE_THRESHOLD), 1):
+            parts[i] = part
+            if on_progress:
+                on_progress(done, len(shards), self._county_aggregates(site_counties[starts[i]:starts[i] + SHARD_SIZE], part))
+
+        summary = {}
+        for key in parts[0]:
+            if key.startswith("hourly_"):
+                summary[key] = np.sum([part[key] for part in parts], axis=0)
+            else:
+                summary[key] = np.concatenate([part[key] for part in parts])
+
+        return {
+            "simulation_id": f"fleet_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            "status": "completed",
+            "sites_simulated": n_sites,
+            "shards": len(shards),
+            "national": self._national_aggregate(summary),
+            "counties": self._county_aggregates(site_counties, summary),
+        }
+
+    def _solar_profiles(self, sites: List[Dict[str, Any]]) -> np.ndarray:
+        """(sites, 24) slices of the cached county profiles for each site's simulated day"""
+        names, index = np.unique(np.array([site["county"] for site in sites]), return_inverse=True)
+        days = np.array([site.get("day_of_year") or datetime.now().timetuple().tm_yday for site in sites])
+        start = ((days.astype(int) - 1) % 365) * 24
+        profiles = self.solar.get_profiles(list(names))
+        return profiles[index[:, None], start[:, None] + HOURS].astype(float)
+
+    def _run_shards(self, shards: List[Dict[str, np.ndarray]], seeds: list, parallel: bool):
+        """Yield (shard_index, summary) as shards finish, using worker processes for large fleets"""
+        if not parallel or self.max_workers <= 1:
+            for i, (shard, shard_seed) in enumerate(zip(shards, seeds)):
+                yield i, summarize_site_block(shard, shard_seed)
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        futures = {
+            self._executor.submit(summarize_site_block, shard, shard_seed): i
+            for i, (shard, shard_seed) in enumerate(zip(shards, seeds))
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def _national_aggregate(self, summary: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        total_generation = float(summary["generation_kwh"].sum())
+        total_demand = float(summary["demand_kwh"].sum())
+        return {
+            "total_generation_kwh": round(total_generation, 2),
+            "total_demand_kwh": round(total_demand, 2),
+            "total_grid_export_kwh": round(float(summary["grid_export_kwh"].sum()), 2),
+            "efficiency_score": round(float(_efficiency_score(total_generation, total_demand)), 1),
+            "cost_savings_usd": round(total_demand * DIESEL_COST_PER_KWH * 0.8, 2),
+            "avg_battery_replacement_year": _mean_or_none(summary["battery_replacement_year"]),
+            "hourly_profile": [
+                {
+                    "hour": hour,
+                    "generation_kw": round(float(summary["hourly_generation_kw"][hour]), 2),
+                    "demand_kw": round(float(summary["hourly_demand_kw"][hour]), 2),
+                    "grid_export": round(float(summary["hourly_grid_export"][hour]), 2)
+                }
+                for hour in range(24)
+            ]
+        }
+
+    def _county_aggregates(self, site_counties: List[str], summary: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        names, index = np.unique(np.array(site_counties), return_inverse=True)
+        sites = np.bincount(index, minlength=len(names))
+        generation = np.bincount(index, weights=summary["generation_kwh"], minlength=len(names))
+        demand = np.bincount(index, weights=summary["demand_kwh"], minlength=len(names))
+        export = np.bincount(index, weights=summary["grid_export_kwh"], minlength=len(names))
+        min_soc = np.full(len(names), 100.0)
+        np.minimum.at(min_soc, index, summary["min_battery_soc"])
+        # Batteries that never reach end of life (NaN) are left out of the mean
+        wears_out = ~np.isnan(summary["battery_replacement_year"])
+        replacement_sum = np.bincount(index, weights=np.where(wears_out, summary["battery_replacement_year"], 0),
+                                      minlength=len(names))
+        replacement_count = np.bincount(index, weights=wears_out, minlength=len(names))
+        efficiency = _efficiency_score(generation, demand)
+
+        return [
+            {
+                "county": str(names[i]),
+                "sites": int(sites[i]),
+                "total_generation_kwh": round(float(generation[i]), 2),
+                "total_demand_kwh": round(float(demand[i]), 2),
+                "total_grid_export_kwh": round(float(export[i]), 2),
+                "efficiency_score": round(float(efficiency[i]), 1),
+                "cost_savings_usd": round(float(demand[i]) * DIESEL_COST_PER_KWH * 0.8, 2),
+                "min_battery_soc": round(float(min_soc[i]), 2),
+                "avg_battery_replacement_year": round(float(replacement_sum[i] / replacement_count[i]), 1)
+                if replacement_count[i] else None
+            }
+            for i in np.argsort(-generation)
+        ]
+
+
+fleet_simulation_service = FleetSimulationService()
@@ -0,0 +1,139 @@
+"""
+Generation Forecast Service
+Hourly output of the KenGen plant register from capacity-factor models
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from app.services.data_service import DataService
+from app.services.solar_resource import SolarResourceService, solar_resource, HOURS_PER_YEAR
+
+HOUR_OF_DAY = np.arange(HOURS_PER_YEAR) % 24
+DAY_OF_YEAR = np.arange(HOURS_PER_YEAR) // 24
+
+# Mean capacity factors of dispatchable / baseload types
+BASELOAD_CAPACITY_FACTOR = {"geothermal": 0.92, "thermal": 0.55, "biomass": 0.6}
+DEFAULT_CAPACITY_FACTOR = 0.5
+
+HYDRO_CAPACITY_FACTOR = 0.55
+HYDRO_PEAK_DAYS = 120  # long rains; the short-rains peak follows half a year later
+WIND_CAPACITY_FACTOR = 0.55
+WIND_PEAK_DAY = 200  # strongest monsoon winds around July
+SOLAR_PERFORMANCE_RATIO = 0.8
+SOLAR_TEMPERATURE_COEFFICIENT = 0.004  # output loss per °C cell temperature above 25 °C
+CELL_TEMPERATURE_RISE = 30.0  # °C above ambient at 1 kW/m²
+
+MAX_CACHED_WINDOWS = 16
+
+
+def _unit_mean(profile: np.ndarray) -> np.ndarray:
+    return profile / profile.mean()
+
+
+# Typical-year shapes with a mean of 1
+HYDRO_SHAPE = _unit_mean(
+    (1 + 0.2 * np.cos(2 * np.pi * (DAY_OF_YEAR - HYDRO_PEAK_DAYS) / 182.5))
+    * np.where((HOUR_OF_DAY >= 18) & (HOUR_OF_DAY <= 22), 1.3, 1.0)  # storage follows the evening peak
+)
+WIND_SHAPE = _unit_mean(
+    (1 + 0.2 * np.cos(2 * np.pi * (DAY_OF_YEAR - WIND_PEAK_DAY) / 365))
+    * (1 + 0.25 * np.cos(2 * np.pi * (HOUR_OF_DAY - 2) / 24))  # night-time low-level jet
+)
+
+
+class GenerationForecastService:
+    def __init__(self, data_service: Optional[DataService] = None, solar: Optional[SolarResourceService] = None):
+        self.data_service = data_service or DataService()
+        self.solar = solar or solar_resource
+        self._fleet: Optional[Dict[str, Any]] = None  # annual output, rebuilt when the dataset version changes
+        self._windows: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+    async def get_fleet(self) -> Dict[str, Any]:
+        """Plant register with each plant's typical-year hourly output (MW)"""
+        version = self.data_service.dataset_version()
+        if self._fleet is None or self._fleet["version"] != version:
+            plants = await self.data_service.load_generation_data()
+            self._fleet = self._build_fleet(plants)
+            self._fleet["version"] = version
+            self._windows.clear()
+        return self._fleet
+
+    def _build_fleet(self, plants: List[Dict[str, Any]]) -> Dict[str, Any]:
+        capacity = np.array([float(p.get("capacity_mw") or 0) for p in plants])
+        types = np.array([str(p.get("plant_type", "")).strip().lower() for p in plants])
+        counties = [str(p.get("county", "")) for p in plants]
+        weather = self.data_service._get_weather_data()
+
+        capacity_factor = np.empty((len(plants), HOURS_PER_YEAR), dtype=np.float32)
+        for plant_type in np.unique(types):
+            rows = types == plant_type
+            if plant_type == "hydro":
+                capacity_factor[rows] = HYDRO_CAPACITY_FACTOR * HYDRO_SHAPE
+            elif plant_type == "wind":
+                capacity_factor[rows] = WIND_CAPACITY_FACTOR * WIND_SHAPE
+            elif plant_type == "solar":
+                names = [counties[i] for i in np.flatnonzero(rows)]
+                irradiance = self.solar.get_profiles(names)
+                ambient = np.array([weather.get(self.solar.resolve_county(name), {}).get("temperature", 25.0)
+                                    for name in names])[:, None]
+                cell_temperature = ambient + CELL_TEMPERATURE_RISE * irradiance
+                derate = 1 - SOLAR_TEMPERATURE_COEFFICIENT * np.clip(cell_temperature - 25, 0, None)
+                capacity_factor[rows] = irradiance * SOLAR_PERFORMANCE_RATIO * derate
+            else:
+                capacity_factor[rows] = BASELOAD_CAPACITY_FACTOR.get(plant_type, DEFAULT_CAPACITY_FACTOR)
+
+        output = capacity[:, None] * capacity_factor
+        output.setflags(write=False)
+        return {
+            "plants": [p.get("plant_name", "") for p in plants],
+            "plant_types": list(types),
+            "counties": counties,
+            "capacity_mw": capacity,
+            "annual_mw": output,
+        }
+
+    async def forecast(self, start_hour: int, hours: int, county: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Per-plant hourly output for hours from start_hour (hour of year), wrapping over year end
+
+        Windows are sliced from the cached annual arrays and memoised per
+        (dataset version, start hour, horizon), so a year-long horizon costs one copy.
+        """
+        fleet = await self.get_fleet()
+        key = (fleet["version"], start_hour % HOURS_PER_YEAR, hours)
+        output = self._windows.get(key)
+        if output is None:
+            index = (start_hour + np.arange(hours)) % HOURS_PER_YEAR
+            output = fleet["annual_mw"][:, index]
+            output.setflags(write=False)
+            self._windows[key] = output
+            if len(self._windows) > MAX_CACHED_WINDOWS:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+
+        rows = np.arange(len(fleet["plants"]))
+        if county and county != "national":
+            wanted = self.solar.resolve_county(county)
+            rows = np.array([i for i, name in enumerate(fleet["counties"])
+                             if self.solar.resolve_county(name) == wanted], dtype=int)
+
+        return {
+            "plants": [fleet["plants"][i] for i in rows],
+            "plant_types": [fleet["plant_types"][i] for i in rows],
+            "counties": [fleet["counties"][i] for i in rows],
+            "capacity_mw": fleet["capacity_mw"][rows],
+            "output_mw": output[rows],
+            "dataset_version": fleet["version"],
+        }
+
+    def clear_cache(self) -> None:
+        """Drop the fleet and all cached forecast windows"""
+        self._fleet = None
+        self._windows.clear()
+
+
+generation_forecaster = GenerationForecastService()
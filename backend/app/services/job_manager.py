@@ -0,0 +1,138 @@
+"""
+Background Job Manager
+Runs long computations off the event loop and streams their progress
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from app.utils.logging_setup import log_context
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.job_id = f"{kind}_{uuid.uuid4().hex[:12]}"
+        self.kind = kind
+        self.status = "pending"
+        self.progress = 0.0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        # Each event carries only what is new since the previous one
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def snapshot(self, include_result: bool = True) -> Dict[str, Any]:
+        """Current job state for polling clients"""
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "events": len(self.events),
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            "result": self.result if include_result else None
+        }
+
+
+class JobManager:
+    def __init__(self, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def submit(self, kind: str, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> Job:
+        """
+        Start func(*args, on_progress=..., **kwargs) in a worker thread
+
+        func reports progress by calling on_progress(done, total, partial), where
+        partial is the incremental result produced since the previous call.
+        """
+        job = Job(kind)
+        self.jobs[job.job_id] = job
+        self._evict()
+        job._task = asyncio.create_task(self._run(job, func, *args, **kwargs))
+        return job
+
+    def get(self, job_id: str) -> Job:
+        if job_id not in self.jobs:
+            raise KeyError(f"Job {job_id} not found")
+        return self.jobs[job_id]
+
+    async def _run(self, job: Job, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> None:
+        loop = asyncio.get_running_loop()
+
+        def on_progress(done: int, total: int, partial: Any = None) -> None:
+            event = {"event": "progress", "done": done, "total": total, "data": partial}
+            loop.call_soon_threadsafe(self._publish, job, event, done / total if total else 1.0)
+
+        job.status = "running"
+        # The task runs in its own context copy, so this tags only the job's records
+        log_context(job_id=job.job_id)
+        try:
+            job.result = await asyncio.to_thread(func, *args, on_progress=on_progress, **kwargs)
+            job.status = "completed"
+            self._publish(job, {"event": "completed"}, 1.0)
+        except Exception as e:
+            logger.error(f"Job {job.kind} failed: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+            self._publish(job, {"event": "failed", "error": job.error}, job.progress)
+        finally:
+            job.finished_at = datetime.now()
+
+    def _publish(self, job: Job, event: Dict[str, Any], progress: float) -> None:
+        job.progress = progress
+        event["seq"] = len(job.events)
+        job.events.append(event)
+        # Wake every waiting stream, then arm a fresh event for the next update
+        job._changed.set()
+        job._changed = asyncio.Event()
+
+    async def stream(self, job_id: str, last_seq: int = -1) -> AsyncIterator[Dict[str, Any]]:
+        """Yield events after last_seq, waiting for new ones until the job finishes"""
+        job = self.get(job_id)
+        position = last_seq + 1
+        while True:
+            changed = job._changed
+            while position < len(job.events):
+                yield job.events[position]
+                position += 1
+            if job.is_finished:
+                return
+            await changed.wait()
+
+    def _evict(self) -> None:
+        """Drop the oldest finished jobs once over capacity"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].is_finished:
+                del self.jobs[job_id]
+
+
+def encode_sse(event: Dict[str, Any]) -> str:
+    """Server-Sent Events frame with compact JSON data"""
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+def encode_ndjson(event: Dict[str, Any]) -> str:
+    """Newline-delimited JSON frame"""
+    return json.dumps(event, separators=(",", ":")) + "\n"
+
+
+job_manager = JobManager()
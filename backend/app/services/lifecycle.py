@@ -0,0 +1,180 @@
+"""
+Lifecycle Cash-Flow Engine
+Multi-year mini-grid economics evaluated for many scenarios at once
+"""
+
+from typing import Dict, Any
+
+import numpy as np
+
+# Defaults are in USD; pass KES unit costs and tariffs for KES results
+DEFAULT_ASSUMPTIONS = {
+    "project_years": 25,
+    "discount_rate": 0.10,
+    "pv_cost_per_kw": 1000.0,
+    "battery_cost_per_kwh": 400.0,
+    "fixed_cost": 0.0,
+    "om_fraction": 0.02,  # annual O&M as a share of capex
+    "om_escalation": 0.03,
+    "pv_degradation": 0.005,  # annual output loss
+    "battery_life_years": 10,
+    "battery_cost_decline": 0.05,  # annual fall in replacement battery prices
+    "demand_growth": 0.03,
+    "tariff_per_kwh": 0.25,
+    "tariff_escalation": 0.02,
+}
+
+
+def npv(cash_flows: np.ndarray, discount_rate) -> np.ndarray:
+    """Net present value of (scenarios, years + 1) cash flows, year 0 undiscounted"""
+    years = np.arange(cash_flows.shape[-1])
+    rate = np.asarray(discount_rate, dtype=float)[..., None]
+    return (cash_flows / (1 + rate) ** years).sum(axis=-1)
+
+
+def _npv_horner(cash_flows: np.ndarray, rate: np.ndarray) -> np.ndarray:
+    """NPV via Horner's rule, avoiding a (scenarios, years) power matrix per call"""
+    x = 1 / (1 + rate)
+    total = cash_flows[:, -1].copy()
+    for column in range(cash_flows.shape[1] - 2, -1, -1):
+        total = total * x + cash_flows[:, column]
+    return total
+
+
+def irr(cash_flows: np.ndarray, low: float = -0.99, high: float = 1.0, iterations: int = 60,
+        max_high: float = 1e6) -> np.ndarray:
+    """
+    Internal rate of return per scenario by vectorized bisection
+
+    Where NPV is still positive at high, the upper bound is raised fourfold (up to
+    max_high) so very profitable projects get their IRR rather than NaN. Scenarios
+    whose NPV does not change sign between low and the bound (for example projects
+    that never recover their investment) get NaN.
+    """
+    cash_flows = np.atleast_2d(cash_flows)
+    lo = np.full(cash_flows.shape[0], low)
+    hi = np.full(cash_flows.shape[0], high)
+    npv_lo = _npv_horner(cash_flows, lo)
+    npv_hi = _npv_horner(cash_flows, hi)
+    while True:
+        widen = (npv_hi > 0) & (np.sign(npv_lo) == np.sign(npv_hi)) & (hi < max_high)
+        if not widen.any():
+            break
+        hi = np.where(widen, np.minimum(hi * 4, max_high), hi)
+        npv_hi = _npv_horner(cash_flows, hi)
+    valid = np.sign(npv_lo) != np.sign(npv_hi)
+
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        npv_mid = _npv_horner(cash_flows, mid)
+        same_side = np.sign(npv_mid) == np.sign(npv_lo)
+        lo = np.where(same_side, mid, lo)
+        npv_lo = np.where(same_side, npv_mid, npv_lo)
+        hi = np.where(same_side, hi, mid)
+
+    return np.where(valid, (lo + hi) / 2, np.nan)
+
+
+def payback_years(cash_flows: np.ndarray) -> np.ndarray:
+    """Fractional years until cumulative undiscounted cash flow turns non-negative (NaN if never)"""
+    cash_flows = np.atleast_2d(cash_flows)
+    cumulative = np.cumsum(cash_flows, axis=1)
+    recovered = cumulative >= 0
+    recovered[:, 0] = False
+    first = np.argmax(recovered, axis=1)
+    rows = np.arange(cash_flows.shape[0])
+
+    shortfall = -cumulative[rows, first - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip(shortfall / cash_flows[rows, first], 0, 1)
+    return np.where(recovered.any(axis=1), first - 1 + fraction, np.nan)
+
+
+def evaluate_lifecycle(annual_generation_kwh, annual_demand_kwh, pv_kw, battery_kwh,
+                       **assumptions) -> Dict[str, Any]:
+    """
+    Project yearly cash flows for every scenario and compute NPV, IRR, LCOE and payback
+
+    Every argument (including the assumption overrides listed in DEFAULT_ASSUMPTIONS,
+    except project_years) may be a scalar or an array; arrays are broadcast together
+    so a whole scenario grid is evaluated in one pass.
+
+    Args:
+        annual_generation_kwh: First-year usable generation
+        annual_demand_kwh: First-year demand
+        pv_kw: Installed PV capacity
+        battery_kwh: Installed battery capacity
+
+    Returns:
+        Dict of (scenarios,) arrays plus the (scenarios, years + 1) cash_flows matrix
+    """
+    unknown = set(assumptions) - set(DEFAULT_ASSUMPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown lifecycle assumptions: {sorted(unknown)}")
+    a = {**DEFAULT_ASSUMPTIONS, **assumptions}
+    years = int(a.pop("project_years"))
+
+    names = ["annual_generation_kwh", "annual_demand_kwh", "pv_kw", "battery_kwh"] + list(a)
+    values = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float))
+                                   for v in [annual_generation_kwh, annual_demand_kwh, pv_kw, battery_kwh] + list(a.values())])
+    p = {name: value.ravel()[:, None] for name, value in zip(names, values)}
+    shape = values[0].shape
+
+    t = np.arange(1, years + 1)[None, :]  # operating years 1..N
+    generation = p["annual_generation_kwh"] * (1 - p["pv_degradation"]) ** (t - 1)
+    demand = p["annual_demand_kwh"] * (1 + p["demand_growth"]) ** (t - 1)
+    served = np.minimum(generation, demand)
+
+    capex = (p["pv_kw"] * p["pv_cost_per_kw"] + p["battery_kwh"] * p["battery_cost_per_kwh"] + p["fixed_cost"])
+    revenue = served * p["tariff_per_kwh"] * (1 + p["tariff_escalation"]) ** (t - 1)
+    om = capex * p["om_fraction"] * (1 + p["om_escalation"]) ** (t - 1)
+
+    # Batteries are replaced every battery_life_years, except in the final year
+    life = np.maximum(np.rint(p["battery_life_years"]), 1)
+    replaced = (t % life == 0) & (t < years)
+    replacement = np.where(
+        replaced, p["battery_kwh"] * p["battery_cost_per_kwh"] * (1 - p["battery_cost_decline"]) ** t, 0.0
+    )
+
+    costs = om + replacement
+    cash_flows = np.concatenate([-capex, revenue - costs], axis=1)
+
+    discount = (1 + p["discount_rate"]) ** -t
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lcoe = (capex[:, 0] + (costs * discount).sum(axis=1)) / (served * discount).sum(axis=1)
+
+    return {
+        "capex": capex[:, 0].reshape(shape),
+        "npv": npv(cash_flows, p["discount_rate"][:, 0]).reshape(shape),
+        "irr": irr(cash_flows).reshape(shape),
+        "lcoe": lcoe.reshape(shape),
+        "payback_years": payback_years(cash_flows).reshape(shape),
+        "battery_replacements": replaced.sum(axis=1).reshape(shape),
+        "lifetime_energy_kwh": served.sum(axis=1).reshape(shape),
+        "cash_flows": cash_flows.reshape(shape + (years + 1,)),
+    }
+
+
+def expand_scenarios(parameters: Dict[str, Any], mode: str = "grid", max_scenarios: int = 100000) -> Dict[str, np.ndarray]:
+    """
+    Turn {name: scalar or list} into flat, equally long parameter arrays
+
+    mode="grid" takes the cartesian product of all lists; mode="zip" pairs lists
+    element-wise (they must have equal length or length 1).
+    """
+    arrays = {name: np.atleast_1d(np.asarray(value, dtype=float)).ravel() for name, value in parameters.items()}
+    if mode == "grid":
+        count = int(np.prod([len(v) for v in arrays.values()])) if arrays else 1
+        if count > max_scenarios:
+            raise ValueError(f"Scenario grid has {count} combinations, limit is {max_scenarios}")
+        mesh = np.meshgrid(*arrays.values(), indexing="ij")
+        return {name: grid.ravel() for name, grid in zip(arrays, mesh)}
+    if mode == "zip":
+        try:
+            values = np.broadcast_arrays(*arrays.values())
+        except ValueError:
+            raise ValueError("Scenario lists must have equal length in zip mode")
+        if values and values[0].size > max_scenarios:
+            raise ValueError(f"{values[0].size} scenarios requested, limit is {max_scenarios}")
+        return dict(zip(arrays, values))
+    raise ValueError(f"Unknown scenario mode: {mode}")
@@ -0,0 +1,119 @@
+"""
+Model Registry
+Holds the persisted county planner model, loaded once at application startup
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from app.models.county_energy_model import CountyEnergyPlanner
+from app.models.stage_timer import StageTimer
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "county_energy_model_kaggle.pkl"
+)
+
+
+class PlannerModelUnavailable(RuntimeError):
+    """Raised when a request needs the planner model but it did not load"""
+
+
+class PlannerRegistry:
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = model_path or settings.PLANNER_MODEL_PATH or DEFAULT_MODEL_PATH
+        self.planner: Optional[CountyEnergyPlanner] = None
+        self.status = "not_loaded"
+        self.error: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+        self.load_seconds: Optional[float] = None
+        self.training_data_hash: Optional[str] = None  # set when the model was trained by this service
+        # Shared by every planner this registry serves, so stage counters survive model swaps
+        self.timer = StageTimer(settings.PLANNER_STAGE_TIMING, settings.PLANNER_STAGE_SAMPLE_RATE,
+                                settings.PLANNER_STAGE_MEMORY)
+
+    def load(self) -> bool:
+        """
+        Load the persisted planner, recording why it failed instead of raising
+
+        Status is "ready", "missing" (no artifact), "unavailable" (scikit-learn or
+        joblib not installed) or "incompatible" (the artifact cannot be used with the
+        installed libraries).
+        """
+        started = time.perf_counter()
+        planner = CountyEnergyPlanner()
+        try:
+            planner.load_model(self.model_path)
+        except FileNotFoundError as e:
+            return self._failed("missing", e)
+        except ImportError as e:
+            return self._failed("unavailable", e)
+        except Exception as e:
+            return self._failed("incompatible", e)
+
+        planner.timer = self.timer
+        self.planner = planner
+        self.status = "ready"
+        self.error = None
+        self.loaded_at = datetime.now()
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        return True
+
+    def swap(self, planner: CountyEnergyPlanner, model_path: str, training_data_hash: Optional[str] = None) -> None:
+        """
+        Replace the serving planner with an already loaded one
+
+        Requests hold the planner they got from require() for their whole duration,
+        so they finish on the old model while new requests get the new one; the swap
+        itself is a single reference assignment.
+        """
+        planner.timer = self.timer
+        self.planner = planner
+        self.model_path = model_path
+        self.training_data_hash = training_data_hash
+        self.status = "ready"
+        self.error = None
+        self.loaded_at = datetime.now()
+
+    def _failed(self, status: str, error: Exception) -> bool:
+        self.planner = None
+        self.status = status
+        self.error = str(error)
+        self.loaded_at = None
+        self.load_seconds = None
+        logger.warning(f"Planner model {status}: {error}")
+        return False
+
+    def require(self) -> CountyEnergyPlanner:
+        """The loaded planner, or PlannerModelUnavailable with the load status"""
+        if self.planner is None:
+            raise PlannerModelUnavailable(f"Planner model {self.status}: {self.error or 'not loaded yet'}")
+        return self.planner
+
+    def info(self) -> Dict[str, Any]:
+        """Load status plus the planner's own model information when it is ready"""
+        info = {
+            "status": self.status,
+            "model_path": self.model_path,
+            "error": self.error,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "load_seconds": self.load_seconds,
+            "training_data_hash": self.training_data_hash,
+        }
+        if self.planner is not None:
+            model = self.planner.get_model_info()
+            info.update({
+                "model_version": model["model_version"],
+                "last_trained": model["last_trained"],
+                "feature_columns": model["feature_columns"],
+                "training_metrics": model["training_metrics"],
+            })
+        return info
+
+
+planner_registry = PlannerRegistry()
@@ -0,0 +1,315 @@
+"""
+Model Training Service
+Updates or retrains the county planner in a worker process when new county data is published and hot-swaps it in
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.models.compiled_planner import is_compiled_artifact
+from app.models.county_energy_model import CountyEnergyPlanner
+from app.services.data_service import DataService
+from app.services.feature_store import FeatureStore, feature_store
+from app.services.job_manager import Job, job_manager
+from app.services.model_registry import PlannerRegistry, planner_registry, DEFAULT_MODEL_PATH
+from app.utils.logging_setup import configure_logging
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(DEFAULT_MODEL_PATH), "trained")
+MIN_CANDIDATE_R2 = 0.0  # without a serving model to beat, a candidate must beat predicting the mean
+MAX_HISTORY = 20
+KEEP_ARTIFACTS = 3  # promoted models kept on disk, the serving one included, for rollback
+
+
+def evaluate_planner(planner: CountyEnergyPlanner, frame: pd.DataFrame) -> Dict[str, float]:
+    """R² of a trained planner's priority model on engineered rows (scale-invariant, so comparable across scalers)"""
+    processed, feature_columns = planner.preprocess_data(frame, fit_scaler=False, prepared=True)
+    return {"r2": float(planner.priority_model.score(processed[feature_columns], processed["energy_deficit"]))}
+
+
+def train_candidate(rows: List[Dict[str, Any]], output_path: str, config: Optional[Dict] = None,
+                    baseline_path: Optional[str] = None, row_hashes: Optional[np.ndarray] = None,
+                    seen_hashes: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Worker-process entry point: fit a candidate, save it, and score it and the serving model on the same rows
+
+    rows are engineered feature rows from the feature store.
+
+    Both models are scored on the candidate's test split, which it was not fitted
+    on. The serving model may have been (a forced retrain, a drift fallback or a
+    re-published dataset reuse its training rows), so when seen_hashes lists the
+    rows it learned from, only test rows outside them are used; held_out in the
+    result records whether the comparison is out of sample for both.
+    """
+    from sklearn.model_selection import train_test_split
+
+    frame = pd.DataFrame(rows)
+    started = time.perf_counter()
+    candidate = CountyEnergyPlanner(config)
+    metrics = candidate.train_model(frame, prepared=True)
+    training_seconds = time.perf_counter() - started
+    candidate.save_model(output_path)
+
+    baseline: Optional[Dict[str, Any]] = None
+    if baseline_path:
+        # Same shuffle as train_model's split: it depends only on the row count and seed
+        _, test_index = train_test_split(np.arange(len(frame)), test_size=0.2,
+                                         random_state=candidate.config['model']['random_state'])
+        held_out = None
+        if row_hashes is not None and seen_hashes is not None:
+            unseen = test_index[~np.isin(np.asarray(row_hashes)[test_index], seen_hashes)]
+            held_out = len(unseen) > 1
+            if held_out:
+                test_index = unseen
+        test = frame.iloc[test_index]
+        try:
+            current = CountyEnergyPlanner()
+            current.load_model(baseline_path)
+            baseline = {
+                **evaluate_planner(current, test),
+                "candidate_r2": evaluate_planner(candidate, test)["r2"],
+                "rows": len(test),
+                "held_out": held_out,
+            }
+        except Exception as e:
+            baseline = {"error": str(e)}
+
+    plain = lambda value: value if isinstance(value, int) else float(value)
+    return {
+        "metrics": {key: ({k: plain(v) for k, v in value.items()} if isinstance(value, dict) else plain(value))
+                    for key, value in metrics.items()},
+        "training_seconds": round(training_seconds, 3),
+        "stages": candidate.timer.snapshot()["stages"],
+        "baseline": baseline,
+    }
+
+
+def update_candidate(rows: List[Dict[str, Any]], model_path: str, output_path: str) -> Dict[str, Any]:
+    """Worker-process entry point: fold new rows into a copy of the serving model and save it unless drift is found"""
+    started = time.perf_counter()
+    planner = CountyEnergyPlanner()
+    planner.load_model(model_path)
+    outcome = planner.update_model(pd.DataFrame(rows))
+    if outcome["action"] == "updated":
+        planner.save_model(output_path)
+    return {**outcome, "update_seconds": round(time.perf_counter() - started, 3)}
+
+
+class ModelTrainingService:
+    def __init__(self, registry: Optional[PlannerRegistry] = None, data_service: Optional[DataService] = None,
+                 model_dir: Optional[str] = None, features: Optional[FeatureStore] = None):
+        self.registry = registry or planner_registry
+        self.data_service = data_service or DataService()
+        if features is None:
+            # A service on its own data or registry needs a store on the same ones
+            features = FeatureStore(self.data_service, self.registry) if data_service or registry else feature_store
+        self.features = features
+        self.model_dir = model_dir or settings.PLANNER_MODEL_DIR or DEFAULT_MODEL_DIR
+        self.history: deque = deque(maxlen=MAX_HISTORY)
+        self.current_job: Optional[Job] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._seen_version: Optional[str] = None
+        self._seen_rows: Optional[np.ndarray] = None  # sorted row hashes the serving model has learned from
+
+    async def training_rows(self) -> tuple:
+        """Engineered training rows from the feature store, their per-row input hashes and a content hash of them all"""
+        snapshot = await self.features.get()
+        return snapshot.frame().to_dict("records"), snapshot.row_hashes, snapshot.data_hash
+
+    async def retrain(self, force: bool = False) -> Optional[Job]:
+        """
+        Start an update or retraining job unless one is running or the model has seen this data
+
+        When the serving model was trained here and only some rows are new or changed,
+        the job updates it with those rows (see CountyEnergyPlanner.update_model) and
+        falls back to a full retrain if they have drifted. force always retrains fully.
+        Returns the running or new job, or None when the model is up to date.
+        """
+        if self.current_job is not None and not self.current_job.is_finished:
+            return self.current_job
+        rows, row_hashes, data_hash = await self.training_rows()
+        if not force and data_hash == self.registry.training_data_hash:
+            return None
+        new_rows = None
+        if not force and self._seen_rows is not None and not is_compiled_artifact(self.registry.model_path):
+            new_rows = [row for row, seen in zip(rows, np.isin(row_hashes, self._seen_rows)) if not seen]
+            if not new_rows:
+                return None  # rows were only removed; there is nothing new to learn
+        self.current_job = job_manager.submit("retrain", self._retrain, rows, row_hashes, data_hash, new_rows)
+        return self.current_job
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that runs an event loop and worker threads is unsafe.
+        # The worker sets up the same queued logging, so its planner logs are kept
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=configure_logging)
+        return self._executor
+
+    def _run_in_worker(self, func, *args) -> Dict[str, Any]:
+        """func(*args) in the worker process; a pool whose worker died is dropped so the next job starts a new one"""
+        try:
+            return self._pool().submit(func, *args).result()
+        except BrokenProcessPool as e:
+            executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError(f"Training worker process died: {e}") from e
+
+    def _retrain(self, rows: List[Dict[str, Any]], row_hashes: np.ndarray, data_hash: str,
+                 new_rows: Optional[List[Dict[str, Any]]] = None, on_progress=None) -> Dict[str, Any]:
+        """Update or train in the worker process, validate against the serving model, then swap (runs in a job thread)"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        candidate_id = f"planner_{datetime.now():%Y%m%d_%H%M%S}_{data_hash}"
+        path = os.path.join(self.model_dir, f"{candidate_id}.pkl")
+        serving = self.registry.planner
+        record: Dict[str, Any] = {
+            "candidate_id": candidate_id,
+            "training_data_hash": data_hash,
+            "started_at": datetime.now().isoformat(),
+            "rows": len(rows),
+            "mode": "full",
+        }
+
+        if new_rows:
+            if on_progress:
+                on_progress(0, 3, {"stage": "updating", "new_rows": len(new_rows)})
+            outcome = self._run_in_worker(update_candidate, new_rows, self.registry.model_path, path)
+            record.update({"new_rows": len(new_rows), "drift": outcome["drift"]})
+            if outcome["action"] == "updated":
+                candidate = CountyEnergyPlanner()
+                candidate.load_model(path)
+                self.registry.swap(candidate, path, data_hash)
+                self._seen_rows = np.union1d(self._seen_rows, row_hashes)
+                self._prune_artifacts()
+                logger.info(f"Planner model {candidate_id} updated with {len(new_rows)} new rows")
+                record.update({
+                    "mode": "incremental",
+                    "metrics": outcome["metrics"],
+                    "update_seconds": outcome["update_seconds"],
+                    "decision": "promoted",
+                    "reason": "no drift in the new rows",
+                    "model_path": path,
+                    "finished_at": datetime.now().isoformat(),
+                })
+                self.history.append(record)
+                if on_progress:
+                    on_progress(3, 3, {"stage": "done", "decision": record["decision"]})
+                return record
+            logger.info(f"Planner drift detected, retraining fully: {'; '.join(outcome['drift']['reasons'])}")
+
+        if on_progress:
+            on_progress(0, 3, {"stage": "training"})
+        outcome = self._run_in_worker(
+            train_candidate, rows, path, serving.config if serving else None,
+            self.registry.model_path if serving else None, row_hashes, self._seen_rows
+        )
+        record.update(outcome)
+
+        if on_progress:
+            on_progress(1, 3, {"stage": "validating", "metrics": outcome["metrics"]})
+        promote, reason = self._validate(outcome)
+        if promote:
+            # Load and probe the candidate here, off the event loop, before it serves anything
+            candidate = CountyEnergyPlanner()
+            candidate.load_model(path)
+            self.registry.swap(candidate, path, data_hash)
+            self._seen_rows = np.unique(row_hashes)
+            logger.info(f"Planner model {candidate_id} promoted: {reason}")
+            self._prune_artifacts()
+        else:
+            os.remove(path)
+            logger.info(f"Planner model {candidate_id} rejected: {reason}")
+
+        record.update({
+            "decision": "promoted" if promote else "rejected",
+            "reason": reason,
+            "model_path": path if promote else None,
+            "finished_at": datetime.now().isoformat(),
+        })
+        self.history.append(record)
+        if on_progress:
+            on_progress(3, 3, {"stage": "done", "decision": record["decision"]})
+        return record
+
+    def _prune_artifacts(self) -> None:
+        # Candidate names start with their timestamp, so name order is age order
+        artifacts = sorted(name for name in os.listdir(self.model_dir) if name.endswith(".pkl"))
+        for name in artifacts[:-KEEP_ARTIFACTS]:
+            os.remove(os.path.join(self.model_dir, name))
+
+    def _validate(self, outcome: Dict[str, Any]) -> tuple:
+        """Promote only a candidate whose R² is no worse than the serving model's on the same test rows"""
+        score = outcome["metrics"].get("cv_mean")
+        if score is None or not math.isfinite(score):
+            return False, "candidate has no finite cross-validation score"
+        baseline = outcome.get("baseline") or {}
+        if "r2" in baseline:
+            candidate_r2 = baseline["candidate_r2"]
+            rows = f"{baseline['rows']} test rows"
+            if baseline.get("held_out") is False:
+                rows += " the serving model was trained on"
+            elif baseline.get("held_out"):
+                rows += " neither model was trained on"
+            floor = baseline["r2"] - settings.PLANNER_RETRAIN_TOLERANCE
+            if not math.isfinite(candidate_r2) or candidate_r2 < floor:
+                return False, f"R² {candidate_r2:.3f} is below the serving model's {baseline['r2']:.3f} on {rows}"
+            return True, f"R² {candidate_r2:.3f} vs serving model {baseline['r2']:.3f} on {rows}"
+        if score < MIN_CANDIDATE_R2:
+            return False, f"cv R² {score:.3f} is below {MIN_CANDIDATE_R2} and there is no serving model to compare"
+        return True, f"cv R² {score:.3f}; no serving model to compare ({baseline.get('error', 'none loaded')})"
+
+    async def start(self) -> None:
+        """Watch the data directory for new ETL output"""
+        self._seen_version = self.data_service.dataset_version()
+        if settings.PLANNER_RETRAIN_POLL_SECONDS > 0 and self._poller is None:
+            self._poller = asyncio.create_task(self._poll(settings.PLANNER_RETRAIN_POLL_SECONDS))
+
+    async def stop(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _poll(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            version = self.data_service.dataset_version()
+            if version == self._seen_version:
+                continue
+            self._seen_version = version
+            try:
+                # Files changing is not enough: retrain only if the training rows differ
+                await self.retrain()
+            except Exception as e:
+                logger.error(f"Planner retraining could not start: {str(e)}")
+
+    def status(self) -> Dict[str, Any]:
+        """Running job (if any) and the recorded candidates, newest first"""
+        running = self.current_job if self.current_job is not None and not self.current_job.is_finished else None
+        return {
+            "running_job": running.snapshot(include_result=False) if running else None,
+            "auto_retrain_seconds": settings.PLANNER_RETRAIN_POLL_SECONDS,
+            "serving": self.registry.info(),
+            "candidates": list(reversed(self.history)),
+        }
+
+
+model_trainer = ModelTrainingService()
@@ -0,0 +1,216 @@
+"""
+Investment Portfolio Optimizer
+Chooses one intervention per county to maximise impact under a budget (multiple-choice knapsack)
+"""
+
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from app.services.data_service import DataService
+from app.services.comparative_analytics import REGION_OF_COUNTY
+
+INTERVENTIONS = ["solar_minigrid", "hybrid", "grid_extension"]
+
+HOUSEHOLD_SIZE = 3.9
+PHASE_SHARE = 0.10  # share of each county's unconnected households reached by one project phase
+HOUSEHOLD_KWH_PER_YEAR = 365.0
+DISPLACED_EMISSIONS_KG_PER_KWH = 0.7  # kerosene lamps and small diesel generators
+
+# USD per household connected, and renewable share of the energy supplied
+SOLAR_COST_PER_HOUSEHOLD = 800.0  # at the reference irradiance below
+REFERENCE_IRRADIANCE = 5.5  # kWh/m²/day
+HYBRID_COST_PER_HOUSEHOLD = 850.0
+GRID_COST_PER_HOUSEHOLD = 450.0  # next to existing lines, plus the same again every GRID_DISTANCE_SCALE_KM
+GRID_DISTANCE_SCALE_KM = 30.0
+RENEWABLE_SHARE = {"solar_minigrid": 0.95, "hybrid": 0.7, "grid_extension": 0.9}
+
+OBJECTIVES = {"households": "households_served", "co2": "co2_avoided_tons"}
+BUDGET_UNIT_USD = 50000.0  # DP budget resolution; option costs are rounded up to it
+
+
+def build_option_table(counties: List[Dict[str, Any]], grid_distance_km: np.ndarray) -> Dict[str, Any]:
+    """Cost, households served and CO2 avoided of every (county, intervention) pair"""
+    population = np.array([c["population"] for c in counties], dtype=float)
+    access = np.clip(np.array([c["energy_access_score"] for c in counties], dtype=float) / 100, 0, 1)
+    irradiance = np.clip(np.array([c["avg_solar_irradiance"] for c in counties], dtype=float), 1.0, None)
+
+    households = np.floor(population / HOUSEHOLD_SIZE * (1 - access) * PHASE_SHARE)
+    cost = np.column_stack([
+        households * SOLAR_COST_PER_HOUSEHOLD * REFERENCE_IRRADIANCE / irradiance,
+        households * HYBRID_COST_PER_HOUSEHOLD,
+        households * GRID_COST_PER_HOUSEHOLD * (1 + grid_distance_km / GRID_DISTANCE_SCALE_KM),
+    ])
+    renewable = np.array([RENEWABLE_SHARE[name] for name in INTERVENTIONS])
+    co2 = (households * HOUSEHOLD_KWH_PER_YEAR * DISPLACED_EMISSIONS_KG_PER_KWH / 1000)[:, None] * renewable
+
+    return {
+        "counties": [c["county_name"] for c in counties],
+        "regions": [REGION_OF_COUNTY.get(c["county_name"], "Other") for c in counties],
+        "cost_usd": cost,
+        "units": np.ceil(cost / BUDGET_UNIT_USD).astype(np.int64),
+        "households_served": np.repeat(households[:, None], len(INTERVENTIONS), axis=1),
+        "co2_avoided_tons": co2,
+    }
+
+
+def _knapsack(units: np.ndarray, value: np.ndarray, steps: int):
+    """
+    Multiple-choice knapsack over rows (at most one option each) with exact-spend states
+
+    dp[b] is the best value spending exactly b units (-inf if unreachable). Each row
+    is one vectorized update over all budgets; choices (0 = skip, k = option k - 1)
+    are kept for backtracking.
+    """
+    dp = np.full(steps + 1, -np.inf)
+    dp[0] = 0.0
+    choices = np.zeros((len(units), steps + 1), dtype=np.int8)
+    for row in range(len(units)):
+        candidates = np.full((units.shape[1] + 1, steps + 1), -np.inf)
+        candidates[0] = dp
+        for option in range(units.shape[1]):
+            shift = units[row, option]
+            if shift <= steps:
+                candidates[option + 1, shift:] = dp[:steps + 1 - shift] + value[row, option]
+        choices[row] = candidates.argmax(axis=0)
+        dp = candidates.max(axis=0)
+    return dp, choices
+
+
+def _backtrack(choices: np.ndarray, units: np.ndarray, spend: int) -> np.ndarray:
+    """Chosen option per row (-1 for none) for a final exact spend"""
+    picked = np.full(len(choices), -1)
+    for row in range(len(choices) - 1, -1, -1):
+        option = choices[row, spend] - 1
+        if option >= 0:
+            picked[row] = option
+            spend -= units[row, option]
+    return picked
+
+
+def _check_quotas(regional_quotas) -> Optional[Dict[str, Dict[str, float]]]:
+    """Quotas as {region: {"min_share", "max_share"}} floats in [0, 1], or ValueError"""
+    if not regional_quotas:
+        return None
+    if not isinstance(regional_quotas, dict):
+        raise ValueError("regional_quotas must map region names to {min_share, max_share}")
+    checked = {}
+    for region, quota in regional_quotas.items():
+        if not isinstance(quota, dict):
+            raise ValueError(f"Quota for {region} must be an object with min_share and/or max_share")
+        try:
+            low, high = float(quota.get("min_share", 0)), float(quota.get("max_share", 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"Quota shares for {region} must be numbers")
+        if not 0 <= low <= high <= 1:
+            raise ValueError(f"Quota for {region} needs 0 <= min_share <= max_share <= 1")
+        checked[region] = {"min_share": low, "max_share": high}
+    return checked
+
+
+class PortfolioOptimizer:
+    def __init__(self, data_service: Optional[DataService] = None):
+        self.data_service = data_service or DataService()
+        self._options: Optional[Dict[str, Any]] = None
+        self._solutions: Dict[str, Dict[str, Any]] = {}  # objective -> full-range DP over all counties
+
+    async def get_options(self) -> Dict[str, Any]:
+        """Per-county option table for the current dataset version"""
+        version = self.data_service.dataset_version()
+        if self._options is None or self._options["version"] != version:
+            counties = [county.dict() for county in await self.data_service.load_counties()]
+            if not counties:
+                raise ValueError("No county data available for portfolio optimization")
+            distances = np.array([self.data_service._estimate_grid_distance(c["county_name"]) for c in counties])
+            self._options = {**build_option_table(counties, distances), "version": version}
+            self._solutions = {}
+        return self._options
+
+    def _full_solution(self, options: Dict[str, Any], objective: str) -> Dict[str, Any]:
+        # Solved once for every budget up to funding all counties, so moving the
+        # budget slider only reads a prefix of the table and backtracks
+        if objective not in self._solutions:
+            steps = int(options["units"].max(axis=1).sum())
+            dp, choices = _knapsack(options["units"], options[OBJECTIVES[objective]], steps)
+            self._solutions[objective] = {"dp": dp, "choices": choices}
+        return self._solutions[objective]
+
+    async def optimize(self, budget_usd: float, objective: str = "households",
+                       regional_quotas: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
+        """
+        Best intervention per county within budget_usd
+
+        regional_quotas maps a region to {"min_share": x, "max_share": y}, the share of
+        budget_usd that region's selected projects must cost.
+        """
+        if not isinstance(objective, str) or objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}. Use one of {sorted(OBJECTIVES)}")
+        try:
+            budget_usd = float(budget_usd)
+        except (TypeError, ValueError):
+            raise ValueError(f"budget_usd must be a number, got {budget_usd!r}")
+        if not np.isfinite(budget_usd) or budget_usd <= 0:
+            raise ValueError("budget_usd must be a positive number")
+        regional_quotas = _check_quotas(regional_quotas)
+        options = await self.get_options()
+        units, value = options["units"], options[OBJECTIVES[objective]]
+        # Budget beyond funding every county's dearest option buys nothing more
+        steps = min(int(budget_usd // BUDGET_UNIT_USD), int(units.max(axis=1).sum()))
+
+        if not regional_quotas:
+            solution = self._full_solution(options, objective)
+            reachable = solution["dp"][:steps + 1]
+            spend = int(reachable.argmax())
+            picked = _backtrack(solution["choices"], units, spend)
+        else:
+            picked = self._solve_with_quotas(options, value, steps, budget_usd, regional_quotas)
+
+        return {"options": options, "picked": picked, "objective": objective, "budget_usd": budget_usd}
+
+    def _solve_with_quotas(self, options, value, steps, budget_usd, regional_quotas) -> np.ndarray:
+        """Unconstrained counties first, then one max-plus convolution per quota region"""
+        regions = np.array(options["regions"])
+        unknown = set(regional_quotas) - set(regions)
+        if unknown:
+            raise ValueError(f"Unknown regions in quotas: {sorted(unknown)}")
+        units = options["units"]
+
+        free = np.flatnonzero(~np.isin(regions, list(regional_quotas)))
+        dp, free_choices = _knapsack(units[free], value[free], steps)
+
+        stages = []
+        budget_index = np.arange(steps + 1)
+        for region, quota in regional_quotas.items():
+            rows = np.flatnonzero(regions == region)
+            region_dp, region_choices = _knapsack(units[rows], value[rows], steps)
+            low = int(np.ceil(quota["min_share"] * budget_usd / BUDGET_UNIT_USD))
+            high = int(quota["max_share"] * budget_usd // BUDGET_UNIT_USD)
+            region_dp[(budget_index < low) | (budget_index > high)] = -np.inf
+
+            # new[b] = max over x of dp[b - x] + region_dp[x], one shifted row per reachable
+            # region spend x, so memory stays O(steps); the smallest x wins ties
+            combined = np.full(steps + 1, -np.inf)
+            region_spend = np.zeros(steps + 1, dtype=np.int64)
+            for x in np.flatnonzero(np.isfinite(region_dp)):
+                candidate = np.full(steps + 1, -np.inf)
+                candidate[x:] = dp[:steps + 1 - x] + region_dp[x]
+                better = candidate > combined
+                combined[better] = candidate[better]
+                region_spend[better] = x
+            dp = combined
+            stages.append((rows, region_choices, region_spend))
+
+        if not np.isfinite(dp).any():
+            raise ValueError("Regional quotas cannot be met within the budget")
+
+        spend = int(dp.argmax())
+        picked = np.full(len(regions), -1)
+        for rows, region_choices, region_spend in reversed(stages):
+            x = int(region_spend[spend])
+            picked[rows] = _backtrack(region_choices, units[rows], x)
+            spend -= x
+        picked[free] = _backtrack(free_choices, units[free], spend)
+        return picked
+
+
+portfolio_optimizer = PortfolioOptimizer()
@@ -0,0 +1,220 @@
+"""
+Query Engine
+Declarative filter / group-by / aggregate queries over the energy datasets, run on indexed SQLite
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Set
+
+import pandas as pd
+
+from app.services.data_service import DataService
+
+# Dataset name -> (CSV path under the data directory, indexed columns)
+DATASETS = {
+    "counties": ("kenya_energy_comprehensive.csv", ["county_name", "priority_score"]),
+    "outages": (os.path.join("raw", "kplc_outages.csv"), ["county_name", "status"]),
+    "weather": (os.path.join("raw", "weather_solar.csv"), ["county_name", "timestamp"]),
+    "generation": (os.path.join("raw", "kengen_generation.csv"), ["county", "plant_type"]),
+    "blackouts": ("blackout_analytics.csv", ["county_name"]),
+}
+
+FILTER_OPERATORS = {
+    "eq": "=", "ne": "!=", "lt": "<", "lte": "<=", "gt": ">", "gte": ">=",
+    "in": "IN", "not_in": "NOT IN", "contains": "LIKE", "between": "BETWEEN",
+}
+AGGREGATES = {"count", "sum", "avg", "min", "max"}
+MAX_LIMIT = 10000
+ALIAS_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+
+
+class QueryEngine:
+    def __init__(self, data_service: Optional[DataService] = None):
+        self.data_service = data_service or DataService()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._version: Optional[str] = None
+        self._headers: Dict[str, List[str]] = {}  # CSV columns per dataset, for the current version
+        self._loaded: Dict[str, List[str]] = {}  # columns copied into the current database
+        # One lock covers the version check, table loads and the query itself, so a
+        # data refresh cannot swap the database out from under a running query
+        self._lock = threading.Lock()
+
+    def _database(self) -> sqlite3.Connection:
+        """In-memory database for the current dataset version; tables are loaded on first use"""
+        version = self.data_service.dataset_version()
+        if self._connection is None or version != self._version:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+            self._version = version
+            self._headers = {}
+            self._loaded = {}
+        return self._connection
+
+    def _path(self, dataset: str) -> str:
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}. Available: {sorted(DATASETS)}")
+        return os.path.join(self.data_service.data_dir, DATASETS[dataset][0])
+
+    def _header(self, dataset: str) -> List[str]:
+        """Column names of a dataset, read from the CSV header only"""
+        path = self._path(dataset)
+        if dataset not in self._headers:
+            self._headers[dataset] = list(pd.read_csv(path, nrows=0).columns)
+        return self._headers[dataset]
+
+    def _load(self, connection: sqlite3.Connection, dataset: str, needed: Set[str]) -> None:
+        """
+        Make sure the table holds the needed columns
+
+        Only referenced columns are read from the CSV (usecols). A later query that
+        needs more rebuilds the table with the union, so each column is parsed once
+        per dataset version.
+        """
+        loaded = self._loaded.get(dataset)
+        if loaded is not None and needed <= set(loaded):
+            return
+        header = self._header(dataset)
+        keep = needed | set(loaded or []) or {header[0]}  # COUNT(*) alone still needs the rows
+        columns = [name for name in header if name in keep]
+        frame = pd.read_csv(self._path(dataset), usecols=columns)
+        connection.execute(f'DROP TABLE IF EXISTS "{dataset}"')
+        frame.to_sql(dataset, connection, index=False)
+        for column in DATASETS[dataset][1]:
+            if column in columns:
+                connection.execute(f'CREATE INDEX "ix_{dataset}_{column}" ON "{dataset}" ("{column}")')
+        self._loaded[dataset] = columns
+
+    def schema(self) -> Dict[str, List[str]]:
+        """Queryable columns of every dataset"""
+        with self._lock:
+            self._database()
+            return {dataset: self._header(dataset) for dataset in DATASETS}
+
+    def run(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a declarative query
+
+        {"dataset": "counties", "select": [...], "filters": [{"column", "op", "value"}],
+         "group_by": [...], "aggregates": [{"column", "func", "as"}],
+         "sort": [{"column", "direction"}], "limit": 100}
+
+        Column names, operators and functions are checked against whitelists and all
+        values are bound as parameters, so nothing from the request is spliced into SQL.
+        Only the referenced columns are read from disk and filters run in SQLite, where
+        the indexed columns can be used. Blocking; call it from a worker thread.
+        """
+        with self._lock:
+            return self._run(query)
+
+    def _run(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        connection = self._database()
+        dataset = query.get("dataset", "counties")
+        columns = set(self._header(dataset))
+        needed = set()
+
+        def column(name: str) -> str:
+            if name not in columns:
+                raise ValueError(f"Unknown column '{name}' in {dataset}. Available: {sorted(columns)}")
+            needed.add(name)
+            return f'"{name}"'
+
+        group_by = list(query.get("group_by") or [])
+        aggregates = list(query.get("aggregates") or [])
+        select = list(query.get("select") or ([] if group_by or aggregates else sorted(columns)))
+
+        outputs, expressions = [], []
+        for name in group_by + [name for name in select if name not in group_by]:
+            if (group_by or aggregates) and name not in group_by:
+                raise ValueError(f"Column '{name}' must be in group_by or aggregated")
+            expressions.append(column(name))
+            outputs.append(name)
+        for aggregate in aggregates:
+            func = str(aggregate.get("func", "")).lower()
+            if func not in AGGREGATES:
+                raise ValueError(f"Unknown aggregate '{func}'. Use one of {sorted(AGGREGATES)}")
+            target = aggregate.get("column", "*")
+            argument = "*" if func == "count" and target == "*" else column(target)
+            alias = aggregate.get("as") or f"{func}_{'rows' if target == '*' else target}"
+            if not ALIAS_PATTERN.match(alias):
+                raise ValueError(f"Invalid alias '{alias}'")
+            expressions.append(f"{func.upper()}({argument})")
+            outputs.append(alias)
+        if not expressions:
+            raise ValueError("Query selects no columns")
+
+        where, parameters = [], []
+        for condition in query.get("filters") or []:
+            if not isinstance(condition, dict):
+                raise ValueError("Filters must be objects like {\"column\": ..., \"op\": ..., \"value\": ...}")
+            op = condition.get("op", "eq")
+            if op not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator '{op}'. Use one of {sorted(FILTER_OPERATORS)}")
+            target, value = column(condition.get("column", "")), condition.get("value")
+            if op in ("in", "not_in"):
+                if not isinstance(value, (list, tuple)) or not value:
+                    raise ValueError(f"Filter '{op}' needs a non-empty list")
+                values = list(value)
+                if any(isinstance(item, (list, dict)) for item in values):
+                    raise ValueError(f"Filter '{op}' values must be scalars")
+                where.append(f"{target} {FILTER_OPERATORS[op]} ({', '.join('?' * len(values))})")
+                parameters.extend(values)
+            elif op == "between":
+                if not isinstance(value, (list, tuple)) or len(value) != 2:
+                    raise ValueError("Filter 'between' needs [low, high]")
+                low, high = value
+                if isinstance(low, (list, dict)) or isinstance(high, (list, dict)):
+                    raise ValueError("Filter 'between' bounds must be scalars")
+                where.append(f"{target} BETWEEN ? AND ?")
+                parameters.extend([low, high])
+            elif isinstance(value, (list, dict)):
+                raise ValueError(f"Filter '{op}' needs a single value, not a {type(value).__name__}")
+            elif op == "contains":
+                where.append(f"{target} LIKE ?")
+                parameters.append(f"%{value}%")
+            else:
+                where.append(f"{target} {FILTER_OPERATORS[op]} ?")
+                parameters.append(value)
+
+        order = []
+        for key in query.get("sort") or []:
+            if not isinstance(key, dict):
+                raise ValueError("Sort entries must be objects like {\"column\": ..., \"direction\": ...}")
+            name = key.get("column")
+            direction = "DESC" if str(key.get("direction", "asc")).lower() == "desc" else "ASC"
+            if name in outputs:
+                order.append(f'"{name}" {direction}')
+            else:
+                raise ValueError(f"Sort column '{name}' is not part of the result")
+
+        limit = query.get("limit")
+        limit = MAX_LIMIT if limit is None else int(limit)
+        if limit < 1:
+            raise ValueError(f"limit must be at least 1, got {limit}")
+        limit = min(limit, MAX_LIMIT)
+        aliases = [f'{expression} AS "{name}"' for expression, name in zip(expressions, outputs)]
+        sql = f'SELECT {", ".join(aliases)} FROM "{dataset}"'
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if group_by:
+            sql += " GROUP BY " + ", ".join(column(name) for name in group_by)
+        if order:
+            sql += " ORDER BY " + ", ".join(order)
+        sql += f" LIMIT {limit}"
+
+        self._load(connection, dataset, needed)
+        rows = connection.execute(sql, parameters).fetchall()
+        return {
+            "dataset": dataset,
+            "columns": outputs,
+            "rows": [dict(zip(outputs, row)) for row in rows],
+            "row_count": len(rows),
+            "sql": sql,
+            "dataset_version": self._version,
+        }
+
+
+query_engine = QueryEngine()
@@ -0,0 +1,172 @@
+"""
+Response Cache
+TTL cache for endpoint payloads with stale-while-revalidate and request coalescing
+"""
+
+import asyncio
+import copy
+import functools
+import json
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+
+from app.services.data_service import DataService
+
+
+class RouteStats:
+    def __init__(self, latency_window: int = 500):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.compute_ms = deque(maxlen=latency_window)  # time spent producing fresh payloads
+        self.response_ms = deque(maxlen=latency_window)  # time the caller waited, hits included
+
+    def snapshot(self) -> Dict[str, Any]:
+        requests = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "requests": requests,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "background_refreshes": self.refreshes,
+            "errors": self.errors,
+            "hit_ratio": round((self.hits + self.stale_hits) / requests, 4) if requests else None,
+            "compute_ms": self._percentiles(self.compute_ms),
+            "response_ms": self._percentiles(self.response_ms),
+        }
+
+    @staticmethod
+    def _percentiles(samples) -> Optional[Dict[str, float]]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+        return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 3)}
+
+
+class ResponseCache:
+    def __init__(self, version: Callable[[], str], max_entries_per_route: int = 256, version_ttl: float = 5.0):
+        self.version = version
+        self.max_entries_per_route = max_entries_per_route
+        # The version walks the data directory, so it is re-read at most every version_ttl seconds
+        self.version_ttl = version_ttl
+        self._version: Optional[tuple] = None  # (version, checked_at)
+        # route -> OrderedDict[key, (payload, created_at)]
+        self._entries: Dict[str, "OrderedDict[str, tuple]"] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._ttl: Dict[str, tuple] = {}
+        self.stats: Dict[str, RouteStats] = {}
+
+    def cached(self, route: str, ttl: float, stale_ttl: float = 0.0):
+        """
+        Decorate an async endpoint so its payload is cached per normalized arguments and dataset version
+
+        Within ttl seconds a cached payload is returned. Between ttl and
+        ttl + stale_ttl the stale payload is returned immediately and refreshed in the
+        background. Concurrent misses for the same key share one computation. Callers
+        get a deep copy, so mutating a response never changes the cached payload.
+        """
+        self._entries[route] = OrderedDict()
+        self._ttl[route] = (ttl, stale_ttl)
+        self.stats[route] = RouteStats()
+
+        def decorator(func: Callable):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return copy.deepcopy(await self._get(route, func, args, kwargs))
+                finally:
+                    self.stats[route].response_ms.append((time.perf_counter() - started) * 1000)
+            return wrapper
+        return decorator
+
+    def _current_version(self) -> str:
+        now = time.monotonic()
+        if self._version is None or now - self._version[1] > self.version_ttl:
+            self._version = (self.version(), now)
+        return self._version[0]
+
+    def _key(self, args, kwargs) -> str:
+        # Body dicts are compared by content, not key order
+        request = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True, default=str)
+        return f"{self._current_version()}:{request}"
+
+    async def _get(self, route: str, func: Callable, args, kwargs) -> Any:
+        key = self._key(args, kwargs)
+        entries, stats = self._entries[route], self.stats[route]
+        ttl, stale_ttl = self._ttl[route]
+
+        entry = entries.get(key)
+        if entry is not None:
+            payload, created_at = entry
+            age = time.monotonic() - created_at
+            if age <= ttl:
+                stats.hits += 1
+                entries.move_to_end(key)
+                return payload
+            if age <= ttl + stale_ttl:
+                stats.stale_hits += 1
+                entries.move_to_end(key)
+                if (route, key) not in self._inflight:
+                    stats.refreshes += 1
+                    self._start(route, key, func, args, kwargs).add_done_callback(self._consume_error)
+                return payload
+
+        future = self._inflight.get((route, key))
+        if future is not None:
+            stats.coalesced += 1
+            return await asyncio.shield(future)
+        stats.misses += 1
+        return await asyncio.shield(self._start(route, key, func, args, kwargs))
+
+    def _start(self, route: str, key: str, func: Callable, args, kwargs) -> asyncio.Future:
+        """Compute the payload once, store it and release everyone waiting on the key"""
+        async def compute():
+            started = time.perf_counter()
+            try:
+                payload = await func(*args, **kwargs)
+            except Exception:
+                self.stats[route].errors += 1
+                raise
+            finally:
+                self._inflight.pop((route, key), None)
+            self.stats[route].compute_ms.append((time.perf_counter() - started) * 1000)
+            entries = self._entries[route]
+            entries[key] = (payload, time.monotonic())
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries_per_route:
+                entries.popitem(last=False)
+            return payload
+
+        future = asyncio.ensure_future(compute())
+        self._inflight[(route, key)] = future
+        return future
+
+    @staticmethod
+    def _consume_error(future: asyncio.Future) -> None:
+        # A failed background refresh keeps serving the stale payload
+        if not future.cancelled():
+            future.exception()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters and latency percentiles per route"""
+        return {
+            route: {**stats.snapshot(), "entries": len(self._entries[route]),
+                    "ttl_seconds": self._ttl[route][0], "stale_ttl_seconds": self._ttl[route][1]}
+            for route, stats in self.stats.items()
+        }
+
+    def clear(self, route: Optional[str] = None) -> None:
+        """Drop cached payloads for one route or all of them"""
+        self._version = None
+        for name in ([route] if route else list(self._entries)):
+            self._entries[name].clear()
+
+
+response_cache = ResponseCache(DataService().dataset_version)
@@ -0,0 +1,119 @@
+"""
+ROI Analysis Engine
+Portfolio-level ROI, NPV, break-even and sensitivity for broadcast scenario grids
+"""
+
+from typing import Dict, Any, List
+
+import numpy as np
+
+from app.services.lifecycle import npv, irr, payback_years
+
+# Portfolio view: one up-front investment and the annual savings it produces (USD)
+DEFAULT_ROI_ASSUMPTIONS = {
+    "investment": 2500000.0,
+    "annual_savings": 450000.0,
+    "discount_rate": 0.10,
+    "demand_growth": 0.03,  # annual growth of the savings base
+    "irradiance_factor": 1.0,  # solar resource relative to the design case
+    "battery_cost_factor": 1.0,  # battery prices relative to the design case
+    "battery_share": 0.3,  # share of the investment spent on batteries
+    "battery_life_years": 10,
+    "om_fraction": 0.015,  # annual O&M as a share of investment
+    "project_years": 20,
+}
+
+ROI_SCENARIOS = {
+    "standard": {},
+    "optimistic": {"investment": 2800000.0, "annual_savings": 620000.0, "demand_growth": 0.05, "irradiance_factor": 1.05},
+    "conservative": {"investment": 2200000.0, "annual_savings": 350000.0, "demand_growth": 0.01, "irradiance_factor": 0.95},
+}
+
+SENSITIVITY_PARAMETERS = ["investment", "annual_savings", "discount_rate", "demand_growth", "irradiance_factor",
+                          "battery_cost_factor"]
+
+
+def evaluate_roi(**params) -> Dict[str, np.ndarray]:
+    """
+    NPV, IRR, simple ROI and break-even for every scenario
+
+    Any parameter in DEFAULT_ROI_ASSUMPTIONS except project_years may be an array;
+    all arrays are broadcast together and evaluated as one (scenarios, years) matrix.
+    """
+    unknown = set(params) - set(DEFAULT_ROI_ASSUMPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown ROI parameters: {sorted(unknown)}")
+    p = {**DEFAULT_ROI_ASSUMPTIONS, **params}
+    years = int(p.pop("project_years"))
+
+    values = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float)) for v in p.values()])
+    shape = values[0].shape
+    p = {name: value.ravel()[:, None] for name, value in zip(p, values)}
+
+    t = np.arange(1, years + 1)[None, :]
+    battery_capex = p["investment"] * p["battery_share"]
+    investment = p["investment"] - battery_capex + battery_capex * p["battery_cost_factor"]
+
+    savings = p["annual_savings"] * p["irradiance_factor"] * (1 + p["demand_growth"]) ** (t - 1)
+    om = p["investment"] * p["om_fraction"]
+    life = np.maximum(np.rint(p["battery_life_years"]), 1)
+    replacement = np.where((t % life == 0) & (t < years), battery_capex * p["battery_cost_factor"], 0.0)
+
+    cash_flows = np.concatenate([-investment, savings - om - replacement], axis=1)
+    payback = payback_years(cash_flows)
+
+    return {
+        "total_investment": investment[:, 0].reshape(shape),
+        "npv": npv(cash_flows, p["discount_rate"][:, 0]).reshape(shape),
+        "irr": irr(cash_flows).reshape(shape),
+        "roi_percentage": (savings[:, 0] / investment[:, 0] * 100).reshape(shape),
+        "payback_years": payback.reshape(shape),
+        "break_even_months": np.ceil(payback * 12).reshape(shape),
+    }
+
+
+def tornado(base: Dict[str, Any], parameters: List[str] = None, swing: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    One-at-a-time sensitivity of NPV, widest swing first
+
+    Every parameter is moved to (1 - swing) and (1 + swing) times its base value;
+    the base and all 2 x parameters cases are evaluated in a single batch.
+    """
+    parameters = parameters or SENSITIVITY_PARAMETERS
+    base = {**DEFAULT_ROI_ASSUMPTIONS, **base}
+    unknown = set(parameters) - (set(base) - {"project_years"})
+    if unknown:
+        raise ValueError(f"Unknown sensitivity parameters: {sorted(unknown)}")
+    # Request values may be strings, None or lists: coerce every baseline once, up front
+    numbers = {}
+    for name, value in base.items():
+        try:
+            numbers[name] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Sensitivity baseline '{name}' must be a single number, got {value!r}")
+    try:
+        swing = float(swing)
+    except (TypeError, ValueError):
+        raise ValueError(f"Sensitivity range must be a number, got {swing!r}")
+    base = numbers
+    columns = {name: np.full(2 * len(parameters) + 1, value)
+               for name, value in base.items() if name != "project_years"}
+    for i, name in enumerate(parameters):
+        columns[name][1 + 2 * i] = base[name] * (1 - swing)
+        columns[name][2 + 2 * i] = base[name] * (1 + swing)
+
+    result = evaluate_roi(project_years=base["project_years"], **columns)
+    base_npv = result["npv"][0]
+    bars = []
+    for i, name in enumerate(parameters):
+        low, high = result["npv"][1 + 2 * i], result["npv"][2 + 2 * i]
+        bars.append({
+            "parameter": name,
+            "low_value": base[name] * (1 - swing),
+            "high_value": base[name] * (1 + swing),
+            "npv_low": float(low),
+            "npv_high": float(high),
+            "swing": float(abs(high - low)),
+            "impact": float(high / base_npv) if base_npv else None,
+        })
+    return sorted(bars, key=lambda bar: bar["swing"], reverse=True)
@@ -1,8 +1,18 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.models.minigrid import MiniGridSimulation, SimulationResult
+from app.services.lifecycle import evaluate_lifecycle
+import math
 import uuid
 from datetime import datetime
 
+# KES unit costs and tariff for the lifecycle engine
+KES_LIFECYCLE_ASSUMPTIONS = {
+    "pv_cost_per_kw": 50000,
+    "battery_cost_per_kwh": 30000,
+    "tariff_per_kwh": 32,
+}
+BATTERY_HOURS = 4  # storage sized as hours of current demand
+
 class SimulationService:
     def __init__(self):
         self.simulations: Dict[str, SimulationResult] = {}
@@ -11,9 +21,9 @@ class SimulationService:
         """Run mini-grid simulation"""
         simulation_id = str(uuid.uuid4())
         
-        # Simple simulation logic
+        lifecycle = self._calculate_lifecycle(simulation)
         total_cost = self._calculate_cost(simulation)
-        payback_period = self._calculate_payback(simulation)
+        payback_period = self._calculate_payback(simulation, lifecycle)
         energy_generated = self._calculate_energy_generation(simulation)
         co2_saved = self._calculate_co2_savings(energy_generated)
         
@@ -24,21 +34,37 @@ class SimulationService:
             payback_period=payback_period,
             energy_generated=energy_generated,
             co2_saved=co2_saved,
+            npv=float(lifecycle["npv"][0]),
+            irr=float(lifecycle["irr"][0]) if math.isfinite(lifecycle["irr"][0]) else None,
+            lcoe=float(lifecycle["lcoe"][0]) if math.isfinite(lifecycle["lcoe"][0]) else None,
             status="completed"
         )
         
         self.simulations[simulation_id] = result
         return result
     
+    def _calculate_lifecycle(self, simulation: MiniGridSimulation) -> Dict[str, Any]:
+        """Project 25 years of cash flows for the sized system (KES)"""
+        return evaluate_lifecycle(
+            annual_generation_kwh=self._calculate_energy_generation(simulation),
+            annual_demand_kwh=simulation.current_demand * 24 * 365,
+            pv_kw=simulation.current_demand * 1.2,  # 20% buffer
+            battery_kwh=simulation.current_demand * BATTERY_HOURS,
+            **KES_LIFECYCLE_ASSUMPTIONS
+        )
+    
     def _calculate_cost(self, simulation: MiniGridSimulation) -> float:
-        """Calculate total system cost"""
-        base_cost = 50000  # KES per kW
+        """Calculate total system cost (PV plus battery storage, KES)"""
         capacity = simulation.current_demand * 1.2  # 20% buffer
-        return base_cost * capacity
+        battery = simulation.current_demand * BATTERY_HOURS
+        return (capacity * KES_LIFECYCLE_ASSUMPTIONS["pv_cost_per_kw"]
+                + battery * KES_LIFECYCLE_ASSUMPTIONS["battery_cost_per_kwh"])
     
-    def _calculate_payback(self, simulation: MiniGridSimulation) -> int:
-        """Calculate payback period in years"""
-        return 5  # Simplified calculation
+    def _calculate_payback(self, simulation: MiniGridSimulation, lifecycle: Dict[str, Any] = None) -> Optional[int]:
+        """Calculate payback period in whole years, or None if the system never pays back"""
+        lifecycle = lifecycle or self._calculate_lifecycle(simulation)
+        payback = lifecycle["payback_years"][0]
+        return math.ceil(payback) if math.isfinite(payback) else None
     
     def _calculate_energy_generation(self, simulation: MiniGridSimulation) -> float:
         """Calculate annual energy generation"""
@@ -0,0 +1,111 @@
+"""
+Solar Resource Service
+Typical-year hourly irradiance profiles for each county, computed once and cached
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.data_service import DataService
+
+HOURS_PER_YEAR = 8760
+EAT_MERIDIAN = 45.0  # East Africa Time (UTC+3) standard meridian, degrees east
+DEFAULT_LOCATION = "Kenya"  # unknown locations use the national centroid and mean cloud cover
+
+
+def clear_sky_irradiance(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Clear-sky global horizontal irradiance (kW/m²) for every hour of a 365-day year
+
+    Solar position uses Cooper's declination and the usual equation-of-time approximation,
+    evaluated at the middle of each local (EAT) clock hour; irradiance follows the
+    Haurwitz clear-sky model. Returns an array of shape (locations, 8760).
+    """
+    latitudes = np.radians(np.asarray(latitudes, dtype=float))[:, None]
+    longitudes = np.asarray(longitudes, dtype=float)[:, None]
+
+    hour_of_year = np.arange(HOURS_PER_YEAR)
+    day = hour_of_year // 24 + 1
+    clock_hour = hour_of_year % 24 + 0.5
+
+    declination = np.radians(23.45) * np.sin(np.radians(360 / 365 * (284 + day)))
+    b = np.radians(360 * (day - 81) / 364)
+    equation_of_time = 9.87 * np.sin(2 * b) - 7.53 * np.cos(b) - 1.5 * np.sin(b)  # minutes
+
+    solar_time = clock_hour + (4 * (longitudes - EAT_MERIDIAN) + equation_of_time) / 60
+    hour_angle = np.radians(15 * (solar_time - 12))
+
+    cos_zenith = (np.sin(latitudes) * np.sin(declination)
+                  + np.cos(latitudes) * np.cos(declination) * np.cos(hour_angle))
+    cos_zenith = np.clip(cos_zenith, 0, None)
+
+    with np.errstate(divide="ignore"):
+        ghi = 1.098 * cos_zenith * np.exp(-0.057 / cos_zenith)
+    return np.where(cos_zenith > 0, ghi, 0.0)
+
+
+def cloud_derating(cloud_cover_pct: np.ndarray) -> np.ndarray:
+    """Kasten-Czeplak cloud cover factor (cloud cover given in percent)"""
+    cloud_fraction = np.clip(np.asarray(cloud_cover_pct, dtype=float) / 100, 0, 1)
+    return 1 - 0.75 * cloud_fraction ** 3.4
+
+
+class SolarResourceService:
+    def __init__(self, data_service: Optional[DataService] = None):
+        self.data_service = data_service or DataService()
+        # county name -> float32 (8760,) irradiance profile in kW/m²
+        self._profiles: Dict[str, np.ndarray] = {}
+        self._known_counties = {name.lower(): name for name in self.data_service._get_weather_data()}
+
+    def resolve_county(self, location: Optional[str]) -> str:
+        """Map a free-text location such as "Turkana County" to a cached profile key"""
+        key = str(location or "").strip().lower()
+        if key.endswith(" county"):
+            key = key[:-len(" county")]
+        return self._known_counties.get(key, DEFAULT_LOCATION)
+
+    def get_profile(self, county_name: str) -> np.ndarray:
+        """Hourly irradiance profile (kW/m², 8760 values) for one county"""
+        return self.get_profiles([county_name])[0]
+
+    def get_profiles(self, county_names: List[str]) -> np.ndarray:
+        """Stacked profiles of shape (len(county_names), 8760), computing any missing ones in one pass"""
+        county_names = [self.resolve_county(name) for name in county_names]
+        missing = sorted({name for name in county_names if name not in self._profiles})
+        if missing:
+            self._compute(missing)
+        return np.stack([self._profiles[name] for name in county_names]) if county_names \
+            else np.empty((0, HOURS_PER_YEAR), dtype=np.float32)
+
+    def daily_profiles(self, county_names: List[str], day_of_year: Optional[int] = None) -> np.ndarray:
+        """24-hour irradiance slices of shape (len(county_names), 24) for one day of the year"""
+        if day_of_year is None:
+            day_of_year = datetime.now().timetuple().tm_yday
+        day = (int(day_of_year) - 1) % 365
+        return self.get_profiles(county_names)[:, day * 24:(day + 1) * 24]
+
+    def hourly_window(self, county_names: List[str], start_hour: int, hours: int) -> np.ndarray:
+        """Consecutive hours from start_hour (hour of year), wrapping over the year end"""
+        index = (start_hour + np.arange(hours)) % HOURS_PER_YEAR
+        return self.get_profiles(county_names)[:, index]
+
+    def _compute(self, county_names: List[str]) -> None:
+        weather = self.data_service._get_weather_data()
+        default_cloud = float(np.mean([w["cloud_cover"] for w in weather.values()])) if weather else 0.0
+
+        centroids = np.array([self.data_service._get_county_centroid(name) for name in county_names])
+        cloud_cover = np.array([weather.get(name, {}).get("cloud_cover", default_cloud) for name in county_names])
+
+        profiles = clear_sky_irradiance(centroids[:, 0], centroids[:, 1]) * cloud_derating(cloud_cover)[:, None]
+        for name, profile in zip(county_names, profiles.astype(np.float32)):
+            profile.setflags(write=False)
+            self._profiles[name] = profile
+
+    def clear_cache(self) -> None:
+        """Drop cached profiles, e.g. after the weather data is refreshed"""
+        self._profiles = {}
+
+
+solar_resource = SolarResourceService()
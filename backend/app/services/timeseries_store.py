@@ -0,0 +1,214 @@
+"""
+Time-Series Store
+Hourly, daily and weekly rollups of grid metrics, maintained incrementally
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from app.services.demand_forecast import DemandForecastService, demand_forecaster
+from app.services.generation_forecast import GenerationForecastService, generation_forecaster
+
+EPOCH = datetime(1970, 1, 5)  # a Monday, so weekly buckets start on Mondays
+HOUR = timedelta(hours=1)
+
+# Bucket width in hours and how many buckets each resolution keeps
+RESOLUTIONS = {
+    "hourly": {"hours": 1, "capacity": 24 * 14},
+    "daily": {"hours": 24, "capacity": 400},
+    "weekly": {"hours": 168, "capacity": 110},
+}
+
+GRID_METRICS = ["generation_kwh", "consumption_kwh", "demand_kwh", "efficiency", "carbon_savings_kg"]
+
+# Avoided emissions per kWh of renewable energy served, taking diesel gensets as the
+# alternative supply. Only renewable plants count, and only the part of their output
+# that meets demand; thermal output and any surplus displace nothing.
+DIESEL_EMISSIONS_KG_PER_KWH = 0.7
+RENEWABLE_PLANT_TYPES = {"hydro", "wind", "solar", "geothermal", "biomass"}
+
+# Which rollup, and how many of its most recent buckets, answers each /api/analytics/grid period
+PERIOD_RESOLUTION = {
+    "24h": ("hourly", 24),
+    "7d": ("daily", 7),
+    "30d": ("daily", 30),
+    "90d": ("daily", 90),
+    "365d": ("weekly", 52),
+    "1y": ("weekly", 52),
+}
+DEFAULT_PERIOD = "365d"  # unknown periods fall back to a year, as the mock endpoint did
+
+
+def hour_index(timestamp: datetime) -> int:
+    """Whole hours since EPOCH"""
+    return (timestamp - EPOCH) // HOUR
+
+
+class TimeSeriesStore:
+    """
+    Ring buffers of (sum, count, max) per metric for every resolution
+
+    append() folds a batch of hourly points into all rollups with a few array
+    operations; query() reads only the buckets of one resolution, so its cost
+    depends on the number of buckets returned, never on the raw point count.
+    """
+
+    def __init__(self, metrics: List[str], resolutions: Optional[Dict[str, Dict[str, int]]] = None):
+        self.metrics = list(metrics)
+        self.resolutions = resolutions or RESOLUTIONS
+        self.latest_hour: Optional[int] = None
+        self._rollups: Dict[str, Dict[str, np.ndarray]] = {}
+        for name, spec in self.resolutions.items():
+            capacity = spec["capacity"]
+            self._rollups[name] = {
+                "keys": np.full(capacity, -1, dtype=np.int64),
+                "sum": np.zeros((capacity, len(self.metrics))),
+                "count": np.zeros(capacity, dtype=np.int64),
+                "max": np.full((capacity, len(self.metrics)), -np.inf),
+            }
+
+    def append(self, hours: np.ndarray, values: np.ndarray) -> None:
+        """Add points at the given hour indices; values has shape (points, metrics)"""
+        hours = np.asarray(hours, dtype=np.int64)
+        values = np.asarray(values, dtype=float).reshape(len(hours), len(self.metrics))
+        if not len(hours):
+            return
+
+        for name, spec in self.resolutions.items():
+            rollup = self._rollups[name]
+            capacity = spec["capacity"]
+            buckets = hours // spec["hours"]
+            slots = buckets % capacity
+
+            # A slot still holding an older bucket is recycled before the new points land
+            new_buckets = np.unique(buckets)
+            new_slots = new_buckets % capacity
+            stale = rollup["keys"][new_slots] < new_buckets
+            recycled = new_slots[stale]
+            rollup["keys"][recycled] = new_buckets[stale]
+            rollup["sum"][recycled] = 0
+            rollup["count"][recycled] = 0
+            rollup["max"][recycled] = -np.inf
+
+            # Points older than what their slot now holds have aged out of this resolution
+            live = rollup["keys"][slots] == buckets
+            slots, live_values = slots[live], values[live]
+            np.add.at(rollup["sum"], slots, live_values)
+            np.add.at(rollup["count"], slots, 1)
+            np.maximum.at(rollup["max"], slots, live_values)
+
+        latest = int(hours.max())
+        self.latest_hour = latest if self.latest_hour is None else max(self.latest_hour, latest)
+
+    def query(self, resolution: str, start_hour: int, end_hour: int) -> Dict[str, Any]:
+        """Buckets of one resolution overlapping [start_hour, end_hour), oldest first"""
+        spec = self.resolutions[resolution]
+        rollup = self._rollups[resolution]
+        buckets = np.arange(start_hour // spec["hours"], (end_hour - 1) // spec["hours"] + 1)
+        slots = buckets % spec["capacity"]
+        present = rollup["keys"][slots] == buckets
+        buckets, slots = buckets[present], slots[present]
+
+        return {
+            "start_hours": buckets * spec["hours"],
+            "sum": rollup["sum"][slots],
+            "count": rollup["count"][slots],
+            "max": rollup["max"][slots],
+        }
+
+
+class GridTimeSeriesService:
+    """Keeps a TimeSeriesStore of national grid metrics up to the current hour"""
+
+    def __init__(self, generation: Optional[GenerationForecastService] = None,
+                 demand: Optional[DemandForecastService] = None):
+        self.generation = generation or generation_forecaster
+        self.demand = demand or demand_forecaster
+        self.store = TimeSeriesStore(GRID_METRICS)
+        self._version = None
+
+    async def refresh(self, now: Optional[datetime] = None) -> None:
+        """Append hourly points for every complete hour since the last refresh"""
+        fleet = await self.generation.get_fleet()
+        model = await self.demand.get_model()
+        version = (fleet["version"], model["version"])
+        if version != self._version:
+            # New data invalidates the history built from the old models
+            self.store = TimeSeriesStore(GRID_METRICS)
+            self._version = version
+
+        end = hour_index(now or datetime.now())
+        backfill = max(spec["hours"] * spec["capacity"] for spec in RESOLUTIONS.values())
+        start = end - backfill if self.store.latest_hour is None else self.store.latest_hour + 1
+        if start >= end:
+            return
+
+        hours = np.arange(start, end)
+        hour_of_week = hours % 168
+
+        # Observed points come from the plant and county models until metering is wired in
+        output_mw = fleet["annual_mw"][:, self._hour_of_year(hours)]
+        renewable = np.array([plant_type in RENEWABLE_PLANT_TYPES for plant_type in fleet["plant_types"]], dtype=bool)
+        generation_mw = output_mw.sum(axis=0)
+        demand_mw = model["weekly_mw"][:, hour_of_week].sum(axis=0)
+        served_mw = np.minimum(generation_mw, demand_mw)
+        # Renewables are dispatched first, so they serve demand up to their own output
+        renewable_served_mw = np.minimum(output_mw[renewable].sum(axis=0), demand_mw)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            efficiency = np.where(demand_mw > 0, served_mw / demand_mw * 100, 0.0)
+
+        values = np.column_stack([
+            generation_mw * 1000,
+            served_mw * 1000,
+            demand_mw * 1000,
+            efficiency,
+            renewable_served_mw * 1000 * DIESEL_EMISSIONS_KG_PER_KWH,
+        ])
+        self.store.append(hours, values)
+
+    @staticmethod
+    def _hour_of_year(hours: np.ndarray) -> np.ndarray:
+        """Typical-year hour (0-8759) of each hour index"""
+        first = EPOCH + timedelta(hours=int(hours[0]))
+        start_of_year = datetime(first.year, 1, 1)
+        offset = hour_index(start_of_year)
+        return (hours - offset) % 8760
+
+    async def period_summary(self, period: str) -> Dict[str, Any]:
+        """Totals and bucketed series for a period (see PERIOD_RESOLUTION) from the matching rollup"""
+        await self.refresh()
+        resolution, buckets = PERIOD_RESOLUTION.get(period, PERIOD_RESOLUTION[DEFAULT_PERIOD])
+        width = RESOLUTIONS[resolution]["hours"]
+        end = self.store.latest_hour + 1
+        rollup = self.store.query(resolution, ((end - 1) // width - buckets + 1) * width, end)
+
+        generation, consumption, demand, efficiency, carbon = range(len(GRID_METRICS))
+        date_format = "%Y-%m-%d %H:00" if resolution == "hourly" else "%Y-%m-%d"
+        count = np.maximum(rollup["count"], 1)
+        series = [
+            {
+                "date": (EPOCH + timedelta(hours=int(start))).strftime(date_format),
+                "generation_kwh": round(float(sums[generation]), 2),
+                "consumption_kwh": round(float(sums[consumption]), 2),
+                "efficiency": round(float(sums[efficiency] / n), 2),
+                "carbon_savings_kg": round(float(sums[carbon]), 2),
+            }
+            for start, sums, n in zip(rollup["start_hours"], rollup["sum"], count)
+        ]
+        totals = rollup["sum"].sum(axis=0)
+        points = int(rollup["count"].sum())
+
+        return {
+            "resolution": resolution,
+            "total_generation_kwh": round(float(totals[generation]), 2),
+            "total_consumption_kwh": round(float(totals[consumption]), 2),
+            "system_efficiency": round(float(totals[efficiency]) / points, 2) if points else 0,
+            "peak_demand_mw": round(float(rollup["max"][:, demand].max()) / 1000, 2) if len(series) else 0,
+            "carbon_savings_kg": round(float(totals[carbon]), 2),
+            "time_series_data": series,
+        }
+
+
+grid_timeseries = GridTimeSeriesService()
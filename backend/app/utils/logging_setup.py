@@ -0,0 +1,244 @@
+"""
+Logging Setup
+Queue-based logging: callers only enqueue records, a background listener thread
+formats and writes them, so no request waits on console or disk I/O
+"""
+
+import atexit
+import json
+import logging
+import queue
+import time
+from contextvars import ContextVar, Token
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional, Tuple
+
+STRUCTURED_FIELDS = ('route', 'county', 'status', 'duration_ms', 'rows', 'job_id')
+ACCESS_LOGGER = 'app.access'  # one record per request; exempt from the DEBUG rate limit
+
+_context: ContextVar[Dict[str, Any]] = ContextVar('log_context', default={})
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+
+def log_context(**fields) -> Token:
+    """Attach structured fields to every record logged from the current request or task"""
+    return _context.set({**_context.get(), **fields})
+
+
+def reset_log_context(token: Token) -> None:
+    _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the log_context fields onto records (explicit extra= values win)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, value in _context.get().items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+
+class DebugRateLimit(logging.Filter):
+    """
+    Token bucket per call site for DEBUG records
+
+    Each logging call site may emit burst records at once and per_second on
+    average; the rest are dropped before they are formatted or queued. Records
+    above DEBUG, and those of the exempt loggers, always pass.
+    """
+
+    def __init__(self, per_second: float, burst: int, exempt: Tuple[str, ...] = ()):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self.exempt = exempt
+        self.suppressed = 0
+        self._buckets: Dict[tuple, list] = {}  # (path, line) -> [tokens, last refill]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or record.name in self.exempt:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.setdefault((record.pathname, record.lineno), [float(self.burst), now])
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+        bucket[1] = now
+        if bucket[0] < 1:
+            self.suppressed += 1
+            return False
+        bucket[0] -= 1
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text lines with the structured fields appended as key=value, or one JSON object per line"""
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {name: getattr(record, name) for name in STRUCTURED_FIELDS
+                  if getattr(record, name, None) is not None}
+        if self.json_lines:
+            return json.dumps({'time': self.formatTime(record), 'level': record.levelname,
+                               'logger': record.name, 'message': record.getMessage(), **fields}, default=str)
+        line = super().format(record)
+        return line + ''.join(f" {name}={value}" for name, value in fields.items())
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Enqueues without ever blocking the caller
+
+    The message is rendered here (as QueueHandler does, so later changes to its
+    arguments cannot alter it) and everything else happens on the listener thread.
+    When the listener falls queue-size records behind, new records are dropped and
+    counted instead of stalling requests or growing memory.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+        self.enqueue_seconds = 0.0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        started = time.perf_counter()
+        try:
+            self.enqueue(self.prepare(record))
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+        self.enqueue_seconds += time.perf_counter() - started
+
+
+class TimedQueueListener(QueueListener):
+    """QueueListener that measures time spent writing records"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.written = 0
+        self.write_seconds = 0.0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        started = time.perf_counter()
+        super().handle(record)
+        self.written += 1
+        self.write_seconds += time.perf_counter() - started
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail when stopping with a full queue
+        self.queue.put(self._sentinel)
+
+
+class RequestLogContext:
+    """ASGI middleware: tags a request's log records with its route and logs its duration on ACCESS_LOGGER"""
+
+    def __init__(self, app, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = log_context(route=scope['path'])
+        started = time.perf_counter()
+        response = {}
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            fields = {'status': response.get('status'), 'duration_ms': duration_ms}
+            if self.slow_request_ms is not None and duration_ms >= self.slow_request_ms:
+                access_logger.info(f"Slow request {scope['method']} {scope['path']}", extra=fields)
+            else:
+                access_logger.debug(f"{scope['method']} {scope['path']}", extra=fields)
+            reset_log_context(token)
+
+
+_handler: Optional[BoundedQueueHandler] = None
+_listener: Optional[TimedQueueListener] = None
+_rate_limit: Optional[DebugRateLimit] = None
+
+
+def configure_logging(level: Optional[str] = None, log_file: Optional[str] = None,
+                      json_lines: Optional[bool] = None, queue_size: Optional[int] = None,
+                      debug_per_second: Optional[float] = None) -> None:
+    """
+    Route all logging through one bounded queue to a background listener thread
+
+    Defaults come from settings. The root logger gets the queue handler; the
+    console and file handlers belong to the listener. Safe to call again (a no-op
+    while configured); the queue is drained at interpreter exit.
+    """
+    global _handler, _listener, _rate_limit
+    from config.settings import settings
+
+    if _listener is not None:
+        return
+    json_lines = settings.LOG_FORMAT == "json" if json_lines is None else json_lines
+    log_file = settings.LOG_FILE if log_file is None else log_file
+    formatter = StructuredFormatter(json_lines)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size or settings.LOG_QUEUE_SIZE)
+    per_second = settings.LOG_DEBUG_PER_SECOND if debug_per_second is None else debug_per_second
+    # A rate of 0 drops every rate-limited DEBUG record, the first one included
+    burst = max(1, int(per_second)) if per_second > 0 else 0
+    _rate_limit = DebugRateLimit(per_second, burst=burst, exempt=(ACCESS_LOGGER,))
+    _handler = BoundedQueueHandler(log_queue)
+    _handler.addFilter(_rate_limit)
+    _handler.addFilter(ContextFilter())
+    _listener = TimedQueueListener(log_queue, *handlers)
+
+    root = logging.getLogger()
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+    root.addHandler(_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and detach the queue handler"""
+    global _handler, _listener
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _handler = None
+    _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue depth, dropped and rate-limited records, and time spent enqueuing versus writing"""
+    if _listener is None:
+        return {'configured': False}
+    attempts = _handler.enqueued + _handler.dropped
+    return {
+        'configured': True,
+        'queue_depth': _handler.queue.qsize(),
+        'queue_size': _handler.queue.maxsize,
+        'enqueued': _handler.enqueued,
+        'dropped': _handler.dropped,
+        'debug_suppressed': _rate_limit.suppressed,
+        'written': _listener.written,
+        'enqueue_us_mean': round(_handler.enqueue_seconds / attempts * 1e6, 2) if attempts else None,
+        'write_us_mean': round(_listener.write_seconds / _listener.written * 1e6, 2) if _listener.written else None,
+    }
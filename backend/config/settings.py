@@ -22,6 +22,37 @@ class Settings:
     API_PORT: int = int(os.getenv("API_PORT", "8002"))
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")  # development or production
     
+    # County planner model (defaults to the bundled artifact; a compiled .planner
+    # directory serves without scikit-learn and is memory-mapped, so workers share one
+    # copy); when required, startup aborts if it cannot be loaded instead of falling
+    # back to the rule engine
+    PLANNER_MODEL_PATH: Optional[str] = os.getenv("PLANNER_MODEL_PATH")
+    PLANNER_MODEL_REQUIRED: bool = os.getenv("PLANNER_MODEL_REQUIRED", "false").lower() == "true"
+    # Retrained candidates are saved here. Set PLANNER_RETRAIN_POLL_SECONDS to check the
+    # data directory for new ETL output and retrain automatically; the default 0 leaves
+    # retraining to explicit /retrain calls
+    PLANNER_MODEL_DIR: Optional[str] = os.getenv("PLANNER_MODEL_DIR")
+    PLANNER_RETRAIN_POLL_SECONDS: int = int(os.getenv("PLANNER_RETRAIN_POLL_SECONDS", "0"))
+    PLANNER_RETRAIN_TOLERANCE: float = float(os.getenv("PLANNER_RETRAIN_TOLERANCE", "0.02"))
+    # Stage timing of the serving planner: "off", "sampled" (PLANNER_STAGE_SAMPLE_RATE of
+    # calls) or "all"; with PLANNER_STAGE_MEMORY one timed call in ten measures peak memory
+    PLANNER_STAGE_TIMING: str = os.getenv("PLANNER_STAGE_TIMING", "sampled")
+    PLANNER_STAGE_SAMPLE_RATE: float = float(os.getenv("PLANNER_STAGE_SAMPLE_RATE", "0.05"))
+    PLANNER_STAGE_MEMORY: bool = os.getenv("PLANNER_STAGE_MEMORY", "true").lower() == "true"
+    
+    # Logging goes through a bounded queue to a background thread that writes the
+    # console and LOG_FILE (empty for console only); LOG_FORMAT is "text" or "json".
+    # When the queue is full new records are dropped rather than blocking requests.
+    # DEBUG records are limited to LOG_DEBUG_PER_SECOND per call site (the per-request
+    # access log is exempt), and requests slower than LOG_SLOW_REQUEST_MS are logged
+    # at INFO with their duration
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE: str = os.getenv("LOG_FILE", "county_planner.log")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_DEBUG_PER_SECOND: float = float(os.getenv("LOG_DEBUG_PER_SECOND", "5"))
+    LOG_SLOW_REQUEST_MS: float = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+    
     # Database (for future use)
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
     
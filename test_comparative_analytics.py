@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized county comparison analytics
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.services.comparative_analytics import ComparativeAnalyticsService, compare
+
+
+def test_matches_per_row_loop():
+    print("Testing compare() against a per-row loop...")
+    rng = np.random.default_rng(4)
+    values = rng.integers(0, 6, size=(40, 3)).astype(float)  # small range, so plenty of ties
+    groups = rng.integers(0, 5, size=40)
+    result = compare(values, groups)
+    for metric in range(3):
+        column = values[:, metric]
+        for row, value in enumerate(column):
+            peers = column[groups == groups[row]]
+            assert result["rank"][row, metric] == (column > value).sum() + 1
+            assert np.isclose(result["percentile"][row, metric],
+                              ((column < value).sum() + 0.5 * (column == value).sum()) / len(column) * 100)
+            expected_z = (value - column.mean()) / column.std() if column.std() else 0.0
+            assert np.isclose(result["z_score"][row, metric], expected_z)
+            peer_z = (value - peers.mean()) / peers.std() if peers.std() else 0.0
+            assert np.isclose(result["peer_z_score"][row, metric], peer_z)
+        for group in np.unique(groups):
+            members = np.flatnonzero(groups == group)
+            ranks = result["peer_rank"][members, metric]
+            assert sorted(ranks) == list(range(1, len(members) + 1))
+            # Peer ranks follow descending value; ties may be ordered either way
+            assert (np.diff(column[members[np.argsort(ranks)]]) <= 0).all()
+    print("✅ Ranks, percentiles, z-scores and peer ranks match, ties included")
+
+
+def test_service_on_county_data():
+    print("Testing comparisons over the county table...")
+    service = ComparativeAnalyticsService()
+    result = asyncio.run(service.compare_counties(["population", "efficiency"]))
+    assert result["columns"] == ["population", "avg_reliability_score"]
+    names = result["table"]["names"]
+    largest = names[int(np.argmax(result["values"][:, 0]))]
+    assert result["rank"][names.index(largest), 0] == 1
+    again = asyncio.run(service.compare_counties(["population", "efficiency"]))
+    assert again["rank"] is result["rank"], "repeated comparisons should come from the cache"
+    try:
+        asyncio.run(service.compare_counties(["not_a_metric"]))
+    except ValueError:
+        print(f"✅ {len(names)} counties compared; {largest} ranks first by population")
+    else:
+        raise AssertionError("unknown metrics should be rejected")
+
+
+if __name__ == "__main__":
+    test_matches_per_row_loop()
+    test_service_on_county_data()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled (.planner) county planner artifact
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.models.county_energy_model import CountyEnergyPlanner
+from app.models import compiled_planner
+from app.models.compiled_planner import CompiledForest, load_compiled, read_manifest
+
+
+def _county_data(rows: int = 60, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'county_name': [f'County {i}' for i in range(rows)],
+        'population': rng.integers(100000, 4000000, rows),
+        'hospitals': rng.integers(5, 50, rows),
+        'schools': rng.integers(50, 200, rows),
+        'blackout_freq': rng.integers(1, 15, rows),
+        'economic_activity': rng.integers(40, 90, rows),
+        'grid_distance': rng.integers(0, 10, rows),
+        'current_kwh': rng.integers(10000, 200000, rows),
+    })
+
+
+def _trained_planner() -> CountyEnergyPlanner:
+    planner = CountyEnergyPlanner()
+    planner.config['model']['n_estimators'] = 25
+    planner.train_model(_county_data())
+    return planner
+
+
+def _threshold_rows(planner: CountyEnergyPlanner, X: np.ndarray) -> np.ndarray:
+    """Copies of X with one feature set exactly on (and just either side of) a split threshold"""
+    rows = []
+    for estimator in planner.priority_model.estimators_[:5]:
+        tree = estimator.tree_
+        for node in np.flatnonzero(tree.children_left != -1)[:10]:
+            for value in (tree.threshold[node], np.float32(tree.threshold[node]),
+                          np.nextafter(np.float32(tree.threshold[node]), np.float32(np.inf))):
+                row = X[node % len(X)].copy()
+                row[tree.feature[node]] = value
+                rows.append(row)
+    return np.array(rows)
+
+
+def test_compiled_matches_sklearn():
+    print("Testing compiled scaler, forest and KMeans against scikit-learn...")
+    planner = _trained_planner()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.planner')
+        planner.save_model(path)
+        compiled = load_compiled(path)
+
+        data = _county_data(rows=40, seed=1)
+        features, _ = planner._prepare_features(data)
+        features = features[planner.feature_columns]
+        assert np.array_equal(compiled['scaler'].transform(features.values), planner.scaler.transform(features))
+
+        X = planner.scaler.transform(features)
+        X = np.vstack([X, _threshold_rows(planner, X)])
+        assert np.array_equal(compiled['priority_model'].predict(X), planner.priority_model.predict(X))
+        assert np.array_equal(compiled['cluster_model'].predict(X), planner.cluster_model.predict(X))
+    print(f"✅ Identical outputs on {len(X)} rows, including rows on split thresholds")
+
+
+def test_loaded_artifact_ranks_like_the_original():
+    print("Testing prioritization from a loaded .planner artifact...")
+    planner = _trained_planner()
+    data = _county_data(rows=40, seed=2)
+    expected = planner.prioritize_counties(data, use_cache=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.planner')
+        planner.save_model(path)
+        loaded = CountyEnergyPlanner()
+        loaded.load_model(path)
+        assert isinstance(loaded.priority_model, CompiledForest)
+        result = loaded.prioritize_counties(data, use_cache=False)
+    assert result['top_counties'] == expected['top_counties']
+    print("✅ Loaded artifact gives the same county ranking")
+
+
+def test_resave_is_atomic():
+    print("Testing that re-saving never leaves the artifact missing...")
+    first, second = _trained_planner(), _trained_planner()
+    second.config['model']['n_estimators'] = 10
+    second.train_model(_county_data(seed=3))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.planner')
+        first.save_model(path)
+        checksum = read_manifest(path)['checksum']
+
+        # A crash at the moment of the swap leaves the old artifact in place
+        original_replace = compiled_planner.os.replace
+        def crash(*args):
+            raise OSError("simulated crash")
+        compiled_planner.os.replace = crash
+        try:
+            second.save_model(path)
+        except Exception:
+            pass
+        finally:
+            compiled_planner.os.replace = original_replace
+        assert read_manifest(path)['checksum'] == checksum
+
+        second.save_model(path)
+        new_checksum = read_manifest(path)['checksum']
+        assert new_checksum != checksum and os.path.islink(path)
+        first.save_model(path)
+        second.save_model(path)
+        versions = [name for name in os.listdir(tmp) if name.startswith('model.planner-')]
+        assert len(versions) == 2, f"only the current and previous versions are kept, found {versions}"
+    print("✅ Old artifact survives a failed swap; two versions kept")
+
+
+def test_verification_rejects_tampered_arrays():
+    print("Testing artifact verification...")
+    planner = _trained_planner()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.planner')
+        planner.save_model(path)
+        target = os.path.join(os.path.realpath(path), 'tree_value.npy')
+        values = np.load(target)
+        values[0] += 1.0
+        np.save(target, values)
+        try:
+            load_compiled(path)
+        except ValueError as e:
+            assert 'checksum' in str(e)
+        else:
+            raise AssertionError("a modified array should fail verification")
+        loaded = CountyEnergyPlanner()
+        try:
+            loaded.load_model(path)
+        except Exception as e:
+            print(f"✅ Tampered artifact rejected: {e}")
+        else:
+            raise AssertionError("load_model should refuse a modified artifact")
+
+
+if __name__ == "__main__":
+    test_compiled_matches_sklearn()
+    test_loaded_artifact_ranks_like_the_original()
+    test_resave_is_atomic()
+    test_verification_rejects_tampered_arrays()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the dynamic-programming battery and diesel dispatch
+"""
+import asyncio
+import itertools
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from fastapi import HTTPException
+
+from app.api.minigrids import optimize_minigrid_dispatch
+from app.services.dispatch import DEFAULT_DISPATCH, optimize_dispatch
+
+
+def _day(rng, hours=24):
+    hour = np.arange(hours)
+    pv = np.clip(np.sin((hour - 6) * np.pi / 12), 0, None) * rng.uniform(30, 60)
+    load = 15 + 10 * np.exp(-((hour - 20) ** 2) / 8) + rng.uniform(0, 3, hours)
+    return load, pv
+
+
+def _cost(load, pv, battery_kwh, diesel_kw, soc_path, p):
+    """Cost of one day following the given state-of-charge path, with the engine's end-of-day valuation"""
+    grid = np.linspace(p["soc_min"], p["soc_max"], p["soc_levels"])
+    start = int(np.abs(grid - p["initial_soc"]).argmin())
+    total, state = 0.0, start
+    for hour, nxt in enumerate(soc_path):
+        delta = battery_kwh * (grid[nxt] - grid[state])
+        if abs(delta) > p["c_rate"] * battery_kwh + 1e-9:
+            return np.inf
+        draw = delta / p["charge_efficiency"] if delta > 0 else delta * p["discharge_efficiency"]
+        deficit = load[hour] - pv[hour] + draw
+        diesel = min(max(deficit, 0), diesel_kw)
+        unserved = max(deficit - diesel, 0)
+        fuel = p["fuel_intercept_l_per_kw"] * diesel_kw + p["fuel_slope_l_per_kwh"] * diesel if diesel > 0 else 0.0
+        total += (fuel * p["fuel_price_per_litre"] + unserved * p["unserved_penalty_per_kwh"]
+                  + abs(draw) * p["battery_wear_cost_per_kwh"])
+        state = nxt
+    shortfall = max(battery_kwh * (grid[start] - grid[state]), 0) / p["discharge_efficiency"]
+    return total + shortfall * p["fuel_slope_l_per_kwh"] * p["fuel_price_per_litre"]
+
+
+def test_matches_brute_force():
+    print("Testing dispatch against every state-of-charge path...")
+    p = {**DEFAULT_DISPATCH, "soc_levels": 5, "c_rate": 0.4}
+    rng = np.random.default_rng(11)
+    for _ in range(5):
+        load, pv = rng.uniform(5, 30, 5), rng.uniform(0, 30, 5)
+        result = optimize_dispatch(load, pv, 40.0, 20.0, soc_levels=5, c_rate=0.4)
+        grid = np.linspace(p["soc_min"], p["soc_max"], 5)
+        chosen = [int(np.argmin(np.abs(grid - soc / 100))) for soc in result["battery_soc"][0]]
+        best = min(_cost(load, pv, 40.0, 20.0, path, p) for path in itertools.product(range(5), repeat=5))
+        assert np.isclose(_cost(load, pv, 40.0, 20.0, chosen, p), best)
+    print("✅ Dynamic program finds the least-cost path")
+
+
+def test_energy_balance_and_limits():
+    print("Testing hourly energy balance and battery limits...")
+    rng = np.random.default_rng(5)
+    load, pv = map(np.array, zip(*[_day(rng) for _ in range(10)]))
+    battery_kwh = rng.uniform(50, 150, 10)
+    result = optimize_dispatch(load, pv, battery_kwh, 30.0)
+    supply = pv + result["battery_discharge_kw"] + result["diesel_kw"] + result["unserved_kw"]
+    demand = load + result["battery_charge_kw"] + result["curtailed_kw"]
+    assert np.allclose(supply, demand)
+    soc = result["battery_soc"] / 100
+    assert (soc >= DEFAULT_DISPATCH["soc_min"] - 1e-9).all() and (soc <= DEFAULT_DISPATCH["soc_max"] + 1e-9).all()
+    stored = result["battery_charge_kw"] * DEFAULT_DISPATCH["charge_efficiency"]
+    assert (stored <= DEFAULT_DISPATCH["c_rate"] * battery_kwh[:, None] + 1e-9).all()
+    assert (result["diesel_kw"] <= 30.0 + 1e-9).all()
+    print(f"✅ Balanced; renewable fraction {result['renewable_fraction'].mean():.0%}")
+
+
+def test_rows_are_independent():
+    print("Testing that batched days match days solved one at a time...")
+    rng = np.random.default_rng(8)
+    load, pv = map(np.array, zip(*[_day(rng) for _ in range(4)]))
+    batch = optimize_dispatch(load, pv, [60, 80, 100, 120], 25.0)
+    for i, battery_kwh in enumerate([60, 80, 100, 120]):
+        single = optimize_dispatch(load[i], pv[i], battery_kwh, 25.0)
+        assert np.allclose(batch["battery_soc"][i], single["battery_soc"][0])
+        assert np.isclose(batch["fuel_cost"][i], single["fuel_cost"][0])
+    try:
+        optimize_dispatch(load, pv, 60, 25.0, fuel_price=2.0)
+    except ValueError:
+        print("✅ Batched rows are solved independently")
+    else:
+        raise AssertionError("unknown parameters should be rejected")
+
+
+def test_route_validation():
+    print("Testing /dispatch request handling...")
+    result = asyncio.run(optimize_minigrid_dispatch({"battery_capacity_kwh": 0, "days": 3, "seed": 1}))
+    assert all(hour["battery_discharge_kw"] == 0 and hour["battery_charge_kw"] == 0
+               for hour in result["hourly_schedule"]), "a 0 kWh battery must stay 0 kWh"
+    for request in ({"days": "abc"}, {"start_day": "x"}, {"detail_day": [1]}, {"battery_capacity_kwh": -5},
+                    {"days": 2, "parameters": {"fuel_price": 2}}):
+        try:
+            asyncio.run(optimize_minigrid_dispatch(request))
+        except HTTPException as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError(f"{request} should be rejected")
+    print("✅ Explicit zero battery kept; malformed requests return 400")
+
+
+if __name__ == "__main__":
+    test_matches_brute_force()
+    test_energy_balance_and_limits()
+    test_rows_are_independent()
+    test_route_validation()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the mini-grid lifecycle cash-flow engine
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from fastapi import HTTPException
+
+from app.api.minigrids import evaluate_minigrid_lifecycle
+from app.services.lifecycle import (
+    DEFAULT_ASSUMPTIONS, evaluate_lifecycle, expand_scenarios, irr, npv, payback_years
+)
+
+
+def _scalar_lifecycle(generation, demand, pv_kw, battery_kwh):
+    """Year-by-year reference for one scenario with the default assumptions"""
+    a = DEFAULT_ASSUMPTIONS
+    capex = pv_kw * a["pv_cost_per_kw"] + battery_kwh * a["battery_cost_per_kwh"] + a["fixed_cost"]
+    flows = [-capex]
+    for year in range(1, a["project_years"] + 1):
+        served = min(generation * (1 - a["pv_degradation"]) ** (year - 1),
+                     demand * (1 + a["demand_growth"]) ** (year - 1))
+        revenue = served * a["tariff_per_kwh"] * (1 + a["tariff_escalation"]) ** (year - 1)
+        om = capex * a["om_fraction"] * (1 + a["om_escalation"]) ** (year - 1)
+        replacement = 0.0
+        if year % a["battery_life_years"] == 0 and year < a["project_years"]:
+            replacement = battery_kwh * a["battery_cost_per_kwh"] * (1 - a["battery_cost_decline"]) ** year
+        flows.append(revenue - om - replacement)
+    value = sum(flow / (1 + a["discount_rate"]) ** year for year, flow in enumerate(flows))
+    return flows, value
+
+
+def test_matches_scalar_reference():
+    print("Testing vectorized cash flows against a year-by-year loop...")
+    params = expand_scenarios({
+        "annual_generation_kwh": [60000, 90000],
+        "annual_demand_kwh": [50000, 80000],
+        "pv_kw": 50,
+        "battery_kwh": [100, 200],
+    })
+    result = evaluate_lifecycle(**params)
+    assert len(result["npv"]) == 8
+    for i in range(8):
+        flows, value = _scalar_lifecycle(*(params[name][i] for name in
+                                           ("annual_generation_kwh", "annual_demand_kwh", "pv_kw", "battery_kwh")))
+        assert np.allclose(result["cash_flows"][i], flows)
+        assert np.isclose(result["npv"][i], value)
+        assert result["battery_replacements"][i] == 2
+    print("✅ NPV and cash flows match the reference for all 8 scenarios")
+
+
+def test_irr_and_payback():
+    print("Testing IRR and payback...")
+    flows = np.array([[-1000.0] + [300.0] * 5, [-1000.0] + [-50.0] * 5])
+    rates = irr(flows)
+    assert np.isclose(npv(flows[:1], rates[:1])[0], 0, atol=1e-6)
+    assert np.isnan(rates[1]), "cash flows that never turn positive have no IRR"
+    payback = payback_years(flows)
+    assert np.isclose(payback[0], 1000 / 300)
+    assert np.isnan(payback[1])
+    print(f"✅ IRR {rates[0]:.4f}, payback {payback[0]:.2f} years")
+
+
+def test_irr_above_one_hundred_percent():
+    print("Testing IRR of very profitable projects...")
+    flows = np.array([[-100.0] + [500.0] * 5, [-100.0] + [150.0] * 5])
+    rates = irr(flows)
+    assert (rates > 1).all()
+    assert np.allclose(npv(flows, rates), 0, atol=1e-6)
+    print(f"✅ IRR {rates[0]:.0%} and {rates[1]:.0%}")
+
+
+def test_zero_energy_is_json_safe():
+    print("Testing scenarios that serve no energy...")
+    scenarios = {"annual_generation_kwh": 0, "annual_demand_kwh": 0, "pv_kw": [0, 10], "battery_kwh": 0}
+    result = asyncio.run(evaluate_minigrid_lifecycle({"scenarios": scenarios}))
+    for row in result["scenarios"]:
+        assert row["lcoe"] is None and row["irr"] is None and row["payback_years"] is None
+    print("✅ Undefined LCOE, IRR and payback become null")
+
+
+def test_zip_mode_needs_equal_lengths():
+    print("Testing zip mode...")
+    params = expand_scenarios({"pv_kw": [10, 20, 30], "battery_kwh": [40, 50, 60]}, mode="zip")
+    assert params["pv_kw"].tolist() == [10, 20, 30] and params["battery_kwh"].tolist() == [40, 50, 60]
+    try:
+        expand_scenarios({"pv_kw": [10, 20], "battery_kwh": [40, 50, 60]}, mode="zip")
+    except ValueError:
+        print("✅ Zip mode pairs lists and rejects unequal lengths")
+    else:
+        raise AssertionError("unequal lists should be rejected")
+
+
+def test_route_rejects_bad_requests():
+    print("Testing /lifecycle request validation...")
+    scenarios = {"annual_generation_kwh": 60000, "annual_demand_kwh": 50000, "pv_kw": 50, "battery_kwh": 100}
+    bad_requests = [
+        {"scenarios": {**scenarios, "project_years": [20, 25]}},
+        {"scenarios": {**scenarios, "pv_kw": None}},
+    ]
+    for request in bad_requests:
+        try:
+            asyncio.run(evaluate_minigrid_lifecycle(request))
+        except HTTPException as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError(f"{request} should be rejected")
+    result = asyncio.run(evaluate_minigrid_lifecycle({"scenarios": scenarios, "assumptions": {"project_years": 20}}))
+    assert result["project_years"] == 20 and result["scenarios_evaluated"] == 1
+    print("✅ Per-scenario project_years and all-NaN NPVs return 400")
+
+
+if __name__ == "__main__":
+    test_matches_scalar_reference()
+    test_irr_and_payback()
+    test_irr_above_one_hundred_percent()
+    test_zero_energy_is_json_safe()
+    test_zip_mode_needs_equal_lengths()
+    test_route_rejects_bad_requests()
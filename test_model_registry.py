@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the planner model registry
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.models.county_energy_model import CountyEnergyPlanner
+from app.services.model_registry import PlannerModelUnavailable, PlannerRegistry
+
+
+def _county_data(rows: int = 40, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'county_name': [f'County {i}' for i in range(rows)],
+        'population': rng.integers(100000, 4000000, rows),
+        'hospitals': rng.integers(5, 50, rows),
+        'schools': rng.integers(50, 200, rows),
+        'blackout_freq': rng.integers(1, 15, rows),
+        'economic_activity': rng.integers(40, 90, rows),
+        'grid_distance': rng.integers(0, 10, rows),
+        'current_kwh': rng.integers(10000, 200000, rows),
+    })
+
+
+def _trained_planner(seed: int = 0) -> CountyEnergyPlanner:
+    planner = CountyEnergyPlanner()
+    planner.config['model']['n_estimators'] = 10
+    planner.train_model(_county_data(seed=seed))
+    return planner
+
+
+def _assert_unavailable(registry: PlannerRegistry, status: str) -> None:
+    assert registry.status == status and registry.planner is None and registry.error
+    try:
+        registry.require()
+    except PlannerModelUnavailable as e:
+        assert status in str(e)
+    else:
+        raise AssertionError(f"require() should raise while the model is {status}")
+
+
+def test_load_failures_are_recorded():
+    print("Testing load statuses for missing and broken artifacts...")
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = PlannerRegistry(os.path.join(tmp, 'absent.pkl'))
+        assert not registry.load()
+        _assert_unavailable(registry, "missing")
+
+        broken = os.path.join(tmp, 'broken.pkl')
+        with open(broken, 'wb') as f:
+            f.write(b'not a pickle')
+        registry = PlannerRegistry(broken)
+        assert not registry.load()
+        _assert_unavailable(registry, "incompatible")
+        assert registry.info()["status"] == "incompatible"
+    print("✅ Missing and incompatible artifacts reported; require() raises")
+
+
+def test_load_serves_the_artifact():
+    print("Testing a successful load...")
+    planner = _trained_planner()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pkl')
+        planner.save_model(path)
+        registry = PlannerRegistry(path)
+        assert registry.load()
+        loaded = registry.require()
+        assert registry.status == "ready" and registry.error is None
+        assert loaded.timer is registry.timer
+        assert registry.info()["model_version"] == planner.model_version
+    print(f"✅ Loaded in {registry.load_seconds}s")
+
+
+def test_swap_keeps_in_flight_requests_on_the_old_model():
+    print("Testing a hot swap of the serving planner...")
+    old, new = _trained_planner(seed=1), _trained_planner(seed=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pkl')
+        old.save_model(path)
+        registry = PlannerRegistry(path)
+        registry.load()
+        in_flight = registry.require()
+
+        registry.swap(new, os.path.join(tmp, 'candidate.pkl'), training_data_hash='abc123')
+        assert registry.require() is new and in_flight is not new
+        assert in_flight.priority_model is not None, "a request holding the old planner can still finish"
+        assert new.timer is registry.timer
+        info = registry.info()
+        assert info["model_path"].endswith('candidate.pkl') and info["training_data_hash"] == 'abc123'
+
+        # A swap also recovers a registry whose startup load failed
+        registry = PlannerRegistry(os.path.join(tmp, 'absent.pkl'))
+        registry.load()
+        registry.swap(new, path)
+        assert registry.require() is new and registry.status == "ready" and registry.error is None
+    print("✅ New requests get the new planner; held references keep the old one")
+
+
+if __name__ == "__main__":
+    test_load_failures_are_recorded()
+    test_load_serves_the_artifact()
+    test_swap_keeps_in_flight_requests_on_the_old_model()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for the investment portfolio optimizer
+"""
+import asyncio
+import itertools
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.services.portfolio_optimizer import (
+    PortfolioOptimizer, BUDGET_UNIT_USD, _knapsack, _backtrack
+)
+
+
+def _brute_force(units, value, steps):
+    """Best total value over every assignment of one option (or none) per row"""
+    best = 0.0
+    for choice in itertools.product(range(-1, units.shape[1]), repeat=len(units)):
+        spent = sum(units[row, option] for row, option in enumerate(choice) if option >= 0)
+        if spent <= steps:
+            best = max(best, sum(value[row, option] for row, option in enumerate(choice) if option >= 0))
+    return best
+
+
+def test_knapsack_matches_brute_force():
+    print("Testing knapsack against brute force...")
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        units = rng.integers(1, 6, size=(5, 3))
+        value = rng.uniform(1, 10, size=(5, 3))
+        steps = int(rng.integers(1, 15))
+        dp, choices = _knapsack(units, value, steps)
+        spend = int(dp.argmax())
+        picked = _backtrack(choices, units, spend)
+        assert units[np.arange(5), picked][picked >= 0].sum() == spend
+        assert np.isclose(value[np.arange(5), picked][picked >= 0].sum(), _brute_force(units, value, steps))
+    print("✅ Knapsack is optimal")
+
+
+def test_quotas_are_respected():
+    print("Testing regional quotas...")
+    optimizer = PortfolioOptimizer()
+    budget = 200_000_000.0
+    quotas = {"Nairobi": {"min_share": 0.05, "max_share": 0.2}}
+    result = asyncio.run(optimizer.optimize(budget, "households", quotas))
+    options, picked = result["options"], result["picked"]
+    chosen = np.flatnonzero(picked >= 0)
+    cost = options["cost_usd"][chosen, picked[chosen]]
+    regions = np.array(options["regions"])[chosen]
+    in_region = cost[regions == "Nairobi"].sum()
+    assert cost.sum() <= budget
+    assert 0.05 * budget - BUDGET_UNIT_USD <= in_region <= 0.2 * budget
+    print(f"✅ Nairobi region spends {in_region / budget:.1%} of the budget")
+
+
+def test_budget_beyond_funding_everything_is_bounded():
+    print("Testing a budget far above the cost of funding every county...")
+    optimizer = PortfolioOptimizer()
+    options = asyncio.run(optimizer.get_options())
+    fund_all = float(options["units"].max(axis=1).sum() * BUDGET_UNIT_USD)
+    quotas = {"Nairobi": {"min_share": 0.0, "max_share": 1.0}}
+    started = time.perf_counter()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = asyncio.run(optimizer.optimize(fund_all * 10, "households", quotas))
+    growth_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    assert (result["picked"] >= 0).all(), "every county should be funded"
+    assert growth_mb < 200, f"peak memory grew by {growth_mb:.0f} MB"
+    print(f"✅ Solved in {time.perf_counter() - started:.2f}s, peak RSS grew {growth_mb:.0f} MB")
+
+
+def test_rejects_bad_budgets_and_quotas():
+    print("Testing budget and quota validation...")
+    optimizer = PortfolioOptimizer()
+    bad_calls = [
+        ("abc", None), (0, None), (float("inf"), None),
+        (1e8, ["Nairobi"]), (1e8, {"Nairobi": 0.2}),
+        (1e8, {"Nairobi": {"min_share": 0.5, "max_share": 0.1}}),
+        (1e8, {"Atlantis": {"min_share": 0.1}}),
+    ]
+    for budget, quotas in bad_calls:
+        try:
+            asyncio.run(optimizer.optimize(budget, "households", quotas))
+        except ValueError:
+            continue
+        raise AssertionError(f"budget {budget!r} with quotas {quotas!r} should be rejected")
+    print(f"✅ {len(bad_calls)} invalid requests rejected with ValueError")
+
+
+if __name__ == "__main__":
+    test_knapsack_matches_brute_force()
+    test_quotas_are_respected()
+    test_budget_beyond_funding_everything_is_bounded()
+    test_rejects_bad_budgets_and_quotas()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the declarative analytics query engine
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.services.data_service import DataService
+from app.services.query_engine import DATASETS, QueryEngine
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Energy-data-pipeline', 'data')
+
+
+def _engine_on_copy(tmp: str) -> QueryEngine:
+    """Engine over a private copy of the counties CSV, so the test can modify it"""
+    path = DATASETS["counties"][0]
+    shutil.copy(os.path.join(DATA_DIR, path), os.path.join(tmp, path))
+    return QueryEngine(DataService(data_dir=tmp))
+
+
+def test_rejects_malformed_queries():
+    print("Testing query validation...")
+    engine = QueryEngine(DataService(data_dir=DATA_DIR))
+    bad_queries = [
+        {"dataset": "passwords"},
+        {"select": ["county_name; DROP TABLE counties"]},
+        {"select": ["county_name"], "limit": 0},
+        {"select": ["county_name"], "limit": -1},
+        {"select": ["county_name"], "filters": [{"column": "population", "op": "eq", "value": [1, 2]}]},
+        {"select": ["county_name"], "filters": [{"column": "population", "op": "in", "value": "Nairobi"}]},
+        {"select": ["county_name"], "filters": [{"column": "population", "op": "regexp", "value": "x"}]},
+        {"select": ["county_name"], "filters": ["population > 0"]},
+        {"select": ["county_name"], "sort": ["population"]},
+        {"aggregates": [{"column": "population", "func": "sum", "as": "total\" FROM x --"}]},
+        {"select": ["population"], "group_by": ["county_name"]},
+    ]
+    for query in bad_queries:
+        try:
+            engine.run(query)
+        except ValueError:
+            continue
+        raise AssertionError(f"{query} should be rejected")
+    print(f"✅ {len(bad_queries)} malformed queries rejected with ValueError")
+
+
+def test_reads_only_referenced_columns():
+    print("Testing column pushdown and filters...")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine_on_copy(tmp)
+        result = engine.run({
+            "select": ["county_name", "population"],
+            "filters": [{"column": "population", "op": "gt", "value": 1000000}],
+            "sort": [{"column": "population", "direction": "desc"}],
+            "limit": 5,
+        })
+        populations = [row["population"] for row in result["rows"]]
+        assert populations == sorted(populations, reverse=True) and min(populations) > 1000000
+        assert engine._loaded["counties"] == ["county_name", "population"]
+        total = engine.run({"aggregates": [{"column": "*", "func": "count"}]})["rows"][0]["count_rows"]
+        assert total == 47
+        engine.run({"select": ["priority_score"]})
+        assert set(engine._loaded["counties"]) == {"county_name", "population", "priority_score"}
+    print(f"✅ Only {len(engine._loaded['counties'])} of {len(engine._headers['counties'])} columns loaded")
+
+
+def test_reloads_when_the_data_changes():
+    print("Testing that a data refresh between queries is picked up...")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine_on_copy(tmp)
+        count = {"aggregates": [{"column": "*", "func": "count"}]}
+        before = engine.run(count)
+        path = os.path.join(tmp, DATASETS["counties"][0])
+        with open(path) as f:
+            lines = f.readlines()
+        with open(path, "w") as f:
+            f.writelines(lines[:11])
+        after = engine.run(count)
+        assert before["dataset_version"] != after["dataset_version"]
+        assert after["rows"][0]["count_rows"] == 10
+    print("✅ New dataset version reloaded")
+
+
+if __name__ == "__main__":
+    test_rejects_malformed_queries()
+    test_reads_only_referenced_columns()
+    test_reloads_when_the_data_changes()
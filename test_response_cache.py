@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the analytics response cache
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.services.response_cache import ResponseCache, response_cache
+
+
+class _Source:
+    """Version callable and endpoint that count how often they run"""
+    def __init__(self):
+        self.version, self.version_calls, self.calls = "v1", 0, 0
+
+    def current(self) -> str:
+        self.version_calls += 1
+        return self.version
+
+    async def endpoint(self, body):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"body": body, "call": self.calls, "rows": [1, 2, 3]}
+
+
+def test_hits_and_invalidation():
+    print("Testing cache hits and invalidation on a new dataset version...")
+    source = _Source()
+    cache = ResponseCache(source.current, version_ttl=0)
+    endpoint = cache.cached("route", ttl=60)(source.endpoint)
+
+    async def scenario():
+        first = await endpoint({"a": 1, "b": 2})
+        again = await endpoint({"b": 2, "a": 1})
+        assert again["call"] == first["call"] == 1, "bodies differing only in key order share an entry"
+        source.version = "v2"
+        assert (await endpoint({"a": 1, "b": 2}))["call"] == 2, "a new dataset version must miss"
+        results = await asyncio.gather(*[endpoint({"c": 3}) for _ in range(5)])
+        assert {result["call"] for result in results} == {3}, "concurrent misses share one computation"
+
+    asyncio.run(scenario())
+    stats = cache.metrics()["route"]
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["coalesced"] == 4
+    print(f"✅ {stats['requests']} requests, {source.calls} computations")
+
+
+def test_version_is_checked_at_most_once_per_ttl():
+    print("Testing that the dataset version is not recomputed on every request...")
+    source = _Source()
+    cache = ResponseCache(source.current, version_ttl=60)
+    endpoint = cache.cached("route", ttl=60)(source.endpoint)
+
+    async def scenario():
+        for _ in range(20):
+            await endpoint({})
+
+    asyncio.run(scenario())
+    assert source.version_calls == 1
+    cache.clear()
+    asyncio.run(scenario())
+    assert source.version_calls == 2, "clear() should re-read the version"
+    print("✅ One version check for 20 requests")
+
+
+def test_callers_get_copies():
+    print("Testing that mutating a response leaves the cache intact...")
+    source = _Source()
+    cache = ResponseCache(source.current)
+    endpoint = cache.cached("route", ttl=60)(source.endpoint)
+
+    async def scenario():
+        first = await endpoint({})
+        first["rows"].append(4)
+        first["call"] = 99
+        return await endpoint({})
+
+    second = asyncio.run(scenario())
+    assert second == {"body": {}, "call": 1, "rows": [1, 2, 3]}
+    print("✅ Cached payload unchanged")
+
+
+def test_mock_endpoints_are_not_cached():
+    print("Testing that endpoints returning random mock data bypass the cache...")
+    import app.api.analytics  # registers the cached routes
+    assert set(response_cache.metrics()) == {"grid"}
+    print("✅ Only the grid rollup summary is cached")
+
+
+if __name__ == "__main__":
+    test_hits_and_invalidation()
+    test_version_is_checked_at_most_once_per_ttl()
+    test_callers_get_copies()
+    test_mock_endpoints_are_not_cached()